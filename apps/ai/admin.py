@@ -1,3 +1,8 @@
 from django.contrib import admin
+from .models import AdviceJob
 
-# Register your models here.
+@admin.register(AdviceJob)
+class AdviceJobAdmin(admin.ModelAdmin):
+    list_display = ['user', 'status', 'created_at', 'started_at', 'finished_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['user__username', 'question']
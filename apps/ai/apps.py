@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class AiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'ai'
+    name = 'apps.ai'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,127 @@
+"""
+In-process cache of generated advice.
+
+Many users ask near-identical questions ("how can I save more?") while
+their numbers haven't changed. Entries are keyed on a hash of the
+normalized question plus the financial context dict the prompt is built
+from, so the cache can only answer when the model would have seen exactly
+the same data. Entries expire after AI_ADVICE_CACHE_TTL seconds, the
+least recently used ones are evicted beyond AI_ADVICE_CACHE_SIZE, and a
+user's entries are dropped whenever their transactions, categories or
+budgets change (see signals.py).
+
+Each worker process keeps its own cache. Because the context is part of
+the key, a write seen by another process can never produce a stale hit;
+the explicit invalidation just frees the memory early.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+
+
+def normalize_question(question):
+    """Lower-case, drop punctuation and collapse whitespace."""
+    words = re.sub(r'[^\w\s]', ' ', question.lower()).split()
+    return ' '.join(words)
+
+
+class AdviceCache:
+    def __init__(self, max_entries=None, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (user_id, expires_at, advice, cost)
+        self._user_keys = defaultdict(set)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.saved_seconds = 0.0
+
+    def get_max_entries(self):
+        return self.max_entries if self.max_entries is not None else settings.AI_ADVICE_CACHE_SIZE
+
+    def get_ttl(self):
+        return self.ttl if self.ttl is not None else settings.AI_ADVICE_CACHE_TTL
+
+    @staticmethod
+    def make_key(user_id, question, context):
+        payload = json.dumps(
+            {'user': user_id, 'question': normalize_question(question), 'context': context},
+            sort_keys=True, default=str,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key):
+        """Cached advice for ``key``, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.saved_seconds += entry[3]
+            return entry[2]
+
+    def set(self, user_id, key, advice, cost=0.0):
+        """Store advice that took ``cost`` seconds of model time to generate."""
+        max_entries = self.get_max_entries()
+        if max_entries <= 0:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (user_id, time.monotonic() + self.get_ttl(), advice, cost)
+            self._user_keys[user_id].add(key)
+            while len(self._entries) > max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_user(self, user_id):
+        """Drop every entry belonging to ``user_id``."""
+        with self._lock:
+            keys = self._user_keys.pop(user_id, set())
+            for key in keys:
+                self._entries.pop(key, None)
+            self.invalidations += len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._user_keys.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.get_max_entries(),
+                'ttl_seconds': self.get_ttl(),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'model_seconds_saved': round(self.saved_seconds, 3),
+            }
+
+    def _remove(self, key):
+        user_id = self._entries.pop(key)[0]
+        keys = self._user_keys.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._user_keys[user_id]
+
+
+advice_cache = AdviceCache()
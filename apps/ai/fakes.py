@@ -0,0 +1,84 @@
+"""
+Offline stand-in for the google.generativeai client.
+
+Set GEMINI_CLIENT=apps.ai.fakes to run the AI endpoints (and the
+benchmarks) without network access or an API key. The simulated network
+latencies are read from the environment so they can be tuned per process:
+
+    FAKE_GEMINI_LIST_LATENCY   seconds spent in list_models()
+    FAKE_GEMINI_LATENCY        seconds spent in generate_content(), or
+                               before the first chunk when streaming
+    FAKE_GEMINI_CHUNK_DELAY    seconds between streamed chunks
+"""
+
+import os
+import time
+from types import SimpleNamespace
+
+LIST_MODELS_LATENCY = float(os.environ.get('FAKE_GEMINI_LIST_LATENCY', '0'))
+GENERATE_LATENCY = float(os.environ.get('FAKE_GEMINI_LATENCY', '0'))
+CHUNK_DELAY = float(os.environ.get('FAKE_GEMINI_CHUNK_DELAY', '0'))
+CHUNK_WORDS = 4
+
+MODEL_NAMES = ['models/gemini-2.5-flash', 'models/gemini-2.5-flash-lite']
+RESPONSE_TEXT = (
+    "Track your top expense categories weekly and set a cap for each. "
+    "Move a fixed share of income to savings on payday. "
+    "Review subscriptions and cancel the ones you no longer use. "
+    "Keep an emergency fund of three to six months of expenses."
+)
+
+
+def configure(api_key=None, **kwargs):
+    pass
+
+
+def list_models():
+    time.sleep(LIST_MODELS_LATENCY)
+    return [SimpleNamespace(name=name) for name in MODEL_NAMES]
+
+
+def make_response(text, prompt_tokens=0, completion_tokens=0):
+    """Build an object shaped like GenerateContentResponse."""
+    part = SimpleNamespace(text=text)
+    candidate = SimpleNamespace(content=SimpleNamespace(parts=[part]))
+    usage = SimpleNamespace(
+        prompt_token_count=prompt_tokens,
+        candidates_token_count=completion_tokens,
+        total_token_count=prompt_tokens + completion_tokens,
+    )
+    return SimpleNamespace(text=text, candidates=[candidate], usage_metadata=usage)
+
+
+def count_tokens(text):
+    """Rough stand-in for the tokenizer: one token per word."""
+    return len(str(text).split())
+
+
+class GenerativeModel:
+    def __init__(self, model_name='gemini-2.5-flash', **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        if stream:
+            return self.stream_content(contents)
+        # A full response costs the time to first token plus every chunk
+        time.sleep(GENERATE_LATENCY + CHUNK_DELAY * (len(self.chunks()) - 1))
+        return make_response(RESPONSE_TEXT, count_tokens(contents), count_tokens(RESPONSE_TEXT))
+
+    def stream_content(self, contents):
+        time.sleep(GENERATE_LATENCY)
+        written = ''
+        for index, text in enumerate(self.chunks()):
+            if index:
+                time.sleep(CHUNK_DELAY)
+            written += text
+            yield make_response(text, count_tokens(contents), count_tokens(written))
+
+    @staticmethod
+    def chunks():
+        words = RESPONSE_TEXT.split(' ')
+        return [
+            ' '.join(words[i:i + CHUNK_WORDS]) + (' ' if i + CHUNK_WORDS < len(words) else '')
+            for i in range(0, len(words), CHUNK_WORDS)
+        ]
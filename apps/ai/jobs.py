@@ -0,0 +1,187 @@
+"""
+Background execution of AI advice requests.
+
+Async advice requests are stored as AdviceJob rows and run on a small,
+bounded thread pool inside the web process, so a slow Gemini call no
+longer holds a request worker. Limits:
+
+    AI_ADVICE_WORKERS       threads generating advice concurrently
+    AI_ADVICE_MAX_PENDING   jobs allowed to wait for a thread; beyond that
+                            new jobs are rejected instead of queued
+    AI_ADVICE_MAX_PER_USER  active (pending or running) jobs per user
+    AI_ADVICE_TIMEOUT       seconds after which an unfinished job is
+                            marked timed out and its result discarded
+
+Python threads can't be interrupted, so timeouts and cancellation are
+enforced on the job row: a worker only writes its result if the job is
+still ``running``, and jobs past their deadline are expired whenever a
+user submits or polls.
+"""
+
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import AdviceJob
+from .services import FinancialAdvisor
+
+
+class JobRejected(Exception):
+    """The job could not be queued (per-user limit or full queue)."""
+
+
+_executor = None
+_executor_lock = threading.Lock()
+_futures = {}
+_in_flight = 0
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.AI_ADVICE_WORKERS,
+                    thread_name_prefix='advice',
+                )
+    return _executor
+
+
+def deadline():
+    """Jobs created before this moment have run out of time."""
+    return timezone.now() - timedelta(seconds=settings.AI_ADVICE_TIMEOUT)
+
+
+def expire_stale(user):
+    """Mark the user's overdue jobs as timed out."""
+    return AdviceJob.objects.filter(
+        user=user,
+        status__in=AdviceJob.ACTIVE_STATUSES,
+        created_at__lt=deadline(),
+    ).update(
+        status=AdviceJob.TIMED_OUT,
+        error='Timed out waiting for the AI model.',
+        finished_at=timezone.now(),
+    )
+
+
+def submit(user, question):
+    """
+    Queue an advice job for ``user`` and return it.
+
+    Raises JobRejected if the user already has too many active jobs or
+    the shared queue is full.
+
+    Runs its own transaction, so it can't be called inside another one:
+    the user's row is locked while their active jobs are counted (two
+    submits can't both pass the limit), and the reserved slot is handed
+    to the pool as soon as the job is committed. Were the job part of an
+    enclosing transaction that rolled back, nothing would ever release
+    its slot.
+    """
+    expire_stale(user)
+    reserved = False
+    try:
+        with transaction.atomic(durable=True):
+            get_user_model().objects.select_for_update().filter(pk=user.pk).first()
+            active = AdviceJob.objects.filter(user=user, status__in=AdviceJob.ACTIVE_STATUSES).count()
+            if active >= settings.AI_ADVICE_MAX_PER_USER:
+                raise JobRejected(
+                    f"You already have {active} advice request(s) in progress."
+                )
+            reserved = reserve_slot()
+            if not reserved:
+                raise JobRejected("The advisor is busy, please try again shortly.")
+            job = AdviceJob.objects.create(user=user, question=question)
+    except BaseException:
+        if reserved:
+            release_slot()
+        raise
+    # Committed, so this runs right away (tests capture it instead)
+    transaction.on_commit(lambda: schedule(job.pk))
+    return job
+
+
+def reserve_slot():
+    """
+    Take a place in the pool for a new job; False if the queue is full.
+
+    Checked and taken under one lock, so concurrent submits can't all
+    pass the check before any of them counts. The slot is given back by
+    run() when the job finishes, or by cancel() if it never starts.
+    """
+    global _in_flight
+    with _executor_lock:
+        if _in_flight >= settings.AI_ADVICE_WORKERS + settings.AI_ADVICE_MAX_PENDING:
+            return False
+        _in_flight += 1
+        return True
+
+
+def schedule(job_id):
+    """Hand a submitted job (its slot already reserved) to the pool."""
+    future = get_executor().submit(run, job_id)
+    _futures[job_id] = future
+    future.add_done_callback(lambda _: _futures.pop(job_id, None))
+
+
+def release_slot():
+    global _in_flight
+    with _executor_lock:
+        _in_flight -= 1
+
+
+def run(job_id):
+    """Generate advice for one job on a worker thread."""
+    close_old_connections()
+    try:
+        started = AdviceJob.objects.filter(
+            pk=job_id, status=AdviceJob.PENDING, created_at__gte=deadline()
+        ).update(status=AdviceJob.RUNNING, started_at=timezone.now())
+        if not started:
+            # Cancelled, or waited in the queue past its deadline
+            AdviceJob.objects.filter(pk=job_id, status=AdviceJob.PENDING).update(
+                status=AdviceJob.TIMED_OUT,
+                error='Timed out waiting for a worker.',
+                finished_at=timezone.now(),
+            )
+            return
+
+        job = AdviceJob.objects.select_related('user').get(pk=job_id)
+        try:
+            result = FinancialAdvisor.get_advice(job.user, job.question)
+        except Exception as e:
+            traceback.print_exc()
+            result = {'success': False, 'error': str(e)}
+
+        # Only a job that is still running may record its outcome; a
+        # cancelled or timed out job keeps that status
+        AdviceJob.objects.filter(pk=job_id, status=AdviceJob.RUNNING).update(
+            status=AdviceJob.SUCCEEDED if result['success'] else AdviceJob.FAILED,
+            advice=result.get('advice', ''),
+            error=result.get('error', ''),
+            finished_at=timezone.now(),
+        )
+    finally:
+        release_slot()
+        close_old_connections()
+
+
+def cancel(job):
+    """Cancel a pending or running job. Returns False if it already finished."""
+    cancelled = AdviceJob.objects.filter(
+        pk=job.pk, status__in=AdviceJob.ACTIVE_STATUSES
+    ).update(status=AdviceJob.CANCELLED, finished_at=timezone.now())
+
+    future = _futures.get(job.pk)
+    if future is not None and future.cancel():
+        # Never started, so run() won't release its slot
+        release_slot()
+    return bool(cancelled)
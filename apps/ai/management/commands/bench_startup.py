@@ -0,0 +1,68 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# What a gunicorn worker does on boot: build the WSGI app and load the URLconf
+BOOT = (
+    "import config.wsgi\n"
+    "from django.urls import get_resolver\n"
+    "get_resolver().url_patterns\n"
+)
+
+# What the old import-time model selection added on top of that
+EAGER = BOOT + (
+    "from apps.ai.services import get_model\n"
+    "get_model()\n"
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure worker boot time with lazy Gemini model resolution versus "
+        "resolving the model at import time. Runs against the offline fake client."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help="Boots per mode (default 5).")
+        parser.add_argument(
+            '--latency', type=float, default=0.5,
+            help="Simulated list_models() round trip in seconds (default 0.5).",
+        )
+
+    def handle(self, *args, **options):
+        env = dict(
+            os.environ,
+            DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings'),
+            GEMINI_CLIENT='apps.ai.fakes',
+            GEMINI_MODEL='',
+            FAKE_GEMINI_LIST_LATENCY=str(options['latency']),
+        )
+
+        self.stdout.write(
+            f"{options['runs']} boots per mode, simulated list_models() latency {options['latency']:.3f}s"
+        )
+        results = {}
+        for label, script in (('lazy (current)', BOOT), ('eager (import-time)', EAGER)):
+            timings = [self.boot(script, env) for _ in range(options['runs'])]
+            results[label] = statistics.median(timings)
+            self.stdout.write(
+                f"  {label:<20} median {results[label] * 1000:8.1f} ms"
+                f"   min {min(timings) * 1000:8.1f} ms   max {max(timings) * 1000:8.1f} ms"
+            )
+
+        saved = results['eager (import-time)'] - results['lazy (current)']
+        self.stdout.write(self.style.SUCCESS(f"Lazy resolution saves {saved * 1000:.1f} ms per worker boot."))
+
+    def boot(self, script, env):
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable, '-W', 'ignore', '-c', script],
+            cwd=settings.BASE_DIR, env=env, check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        return time.perf_counter() - started
@@ -1,3 +1,48 @@
+import uuid
+
 from django.db import models
+from django.contrib.auth.models import User
+
 
-# Create your models here.
+class AdviceJob(models.Model):
+    """
+    A queued request for AI financial advice.
+    
+    Created by POST /api/ai/advice/ in async mode and filled in by a
+    background worker (see jobs.py); clients poll it by id.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+    TIMED_OUT = 'timed_out'
+    
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+        (CANCELLED, 'Cancelled'),
+        (TIMED_OUT, 'Timed out'),
+    ]
+    ACTIVE_STATUSES = [PENDING, RUNNING]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='advice_jobs')
+    question = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    advice = models.TextField(blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'status'], name='ai_advicejob_user_status'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.status} - {self.created_at:%Y-%m-%d %H:%M}"
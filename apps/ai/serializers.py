@@ -0,0 +1,8 @@
+from rest_framework import serializers
+from .models import AdviceJob
+
+class AdviceJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AdviceJob
+        fields = ['id', 'status', 'question', 'advice', 'error', 'created_at', 'started_at', 'finished_at']
+        read_only_fields = fields
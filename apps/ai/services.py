@@ -1,57 +1,144 @@
-import os
-import google.generativeai as genai
-from decouple import config
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from django.db.models import Sum
+from decimal import Decimal
+from importlib import import_module
 import traceback
 
+from django.conf import settings
+
 from apps.budgets.models import Budget
-from apps.transactions.models import Transaction
+from apps.monitoring import metrics
+from apps.transactions import rollups
+from .cache import advice_cache
 
 
 # ===========================
 # 🔐 Gemini Configuration
 # ===========================
 
-GEMINI_API_KEY = config('GEMINI_API_KEY')
-genai.configure(api_key=GEMINI_API_KEY)
+# Nothing here touches the network at import time: the client module is
+# imported and configured on first use, and the model is resolved lazily
+# and cached for GEMINI_MODEL_CACHE_TTL seconds.
+
+FALLBACK_MODEL = "gemini-2.5-flash"
+FALLBACK_RETRY_SECONDS = 60  # retry model discovery soon after a failure
+
+_client = None
+_model_cache = {'name': None, 'model': None, 'expires_at': 0.0}
+_model_lock = threading.RLock()
+
+
+def get_client():
+    """
+    Import and configure the Gemini client module on first use.
+
+    The module path comes from settings.GEMINI_CLIENT so an offline stand-in
+    (apps.ai.fakes) can replace google.generativeai.
+    """
+    global _client
+    if _client is None:
+        with _model_lock:
+            if _client is None:
+                client = import_module(settings.GEMINI_CLIENT)
+                client.configure(api_key=settings.GEMINI_API_KEY)
+                _client = client
+    return _client
 
 
 def get_latest_model():
     """
     Automatically select the most suitable available Gemini model.
-    Falls back safely if a model isn't available.
+    Raises if the model list can't be fetched.
     """
-    try:
-        models = genai.list_models()
-        model_names = [m.name for m in models]
-
-        # Preference order (most powerful to lighter)
-        preferred = [
-            "gemini-2.5-pro",
-            "gemini-2.5-flash",
-            "gemini-2.5-flash-lite",
-            "gemini-pro-latest",
-            "gemini-flash-latest",
-        ]
+    models = get_client().list_models()
+    model_names = [m.name for m in models]
+
+    # Preference order (most powerful to lighter)
+    preferred = [
+        "gemini-2.5-pro",
+        "gemini-2.5-flash",
+        "gemini-2.5-flash-lite",
+        "gemini-pro-latest",
+        "gemini-flash-latest",
+    ]
+
+    for p in preferred:
+        if any(p in name for name in model_names):
+            print(f"✅ Using Gemini model: {p}")
+            return p
+
+    # Fallback
+    print("⚠️ Preferred Gemini models not found. Using first available model.")
+    return model_names[0] if model_names else FALLBACK_MODEL
+
+
+def get_model():
+    """
+    Return the GenerativeModel to use, resolving it on first call.
+
+    settings.GEMINI_MODEL pins a model and skips discovery entirely.
+    Otherwise the best available model is looked up and cached for
+    settings.GEMINI_MODEL_CACHE_TTL seconds; if the lookup fails the safe
+    fallback is used and discovery is retried after a short delay.
+    """
+    if _model_cache['model'] is not None and time.monotonic() < _model_cache['expires_at']:
+        return _model_cache['model']
+
+    with _model_lock:
+        if _model_cache['model'] is not None and time.monotonic() < _model_cache['expires_at']:
+            return _model_cache['model']
+
+        ttl = settings.GEMINI_MODEL_CACHE_TTL
+        if settings.GEMINI_MODEL:
+            name = settings.GEMINI_MODEL
+        else:
+            try:
+                name = get_latest_model()
+            except Exception as e:
+                print("💥 Error fetching Gemini model list:", e)
+                name = FALLBACK_MODEL  # safe fallback
+                ttl = min(ttl, FALLBACK_RETRY_SECONDS)
+
+        _model_cache.update(
+            name=name,
+            model=get_client().GenerativeModel(name),
+            expires_at=time.monotonic() + ttl,
+        )
+        return _model_cache['model']
+
 
-        for p in preferred:
-            if any(p in name for name in model_names):
-                print(f"✅ Using Gemini model: {p}")
-                return p
+def reset_model_cache():
+    """Forget the resolved model (and client) so the next call re-resolves."""
+    global _client
+    with _model_lock:
+        _client = None
+        _model_cache.update(name=None, model=None, expires_at=0.0)
 
-        # Fallback
-        print("⚠️ Preferred Gemini models not found. Using first available model.")
-        return model_names[0] if model_names else "gemini-2.5-flash"
 
-    except Exception as e:
-        print("💥 Error fetching Gemini model list:", e)
-        return "gemini-2.5-flash"  # safe fallback
+@contextmanager
+def observe_gemini(operation):
+    """Count the duration and any failure of a Gemini call in the metrics."""
+    started = time.monotonic()
+    try:
+        yield
+    except Exception:
+        metrics.GEMINI_FAILURES.inc(operation=operation)
+        raise
+    finally:
+        metrics.GEMINI_DURATION.observe(time.monotonic() - started, operation=operation)
 
 
-# Use the best available model
-MODEL_NAME = get_latest_model()
-model = genai.GenerativeModel(MODEL_NAME)
+def record_usage(operation, response):
+    """Add the token counts of a response's usage metadata, when the SDK reports them."""
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is None:
+        return
+    for kind, field in (('prompt', 'prompt_token_count'), ('completion', 'candidates_token_count')):
+        count = getattr(usage, field, None)
+        if count:
+            metrics.GEMINI_TOKENS.inc(count, operation=operation, kind=kind)
 
 
 # ===========================
@@ -62,81 +149,215 @@ class FinancialAdvisor:
     """AI Financial Advisor using Gemini"""
 
     @staticmethod
-    def get_user_financial_context(user):
-        """Fetch user's recent financial context"""
-
-        thirty_days_ago = datetime.now().date() - timedelta(days=30)
-        transactions = Transaction.objects.filter(user=user, date__gte=thirty_days_ago)
-
-        # Calculate totals
-        total_income = sum(t.amount for t in transactions if t.type == 'income')
-        total_expenses = sum(t.amount for t in transactions if t.type == 'expense')
-
-        # Get category breakdown (top 5)
-        expense_by_category = (
-            transactions.filter(type='expense')
-            .values('category__name')
-            .annotate(total=Sum('amount'))
-            .order_by('-total')[:5]
-        )
+    def get_user_financial_context(user, today=None):
+        """
+        Fetch user's recent financial context.
+
+        Covers every window in settings.AI_CONTEXT_WINDOWS (plus the window
+        before each, for trends) and month-to-date spending against the
+        budget. Everything comes from aggregate queries over the monthly
+        rollup, so the cost doesn't grow with the user's history. The first
+        window provides the headline figures.
+        """
+
+        today = today or datetime.now().date()
+        current_month = today.replace(day=1)
+
+        windows = {'month_to_date': (current_month, rollups.next_month(current_month))}
+        for days in settings.AI_CONTEXT_WINDOWS:
+            start = today - timedelta(days=days)
+            windows[days] = (start, None)
+            windows[(days, 'previous')] = (start - timedelta(days=days), start)
+        summary = rollups.windows_summary(user, windows)
+
+        def totals(rows):
+            income = sum((row['total'] for (kind, _), row in rows.items() if kind == 'income'), Decimal('0'))
+            expenses = sum((row['total'] for (kind, _), row in rows.items() if kind == 'expense'), Decimal('0'))
+            return income, expenses, sum(row['count'] for row in rows.values())
+
+        def change(current, previous):
+            return round(float((current - previous) / previous * 100), 1) if previous else None
+
+        # Headline figures for the first window
+        primary_days = settings.AI_CONTEXT_WINDOWS[0]
+        total_income, total_expenses, transaction_count = totals(summary[primary_days])
+
+        # Get category breakdown (top N)
+        expense_by_category = sorted(
+            (
+                {'category__name': row['category_name'] or 'Uncategorized', 'total': float(row['total'])}
+                for (kind, _), row in summary[primary_days].items() if kind == 'expense'
+            ),
+            key=lambda item: item['total'],
+            reverse=True,
+        )[:settings.AI_CONTEXT_TOP_CATEGORIES]
+
+        trends = []
+        for days in settings.AI_CONTEXT_WINDOWS:
+            income, expenses, _ = totals(summary[days])
+            previous_income, previous_expenses, _ = totals(summary[(days, 'previous')])
+            trends.append({
+                'days': days,
+                'income': float(income),
+                'expenses': float(expenses),
+                'income_change_pct': change(income, previous_income),
+                'expense_change_pct': change(expenses, previous_expenses),
+            })
 
         # Get current month's budget
-        current_month = datetime.now().date().replace(day=1)
         try:
             budget = Budget.objects.get(user=user, month=current_month)
             budget_amount = float(budget.budget_amount)
         except Budget.DoesNotExist:
             budget_amount = None
 
+        _, month_spent, _ = totals(summary['month_to_date'])
+        days_in_month = (rollups.next_month(current_month) - current_month).days
+        month_to_date = {
+            'spent': float(month_spent),
+            'budget': budget_amount,
+            'percentage_used': round(float(month_spent) / budget_amount * 100, 1) if budget_amount else None,
+            'projected': round(float(month_spent) / today.day * days_in_month, 2),
+        }
+
         return {
+            'window_days': primary_days,
             'total_income': float(total_income),
             'total_expenses': float(total_expenses),
             'balance': float(total_income - total_expenses),
             'budget': budget_amount,
-            'top_expenses': list(expense_by_category),
-            'transaction_count': transactions.count(),
+            'top_expenses': expense_by_category,
+            'transaction_count': transaction_count,
+            'trends': trends,
+            'month_to_date': month_to_date,
         }
 
     @staticmethod
-    def get_advice(user, question):
-        """Generate personalized financial advice using Gemini"""
-
-        context = FinancialAdvisor.get_user_financial_context(user)
-
-        # Create prompt
-        budget_text = (
-            f"₹{context['budget']:,.2f}"
-            if context['budget'] is not None
-            else "Not set"
-        )
+    def build_prompt(user, question, context=None):
+        """
+        Build the Gemini prompt for a user's question.
+
+        The headline summary is always included; month-to-date, category
+        and trend lines are added in that order only while the prompt stays
+        within settings.AI_PROMPT_MAX_CHARS, and the question itself is cut
+        to settings.AI_QUESTION_MAX_CHARS.
+        """
+
+        if context is None:
+            context = FinancialAdvisor.get_user_financial_context(user)
+
+        def money(value):
+            return f"₹{value:,.2f}"
+
+        def pct(value):
+            return "n/a" if value is None else f"{value:+.1f}%"
+
+        question = question[:settings.AI_QUESTION_MAX_CHARS]
+        budget_text = money(context['budget']) if context['budget'] is not None else "Not set"
+
+        head = [
+            "You are a professional financial advisor. Analyze this financial data and answer the user's question.",
+            "",
+            f"Financial Summary (Last {context['window_days']} Days):",
+            f"- Total Income: {money(context['total_income'])}",
+            f"- Total Expenses: {money(context['total_expenses'])}",
+            f"- Current Balance: {money(context['balance'])}",
+            f"- Monthly Budget: {budget_text}",
+            f"- Number of Transactions: {context['transaction_count']}",
+        ]
+        tail = [
+            "",
+            f"User Question: {question}",
+            "",
+            "Provide personalized, actionable financial advice based on this data. Be specific, supportive, "
+            "and practical. Use Indian Rupees (₹) in your response. Keep your response short in 4-5 sentence.",
+        ]
 
-        prompt = f"""You are a professional financial advisor. Analyze this financial data and answer the user's question.
+        mtd = context['month_to_date']
+        month_line = f"- Spent {money(mtd['spent'])}, on track for {money(mtd['projected'])} by month end"
+        if mtd['budget'] is not None:
+            month_line += f" ({mtd['percentage_used']}% of the {money(mtd['budget'])} budget used)"
+
+        optional = [
+            ("This Month So Far:", [month_line]),
+            ("Top Expense Categories:", [
+                f"- {item['category__name']}: {money(item['total'])}" for item in context['top_expenses']
+            ]),
+            ("Trends (vs. the preceding period of the same length):", [
+                f"- Last {trend['days']} days: income {money(trend['income'])} ({pct(trend['income_change_pct'])}), "
+                f"expenses {money(trend['expenses'])} ({pct(trend['expense_change_pct'])})"
+                for trend in context['trends']
+            ]),
+        ]
 
-        Financial Summary (Last 30 Days):
-        - Total Income: ₹{context['total_income']:,.2f}
-        - Total Expenses: ₹{context['total_expenses']:,.2f}
-        - Current Balance: ₹{context['balance']:,.2f}
-        - Monthly Budget: {budget_text}
-        - Number of Transactions: {context['transaction_count']}
+        lines = list(head)
+        room = settings.AI_PROMPT_MAX_CHARS - sum(len(line) + 1 for line in head + tail)
+        for heading, entries in optional:
+            if not entries:
+                continue
+            block = ["", heading]
+            used = sum(len(line) + 1 for line in block)
+            for entry in entries:
+                if used + len(entry) + 1 > room:
+                    break
+                block.append(entry)
+                used += len(entry) + 1
+            if len(block) > 2:
+                lines.extend(block)
+                room -= used
+            if len(block) - 2 < len(entries):
+                break  # out of room
+
+        return "\n".join(lines + tail)
 
-        Top Expense Categories:
-        {chr(10).join([f"- {item['category__name']}: ₹{item['total']:,.2f}" for item in context['top_expenses']])}
+    @staticmethod
+    def get_advice(user, question):
+        """Generate personalized financial advice using Gemini"""
 
-        User Question: {question}
+        context = FinancialAdvisor.get_user_financial_context(user)
 
-        Provide personalized, actionable financial advice based on this data. Be specific, supportive, and practical. Use Indian Rupees (₹) in your response. Keep your response short in 4-5 sentence."""
+        # Same question against the same numbers -> same advice
+        cache_key = advice_cache.make_key(user.pk, question, context)
+        cached = advice_cache.get(cache_key)
+        if cached is not None:
+            return {'success': True, 'advice': cached}
 
+        prompt = FinancialAdvisor.build_prompt(user, question, context)
 
         try:
-            response = model.generate_content(prompt)
-            ai_text = (
-                response.candidates[0].content.parts[0].text
-                if response.candidates and response.candidates[0].content.parts
-                else "No response generated."
-            )
+            started = time.monotonic()
+            model = get_model()
+            with observe_gemini('generate'):
+                response = model.generate_content(prompt)
+            record_usage('generate', response)
+            if response.candidates and response.candidates[0].content.parts:
+                ai_text = response.candidates[0].content.parts[0].text
+                advice_cache.set(user.pk, cache_key, ai_text, cost=time.monotonic() - started)
+            else:
+                ai_text = "No response generated."
             return {'success': True, 'advice': ai_text}
 
         except Exception as e:
             print("Gemini API Error:", e)
             traceback.print_exc()
             return {'success': False, 'error': str(e)}
+
+    @staticmethod
+    def stream_advice(prompt):
+        """
+        Yield the advice for a prompt from build_prompt() as it is generated.
+
+        Uses the SDK's streaming mode, so the first words arrive as soon as
+        the model produces them. Errors propagate to the caller.
+        """
+        model = get_model()
+        last = None
+        with observe_gemini('stream'):
+            for chunk in model.generate_content(prompt, stream=True):
+                last = chunk
+                parts = chunk.candidates[0].content.parts if chunk.candidates else []
+                text = ''.join(part.text for part in parts)
+                if text:
+                    yield text
+        # Each chunk reports the usage so far
+        record_usage('stream', last)
@@ -0,0 +1,27 @@
+"""
+Drop cached advice when the data it was based on changes.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.budgets.models import Budget
+from apps.categories.models import Category
+from apps.transactions.models import Transaction
+from apps.transactions.signals import transactions_bulk_created
+from .cache import advice_cache
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Budget)
+@receiver(post_delete, sender=Budget)
+def invalidate_cached_advice(sender, instance, **kwargs):
+    advice_cache.invalidate_user(instance.user_id)
+
+
+@receiver(transactions_bulk_created, sender=Transaction)
+def invalidate_cached_advice_on_import(sender, user, **kwargs):
+    advice_cache.invalidate_user(user.pk)
@@ -1,3 +1,536 @@
-from django.test import TestCase
+import io
+import os
+import subprocess
+import sys
+import threading
+import time
+from contextlib import redirect_stdout
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import DatabaseError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from apps.budgets.models import Budget
+from apps.categories.models import Category
+from apps.transactions.importers import save_transactions
+from apps.transactions.models import Transaction
+from . import fakes, jobs, services
+from .cache import AdviceCache, advice_cache, normalize_question
+from .models import AdviceJob
+
+
+@override_settings(GEMINI_CLIENT='apps.ai.fakes', GEMINI_MODEL='gemini-2.5-flash')
+class StreamingAdviceTests(TestCase):
+    FIRST_TOKEN = 0.05
+    CHUNK_DELAY = 0.02
+
+    def setUp(self):
+        services.reset_model_cache()
+        self.addCleanup(services.reset_model_cache)
+        for name, value in (('GENERATE_LATENCY', self.FIRST_TOKEN), ('CHUNK_DELAY', self.CHUNK_DELAY)):
+            patcher = mock.patch.object(fakes, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        user = User.objects.create_user(username='streamer', password='pass12345')
+        self.auth = {'HTTP_AUTHORIZATION': f'Token {Token.objects.create(user=user).key}'}
+
+    def test_first_chunk_arrives_before_full_response(self):
+        started = time.perf_counter()
+        response = self.client.get(reverse('ai:financial-advice-stream'), {'question': 'How can I save?'}, **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        events = iter(response.streaming_content)
+        first = next(events)
+        time_to_first = time.perf_counter() - started
+        rest = b''.join(events)
+        total = time.perf_counter() - started
+
+        self.assertTrue(first.startswith(b'event: chunk'))
+        self.assertTrue(rest.endswith(b'event: done\ndata: {}\n\n'))
+        chunks = len(fakes.GenerativeModel.chunks())
+        self.assertGreater(total, self.FIRST_TOKEN + self.CHUNK_DELAY * (chunks - 1))
+        self.assertLess(time_to_first, self.FIRST_TOKEN + self.CHUNK_DELAY * (chunks - 1))
+
+    def test_requires_authentication(self):
+        response = self.client.get(reverse('ai:financial-advice-stream'), {'question': 'Hi'})
+        self.assertEqual(response.status_code, 401)
+
+
+@override_settings(
+    GEMINI_CLIENT='apps.ai.fakes', GEMINI_MODEL='gemini-2.5-flash',
+    AI_ADVICE_WORKERS=1, AI_ADVICE_MAX_PENDING=1, AI_ADVICE_MAX_PER_USER=2, AI_ADVICE_TIMEOUT=60,
+)
+class AdviceJobTests(TestCase):
+    """
+    Jobs are run on the test thread: the worker pool's threads can't see
+    rows in the test's uncommitted transaction.
+    """
+
+    def setUp(self):
+        services.reset_model_cache()
+        self.addCleanup(services.reset_model_cache)
+        patcher = mock.patch.object(jobs, 'close_old_connections')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(setattr, jobs, '_in_flight', 0)
+        jobs._in_flight = 0
+        self.user = User.objects.create_user(username='asker', password='pass12345')
+
+    def submit(self, user=None, question='How can I save?'):
+        """Submit a job without handing it to the pool."""
+        with self.captureOnCommitCallbacks() as callbacks:
+            job = jobs.submit(user or self.user, question)
+        self.assertEqual(len(callbacks), 1)
+        return job
+
+    def status(self, job):
+        return AdviceJob.objects.get(pk=job.pk).status
+
+    def test_submit_and_run(self):
+        job = self.submit()
+        self.assertEqual(job.status, AdviceJob.PENDING)
+        self.assertEqual(jobs._in_flight, 1)
+
+        jobs.run(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, AdviceJob.SUCCEEDED)
+        self.assertEqual(job.advice, fakes.RESPONSE_TEXT)
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(jobs._in_flight, 0)
+
+    def test_failed_generation(self):
+        job = self.submit()
+        with mock.patch.object(services.FinancialAdvisor, 'get_advice', return_value={'success': False, 'error': 'Quota'}):
+            jobs.run(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (AdviceJob.FAILED, 'Quota'))
+        self.assertEqual(jobs._in_flight, 0)
+
+    def test_per_user_limit(self):
+        self.submit()
+        self.submit()
+        with self.assertRaisesMessage(jobs.JobRejected, 'already have 2'):
+            jobs.submit(self.user, 'One more?')
+
+    def test_full_queue_rejects_before_the_jobs_are_scheduled(self):
+        # Slots are taken at submit time, not when on_commit schedules
+        self.submit()
+        self.submit(User.objects.create_user(username='second', password='pass12345'))
+        third = User.objects.create_user(username='third', password='pass12345')
+        with self.assertRaisesMessage(jobs.JobRejected, 'busy'):
+            jobs.submit(third, 'Anything?')
+        self.assertFalse(AdviceJob.objects.filter(user=third).exists())
+        self.assertEqual(jobs._in_flight, 2)
+
+    def test_per_user_count_locks_the_user_row(self):
+        with CaptureQueriesContext(connection) as captured:
+            self.submit()
+        statements = [query['sql'] for query in captured]
+        lock = next(index for index, sql in enumerate(statements) if 'auth_user' in sql)
+        count = next(index for index, sql in enumerate(statements) if 'COUNT(' in sql)
+        self.assertLess(lock, count)
+        if connection.features.has_select_for_update:
+            self.assertIn('FOR UPDATE', statements[lock])
+
+    @override_settings(AI_ADVICE_MAX_PENDING=5)
+    def test_rejected_or_failed_submits_hold_no_slot(self):
+        self.submit()
+        self.submit()
+        with self.assertRaises(jobs.JobRejected):
+            jobs.submit(self.user, 'Over the limit')
+        self.assertEqual(jobs._in_flight, 2)
+
+        other = User.objects.create_user(username='unlucky', password='pass12345')
+        with mock.patch.object(AdviceJob.objects, 'create', side_effect=DatabaseError('Disk full')):
+            with self.assertRaises(DatabaseError):
+                jobs.submit(other, 'Anything?')
+        self.assertEqual(jobs._in_flight, 2)
+
+    def test_cannot_join_an_enclosing_transaction(self):
+        # Its slot could never be released if that transaction rolled back
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                jobs.submit(self.user, 'Inside?')
+        self.assertEqual(jobs._in_flight, 0)
+        self.assertFalse(AdviceJob.objects.exists())
+
+    def test_concurrent_reservations_respect_the_limit(self):
+        capacity = 2
+        start = threading.Barrier(20)
+        results = []
+
+        def reserve():
+            start.wait()
+            results.append(jobs.reserve_slot())
+
+        threads = [threading.Thread(target=reserve) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results.count(True), capacity)
+        self.assertEqual(jobs._in_flight, capacity)
+
+    def test_cancel_pending_job(self):
+        job = self.submit()
+        self.assertTrue(jobs.cancel(job))
+        self.assertEqual(self.status(job), AdviceJob.CANCELLED)
+
+        # The worker finds it cancelled, leaves it alone and frees the slot
+        jobs.run(job.pk)
+        self.assertEqual(self.status(job), AdviceJob.CANCELLED)
+        self.assertEqual(jobs._in_flight, 0)
+        self.assertFalse(jobs.cancel(job))
+
+    def test_cancel_while_running_discards_the_result(self):
+        job = self.submit()
+
+        def cancel_midway(user, question):
+            self.assertTrue(jobs.cancel(job))
+            return {'success': True, 'advice': 'Too late'}
+
+        with mock.patch.object(services.FinancialAdvisor, 'get_advice', side_effect=cancel_midway):
+            jobs.run(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.advice), (AdviceJob.CANCELLED, ''))
+
+    def test_cancel_releases_the_slot_of_a_job_that_never_started(self):
+        job = self.submit()
+        future = mock.Mock()
+        future.cancel.return_value = True
+        with mock.patch.dict(jobs._futures, {job.pk: future}):
+            self.assertTrue(jobs.cancel(job))
+        self.assertEqual(jobs._in_flight, 0)
+
+    @override_settings(AI_ADVICE_MAX_PENDING=5)
+    def test_expire_stale(self):
+        stale, fresh = self.submit(), self.submit()
+        AdviceJob.objects.filter(pk=stale.pk).update(created_at=timezone.now() - timedelta(seconds=61))
+
+        self.assertEqual(jobs.expire_stale(self.user), 1)
+        self.assertEqual(self.status(stale), AdviceJob.TIMED_OUT)
+        self.assertEqual(self.status(fresh), AdviceJob.PENDING)
+        # No longer counts against the per-user limit
+        self.submit()
+
+    def test_job_that_waited_past_its_deadline_is_not_run(self):
+        job = self.submit()
+        AdviceJob.objects.filter(pk=job.pk).update(created_at=timezone.now() - timedelta(seconds=61))
+        with mock.patch.object(services.FinancialAdvisor, 'get_advice') as get_advice:
+            jobs.run(job.pk)
+        get_advice.assert_not_called()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (AdviceJob.TIMED_OUT, 'Timed out waiting for a worker.'))
+        self.assertEqual(jobs._in_flight, 0)
+
+
+@override_settings(GEMINI_CLIENT='apps.ai.fakes', GEMINI_MODEL='gemini-2.5-flash')
+class AdviceCacheTests(TestCase):
+    CONTEXT = {'total_expenses': 120.0, 'top_expenses': [{'category__name': 'Food', 'total': 120.0}]}
+
+    def setUp(self):
+        services.reset_model_cache()
+        self.addCleanup(services.reset_model_cache)
+        advice_cache.clear()
+        self.addCleanup(advice_cache.clear)
+        self.user = User.objects.create_user(username='cached-advice', password='pass12345')
+
+    def test_normalized_question_shares_a_key(self):
+        self.assertEqual(normalize_question('  How can I  SAVE more?! '), 'how can i save more')
+        key = AdviceCache.make_key(1, 'How can I save more?', self.CONTEXT)
+        self.assertEqual(AdviceCache.make_key(1, 'how can i save more', dict(reversed(self.CONTEXT.items()))), key)
+        # Another user, question or set of numbers never shares an entry
+        self.assertNotEqual(AdviceCache.make_key(2, 'How can I save more?', self.CONTEXT), key)
+        self.assertNotEqual(AdviceCache.make_key(1, 'How can I spend more?', self.CONTEXT), key)
+        self.assertNotEqual(AdviceCache.make_key(1, 'How can I save more?', {**self.CONTEXT, 'total_expenses': 121.0}), key)
+
+    def test_get_advice_is_served_from_the_cache(self):
+        with mock.patch.object(fakes.GenerativeModel, 'generate_content', wraps=fakes.GenerativeModel().generate_content) as generate:
+            first = services.FinancialAdvisor.get_advice(self.user, 'How can I save more?')
+            second = services.FinancialAdvisor.get_advice(self.user, 'how can I save more')
+        self.assertEqual(first, second)
+        self.assertEqual(first['advice'], fakes.RESPONSE_TEXT)
+        self.assertEqual(generate.call_count, 1)
+        self.assertEqual((advice_cache.hits, advice_cache.misses), (1, 1))
+
+    def test_ttl_expiry(self):
+        cache = AdviceCache(max_entries=10, ttl=60)
+        cache.set(1, 'key', 'advice')
+        self.assertEqual(cache.get('key'), 'advice')
+        with mock.patch('time.monotonic', return_value=time.monotonic() + 61):
+            self.assertIsNone(cache.get('key'))
+        self.assertEqual(cache.stats()['entries'], 0)
+
+    def test_least_recently_used_is_evicted(self):
+        cache = AdviceCache(max_entries=2, ttl=60)
+        cache.set(1, 'a', 'A')
+        cache.set(1, 'b', 'B')
+        cache.get('a')
+        cache.set(2, 'c', 'C')
+        self.assertEqual((cache.get('a'), cache.get('b'), cache.get('c')), ('A', None, 'C'))
+        self.assertEqual(cache.evictions, 1)
+        # The evicted key no longer counts as the user's
+        cache.invalidate_user(1)
+        self.assertEqual(cache.invalidations, 1)
+
+    def test_disabled_with_no_room(self):
+        cache = AdviceCache(max_entries=0, ttl=60)
+        cache.set(1, 'key', 'advice')
+        self.assertIsNone(cache.get('key'))
+
+    def test_writes_invalidate_the_users_entries(self):
+        other = User.objects.create_user(username='unaffected', password='pass12345')
+        category = Category.objects.create(user=self.user, name='Food', type='expense')
+
+        def write_transaction():
+            Transaction.objects.create(user=self.user, type='expense', amount=Decimal('5'), date=date(2025, 1, 1))
+
+        writes = {
+            'transaction save': write_transaction,
+            'transaction delete': lambda: Transaction.objects.filter(user=self.user).first().delete(),
+            'import': lambda: save_transactions(self.user, [
+                Transaction(user=self.user, type='expense', amount=Decimal('1'), date=date(2025, 1, 2)),
+            ]),
+            'category save': lambda: category.save(),
+            'budget save': lambda: Budget.objects.create(
+                user=self.user, month=date(2025, 1, 1), budget_amount=Decimal('100'),
+            ),
+            'budget delete': lambda: Budget.objects.get(user=self.user).delete(),
+            'category delete': lambda: category.delete(),
+        }
+        for label, write in writes.items():
+            with self.subTest(write=label):
+                advice_cache.set(self.user.pk, 'mine', 'advice')
+                advice_cache.set(other.pk, 'theirs', 'advice')
+                write()
+                self.assertIsNone(advice_cache.get('mine'))
+                self.assertEqual(advice_cache.get('theirs'), 'advice')
+
+    def test_stats(self):
+        cache = AdviceCache(max_entries=1, ttl=30)
+        cache.get('missing')
+        cache.set(1, 'a', 'A', cost=1.5)
+        cache.get('a')
+        cache.get('a')
+        cache.set(1, 'b', 'B')
+        cache.invalidate_user(1)
+        self.assertEqual(cache.stats(), {
+            'entries': 0,
+            'max_entries': 1,
+            'ttl_seconds': 30,
+            'hits': 2,
+            'misses': 1,
+            'hit_ratio': 0.6667,
+            'evictions': 1,
+            'invalidations': 1,
+            'model_seconds_saved': 3.0,
+        })
+
+    def test_stats_endpoint_is_staff_only(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(client.get(reverse('ai:advice-cache-stats')).status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        response = client.get(reverse('ai:advice-cache-stats'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, advice_cache.stats())
+
+
+@override_settings(AI_CONTEXT_WINDOWS=[30, 90], AI_CONTEXT_TOP_CATEGORIES=2)
+class FinancialContextTests(TestCase):
+    TODAY = date(2025, 6, 17)  # 30-day window from 2025-05-18, 90-day from 2025-03-19
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='advised', password='pass12345')
+        food = Category.objects.create(user=self.user, name='Food', type='expense')
+        rent = Category.objects.create(user=self.user, name='Rent', type='expense')
+        fun = Category.objects.create(user=self.user, name='Fun', type='expense')
+        for txn_type, amount, day, category in (
+            ('expense', '100', date(2025, 6, 10), food),
+            ('expense', '50', date(2025, 6, 1), rent),
+            ('expense', '40', date(2025, 5, 20), food),
+            ('expense', '25', date(2025, 5, 18), fun),     # first day of the 30-day window
+            ('expense', '30', date(2025, 5, 17), None),    # last day of the one before
+            ('expense', '60', date(2025, 5, 1), food),
+            ('income', '1000', date(2025, 6, 5), None),
+            ('income', '500', date(2025, 4, 20), None),
+            ('expense', '200', date(2025, 1, 10), rent),   # before the 90-day window
+            ('expense', '999', date(2024, 6, 1), rent),    # outside every window
+        ):
+            Transaction.objects.create(user=self.user, type=txn_type, amount=Decimal(amount), date=day, category=category)
+        Budget.objects.create(user=self.user, month=date(2025, 6, 1), budget_amount=Decimal('300'))
+
+    def context(self, today=TODAY):
+        return services.FinancialAdvisor.get_user_financial_context(self.user, today=today)
+
+    def test_windows_and_trends(self):
+        context = self.context()
+        self.assertEqual(
+            {key: context[key] for key in ('window_days', 'total_income', 'total_expenses', 'balance', 'transaction_count')},
+            {'window_days': 30, 'total_income': 1000.0, 'total_expenses': 215.0, 'balance': 785.0, 'transaction_count': 5},
+        )
+        self.assertEqual(context['top_expenses'], [
+            {'category__name': 'Food', 'total': 140.0},
+            {'category__name': 'Rent', 'total': 50.0},
+        ])
+        self.assertEqual(context['trends'], [
+            # Previous 30 days: 500 income, 90 expenses
+            {'days': 30, 'income': 1000.0, 'expenses': 215.0, 'income_change_pct': 100.0, 'expense_change_pct': 138.9},
+            # Previous 90 days: no income, so no percentage
+            {'days': 90, 'income': 1500.0, 'expenses': 305.0, 'income_change_pct': None, 'expense_change_pct': 52.5},
+        ])
+
+    def test_month_to_date_projection(self):
+        self.assertEqual(self.context()['month_to_date'], {
+            'spent': 150.0, 'budget': 300.0, 'percentage_used': 50.0,
+            'projected': 264.71,  # 150 / 17 days * 30
+        })
+        # No budget for July, and nothing spent yet
+        self.assertEqual(self.context(today=date(2025, 7, 1))['month_to_date'], {
+            'spent': 0.0, 'budget': None, 'percentage_used': None, 'projected': 0.0,
+        })
+
+    def test_context_cost_is_fixed(self):
+        with CaptureQueriesContext(connection) as few:
+            self.context()
+        with override_settings(AI_CONTEXT_WINDOWS=[7, 30, 90, 365, 730]), CaptureQueriesContext(connection) as many:
+            self.context()
+        self.assertEqual(len(many), len(few))
+
+    def prompt(self, max_chars, question='How do I save?', **settings):
+        with override_settings(AI_PROMPT_MAX_CHARS=max_chars, **settings):
+            return services.FinancialAdvisor.build_prompt(self.user, question, self.context())
+
+    SECTIONS = ('This Month So Far:', 'Top Expense Categories:', 'Trends (vs. the preceding period of the same length):')
+
+    def sections(self, prompt):
+        return [heading for heading in self.SECTIONS if heading in prompt]
+
+    def test_full_prompt(self):
+        prompt = self.prompt(100_000)
+        self.assertEqual(self.sections(prompt), list(self.SECTIONS))
+        positions = [prompt.index(heading) for heading in self.SECTIONS]
+        self.assertEqual(positions, sorted(positions))
+        self.assertIn('- Spent ₹150.00, on track for ₹264.71 by month end (50.0% of the ₹300.00 budget used)', prompt)
+        self.assertIn('- Last 90 days: income ₹1,500.00 (n/a), expenses ₹305.00 (+52.5%)', prompt)
+        self.assertTrue(prompt.rstrip().endswith('4-5 sentence.'))
+
+    def test_trimming_drops_optional_sections_from_the_end(self):
+        full = self.prompt(100_000)
+        bare = self.prompt(0)
+        self.assertEqual(self.sections(bare), [])
+        self.assertIn('User Question: How do I save?', bare)
+
+        seen = set()
+        for limit in range(len(bare), len(full) + 1, 7):
+            prompt = self.prompt(limit)
+            sections = self.sections(prompt)
+            # Always a prefix of the priority order, and within the limit
+            self.assertEqual(sections, list(self.SECTIONS[:len(sections)]), limit)
+            self.assertLessEqual(len(prompt), limit)
+            if sections and sections[-1] == self.SECTIONS[1]:
+                # Categories are cut line by line; trends need room for a whole line
+                self.assertNotIn('Trends', prompt)
+            seen.add(len(sections))
+        self.assertEqual(seen, {0, 1, 2, 3})
+
+    def test_question_is_cut(self):
+        prompt = self.prompt(100_000, question='x' * 50, AI_QUESTION_MAX_CHARS=10)
+        self.assertIn('User Question: ' + 'x' * 10 + '\n', prompt)
+        self.assertNotIn('x' * 11, prompt)
+
+
+@override_settings(GEMINI_CLIENT='apps.ai.fakes', GEMINI_MODEL='', GEMINI_MODEL_CACHE_TTL=3600)
+class ModelResolutionTests(TestCase):
+    def setUp(self):
+        services.reset_model_cache()
+        self.addCleanup(services.reset_model_cache)
+        stdout = redirect_stdout(io.StringIO())
+        stdout.__enter__()
+        self.addCleanup(stdout.__exit__, None, None, None)
+        patcher = mock.patch.object(fakes, 'list_models', wraps=fakes.list_models)
+        self.list_models = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def later(self, seconds):
+        return mock.patch('time.monotonic', return_value=time.monotonic() + seconds)
+
+    def test_nothing_is_imported_or_fetched_at_module_load(self):
+        script = (
+            "import sys, django; django.setup()\n"
+            "import apps.ai.services, apps.ai.views, config.urls\n"
+            "from apps.ai import services\n"
+            "print(services._client is None, services._model_cache['model'] is None,\n"
+            "      'apps.ai.fakes' in sys.modules, 'google.generativeai' in sys.modules)\n"
+        )
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'config.settings', 'GEMINI_CLIENT': 'apps.ai.fakes'}
+        result = subprocess.run(
+            [sys.executable, '-c', script], env=env, capture_output=True, text=True, cwd=settings.BASE_DIR,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.split(), ['True', 'True', 'False', 'False'])
+
+    def test_resolved_on_first_use_and_cached(self):
+        self.list_models.assert_not_called()
+        model = services.get_model()
+        self.assertEqual(model.model_name, 'gemini-2.5-flash')
+        self.assertIs(services.get_model(), model)
+        self.assertEqual(self.list_models.call_count, 1)
+
+    @override_settings(GEMINI_MODEL='gemini-pinned')
+    def test_pinned_model_skips_discovery(self):
+        self.assertEqual(services.get_model().model_name, 'gemini-pinned')
+        with self.later(4000):
+            self.assertEqual(services.get_model().model_name, 'gemini-pinned')
+        self.list_models.assert_not_called()
+
+    def test_refreshed_after_the_ttl(self):
+        model = services.get_model()
+        with self.later(3599):
+            self.assertIs(services.get_model(), model)
+        self.assertEqual(self.list_models.call_count, 1)
+        with mock.patch.object(fakes, 'MODEL_NAMES', ['models/gemini-2.5-pro']), self.later(3601):
+            self.assertEqual(services.get_model().model_name, 'gemini-2.5-pro')
+        self.assertEqual(self.list_models.call_count, 2)
+
+    def test_failed_lookup_falls_back_and_retries_sooner(self):
+        self.list_models.side_effect = ConnectionError('offline')
+        model = services.get_model()
+        self.assertEqual(model.model_name, services.FALLBACK_MODEL)
+        with self.later(services.FALLBACK_RETRY_SECONDS - 1):
+            self.assertIs(services.get_model(), model)
+        self.assertEqual(self.list_models.call_count, 1)
+
+        self.list_models.side_effect = None
+        with mock.patch.object(fakes, 'MODEL_NAMES', ['models/gemini-2.5-pro']), \
+                self.later(services.FALLBACK_RETRY_SECONDS + 1):
+            self.assertEqual(services.get_model().model_name, 'gemini-2.5-pro')
+        self.assertEqual(self.list_models.call_count, 2)
+
+    def test_concurrent_first_calls_resolve_once(self):
+        start = threading.Barrier(8)
+        models = []
+
+        def resolve():
+            start.wait()
+            models.append(services.get_model())
+
+        threads = [threading.Thread(target=resolve) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.list_models.call_count, 1)
+        self.assertEqual(len({id(model) for model in models}), 1)
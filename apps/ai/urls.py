@@ -5,4 +5,7 @@ app_name = 'ai'
 
 urlpatterns = [
     path('advice/', views.get_financial_advice, name='financial-advice'),
-]
\ No newline at end of file
+    path('advice/stream/', views.stream_financial_advice, name='financial-advice-stream'),
+    path('advice/jobs/<uuid:job_id>/', views.advice_job, name='advice-job'),
+    path('cache/stats/', views.advice_cache_stats, name='advice-cache-stats'),
+]
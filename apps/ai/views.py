@@ -1,11 +1,22 @@
-from django.shortcuts import render
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
 
 # Create your views here.
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
+from apps.users.authentication import authenticate
 from .services import FinancialAdvisor
+from .cache import advice_cache
+from . import jobs
+from .models import AdviceJob
+from .serializers import AdviceJobSerializer
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -15,6 +26,10 @@ def get_financial_advice(request):
     
     POST /api/ai/advice/
     Body: { "question": "How can I save more money?" }
+    
+    Add "async": true to queue the request instead of waiting for the
+    model. The response is 202 with a job to poll at
+    GET /api/ai/advice/jobs/<id>/.
     """
     question = request.data.get('question')
     
@@ -24,6 +39,18 @@ def get_financial_advice(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
+    if str(request.data.get('async', '')).lower() in ('1', 'true'):
+        try:
+            job = jobs.submit(request.user, question)
+        except jobs.JobRejected as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_429_TOO_MANY_REQUESTS
+            )
+        data = AdviceJobSerializer(job).data
+        data['poll_url'] = request.build_absolute_uri(reverse('ai:advice-job', args=[job.pk]))
+        return Response(data, status=status.HTTP_202_ACCEPTED)
+    
     # Get AI advice
     result = FinancialAdvisor.get_advice(request.user, question)
     
@@ -35,4 +62,124 @@ def get_financial_advice(request):
         return Response(
             {'error': result['error']},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
\ No newline at end of file
+        )
+
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def advice_job(request, job_id):
+    """
+    Poll or cancel an async advice job
+    
+    GET /api/ai/advice/jobs/<id>/     -> job status, plus advice once done
+    DELETE /api/ai/advice/jobs/<id>/  -> cancel a pending or running job
+    """
+    jobs.expire_stale(request.user)
+    job = get_object_or_404(AdviceJob, pk=job_id, user=request.user)
+    
+    if request.method == 'DELETE':
+        if not jobs.cancel(job):
+            return Response(
+                {'error': f'Job already {job.status}'},
+                status=status.HTTP_409_CONFLICT
+            )
+        job.refresh_from_db()
+    
+    return Response(AdviceJobSerializer(job).data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def advice_cache_stats(request):
+    """
+    Advice cache hit/miss counters for this worker process (staff only)
+    
+    GET /api/ai/cache/stats/
+    """
+    return Response(advice_cache.stats())
+
+
+def sse(event, data):
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def advice_events(prompt):
+    """Advice for ``prompt`` as a stream of SSE messages."""
+    try:
+        for text in FinancialAdvisor.stream_advice(prompt):
+            yield sse('chunk', {'text': text})
+    except Exception as e:
+        yield sse('error', {'error': str(e)})
+        return
+    yield sse('done', {})
+
+
+async def advice_events_async(prompt):
+    """
+    Async wrapper around advice_events() for ASGI.
+    
+    Each blocking step of the SDK stream runs in a worker thread, so the
+    event loop keeps serving other connections while Gemini generates.
+    """
+    events = advice_events(prompt)
+    next_event = sync_to_async(next, thread_sensitive=False)
+    while True:
+        event = await next_event(events, None)
+        if event is None:
+            return
+        yield event
+
+
+async def stream_financial_advice(request):
+    """
+    Stream AI financial advice as Server-Sent Events
+    
+    GET  /api/ai/advice/stream/?question=How+can+I+save+more
+    POST /api/ai/advice/stream/
+    Body: { "question": "How can I save more money?" }
+    
+    Emits "chunk" events ({"text": ...}) as the model writes, then a
+    single "done" or "error" event. Under ASGI the stream is fully
+    asynchronous; under WSGI it falls back to a regular iterator.
+    """
+    if request.method not in ('GET', 'POST'):
+        return HttpResponseNotAllowed(['GET', 'POST'])
+    
+    user = await sync_to_async(authenticate)(request)
+    if user is None:
+        return JsonResponse(
+            {'detail': 'Authentication credentials were not provided.'},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+    
+    if request.method == 'POST':
+        try:
+            question = json.loads(request.body or b'{}').get('question')
+        except (ValueError, AttributeError):
+            question = None
+    else:
+        question = request.GET.get('question')
+    
+    if not question:
+        return JsonResponse(
+            {'error': 'Question is required'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    prompt = await sync_to_async(FinancialAdvisor.build_prompt)(user, question)
+    
+    if isinstance(request, ASGIRequest):
+        events = advice_events_async(prompt)
+    else:
+        events = advice_events(prompt)
+    
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # stop reverse proxies from buffering
+    return response
+
+
+# Token authentication only, no session cookies involved. Set directly
+# because Django's view decorators wrap async views in sync functions.
+stream_financial_advice.csrf_exempt = True
@@ -1,9 +1,17 @@
 from django.contrib import admin
-from .models import Budget
+from .models import Budget, BudgetAlert
 
 @admin.register(Budget)
 class BudgetAdmin(admin.ModelAdmin):
     list_display = ['user', 'month', 'budget_amount', 'created_at']
     list_filter = ['month', 'created_at']
     search_fields = ['user__username']
-    date_hierarchy = 'month'
\ No newline at end of file
+    date_hierarchy = 'month'
+
+
+@admin.register(BudgetAlert)
+class BudgetAlertAdmin(admin.ModelAdmin):
+    list_display = ['user', 'month', 'threshold', 'spent', 'budget_amount', 'created_at']
+    list_filter = ['threshold', 'month']
+    search_fields = ['user__username']
+    raw_id_fields = ['budget']
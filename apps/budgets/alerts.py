@@ -0,0 +1,80 @@
+"""
+Budget threshold alerts.
+
+``evaluate()`` runs inside the write that changed a month's spending or
+budget (see signals.py). It reads the month's running expense total from
+the monthly rollup, which the transactions app's receivers have already
+updated, compares it with the budget and records every threshold crossed
+since the last alert. One query covers all the months a write touched,
+and a BudgetAlert is inserted only when a new threshold is crossed. The
+unique (budget, threshold) constraint on uncleared alerts makes
+concurrent evaluations harmless: the second insert is ignored.
+
+When spending falls back below a threshold (a deleted or reduced
+expense, a raised budget), its alert is cleared. It stays in the feed,
+and crossing the threshold again records a new alert. A budget moved to
+another month has all its alerts cleared (``clear()``) and starts over.
+"""
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from apps.transactions.rollups import CENT, month_expenses_subquery, month_start
+from .models import Budget, BudgetAlert
+
+
+def crossed(spent, budget_amount, thresholds):
+    """Thresholds (percent) that ``spent`` has reached."""
+    if budget_amount <= 0:
+        return []
+    return [threshold for threshold in thresholds if spent * 100 >= budget_amount * threshold]
+
+
+def evaluate(user_id, dates):
+    """
+    Record new threshold crossings for the user's budgets in the months of
+    ``dates``, and clear the alerts of thresholds no longer reached.
+    """
+    to_date = Budget._meta.get_field('month').to_python
+    months = {month_start(to_date(value)) for value in dates}
+    if not months:
+        return []
+
+    thresholds = sorted(settings.BUDGET_ALERT_THRESHOLDS)
+    last_alert = (
+        BudgetAlert.objects.filter(budget=OuterRef('pk'), cleared_at__isnull=True)
+        .order_by('-threshold').values('threshold')[:1]
+    )
+    budgets = Budget.objects.filter(user_id=user_id, month__in=months).annotate(
+        month_expenses=month_expenses_subquery(),
+        last_threshold=Subquery(last_alert),
+    )
+
+    alerts = []
+    for budget in budgets:
+        # SQLite sums decimals as floats
+        spent = Decimal(budget.month_expenses or 0).quantize(CENT)
+        reached = crossed(spent, budget.budget_amount, thresholds)
+        last_threshold = budget.last_threshold or 0
+        if last_threshold > max(reached, default=0):
+            BudgetAlert.objects.filter(
+                budget=budget, cleared_at__isnull=True, threshold__gt=max(reached, default=0)
+            ).update(cleared_at=timezone.now())
+            last_threshold = max(reached, default=0)
+        for threshold in reached:
+            if threshold > last_threshold:
+                alerts.append(BudgetAlert(
+                    user_id=user_id, budget=budget, month=budget.month, threshold=threshold,
+                    spent=spent, budget_amount=budget.budget_amount,
+                ))
+    if alerts:
+        BudgetAlert.objects.bulk_create(alerts, ignore_conflicts=True)
+    return alerts
+
+
+def clear(budget):
+    """Clear all of ``budget``'s alerts, e.g. when it moves to another month."""
+    return BudgetAlert.objects.filter(budget=budget, cleared_at__isnull=True).update(cleared_at=timezone.now())
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class BudgetsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.budgets'
+
+    def ready(self):
+        from . import signals  # noqa: F401
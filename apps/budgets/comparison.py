@@ -0,0 +1,142 @@
+"""
+Budget vs. actual over a month or a range of months.
+
+Expenses per month and category come from the monthly rollup. The
+budgets of the range are appended to the same statement with UNION ALL,
+so a quarter costs one query just like a single month does, and months
+that have a budget but no expenses yet still show up.
+"""
+
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db.models import CharField, DecimalField, F, IntegerField, Sum, Value
+
+from apps.transactions.models import MonthlyRollup
+from apps.transactions.rollups import CENT, month_start, next_month
+from .models import Budget
+
+
+def parse_month(value):
+    """First day of the month named by ``YYYY-MM`` or ``YYYY-MM-DD``."""
+    for fmt in ('%Y-%m', '%Y-%m-%d'):
+        try:
+            return month_start(datetime.strptime(value, fmt).date())
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid month: {value}. Use YYYY-MM.")
+
+
+def current_month():
+    today = datetime.now().date()
+    return date(today.year, today.month, 1)
+
+
+def months_between(start, end):
+    """Month starts from ``start`` to ``end``, inclusive."""
+    months = []
+    month = start
+    while month <= end:
+        months.append(month)
+        month = next_month(month)
+    return months
+
+
+def rows(user, start, end):
+    """
+    ``(month, category_id, category_name, expenses, budget_amount)`` rows.
+
+    Expense rows carry a NULL budget and budget rows NULL expenses; both
+    halves select the same columns in the same order, as UNION requires.
+    """
+    amount = DecimalField(max_digits=12, decimal_places=2)
+    expenses = (
+        MonthlyRollup.objects.filter(user=user, type='expense', month__gte=start, month__lte=end)
+        .order_by()
+        .values('month', 'category_id', 'category__name')
+        .annotate(expenses=Sum('total'), budget=Value(None, output_field=amount))
+    )
+    budgets = (
+        Budget.objects.filter(user=user, month__gte=start, month__lte=end)
+        .order_by()
+        .annotate(
+            no_category=Value(None, output_field=IntegerField()),
+            no_name=Value(None, output_field=CharField()),
+            no_expenses=Value(None, output_field=amount),
+            budget=F('budget_amount'),
+        )
+        .values('month', 'no_category', 'no_name', 'no_expenses', 'budget')
+    )
+    for row in expenses.union(budgets, all=True):
+        yield row['month'], row['category_id'], row['category__name'], row['expenses'], row['budget']
+
+
+def summarize(budget_amount, category_totals):
+    """Budget vs. actual figures for one month or the whole range."""
+    actual = sum(category_totals.values(), Decimal('0')).quantize(CENT)
+    by_category = [
+        {
+            'category_id': category_id,
+            'category_name': name or 'Uncategorized',
+            'amount': str(total),
+            'percentage': round(float(total / actual * 100), 2) if actual > 0 else 0,
+        }
+        for (category_id, name), total in sorted(
+            category_totals.items(), key=lambda item: (-item[1], item[0][1] or '')
+        )
+    ]
+    if budget_amount is None:
+        remaining = percentage_used = None
+    else:
+        remaining = str(budget_amount - actual)
+        percentage_used = round(float(actual / budget_amount * 100), 2) if budget_amount > 0 else 0
+    return {
+        'budget_amount': None if budget_amount is None else str(budget_amount),
+        'actual_expenses': str(actual),
+        'remaining': remaining,
+        'percentage_used': percentage_used,
+        'by_category': by_category,
+    }
+
+
+def compare(user, start, end):
+    """
+    Budget vs. actual for the months ``start`` to ``end``, inclusive.
+
+    Returns None if none of the months has a budget. Otherwise the range
+    totals and a ``months`` list with the same figures per month; months
+    without a budget report ``budget_amount`` and ``remaining`` as null.
+    The range totals compare the budgets with the expenses of the
+    budgeted months only; what was spent in the other months is reported
+    separately as ``unbudgeted_expenses``.
+    """
+    budgets = {}
+    expenses = defaultdict(lambda: defaultdict(Decimal))
+    for month, category_id, category_name, amount, budget in rows(user, start, end):
+        if budget is not None:
+            budgets[month] = Decimal(budget).quantize(CENT)
+        else:
+            # SQLite sums decimals as floats
+            expenses[month][(category_id, category_name)] += Decimal(amount).quantize(CENT)
+    if not budgets:
+        return None
+
+    range_totals = defaultdict(Decimal)
+    unbudgeted = Decimal('0')
+    months = []
+    for month in months_between(start, end):
+        if month in budgets:
+            for key, total in expenses[month].items():
+                range_totals[key] += total
+        else:
+            unbudgeted += sum(expenses[month].values(), Decimal('0'))
+        months.append({'month': month.isoformat(), **summarize(budgets.get(month), expenses[month])})
+
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        **summarize(sum(budgets.values(), Decimal('0')), range_totals),
+        'unbudgeted_expenses': str(unbudgeted.quantize(CENT)),
+        'months': months,
+    }
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.25 on 2026-10-18 03:01
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('budgets', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BudgetAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('threshold', models.PositiveSmallIntegerField(help_text='Percent of the budget')),
+                ('spent', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('budget_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('budget', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='budgets.budget')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='budget_alerts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['user', '-id'], name='budget_alert_user_feed')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='budgetalert',
+            constraint=models.UniqueConstraint(fields=('budget', 'threshold'), name='unique_budget_alert_threshold'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.25 on 2026-10-18 03:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budgets', '0002_budgetalert'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='budgetalert',
+            name='unique_budget_alert_threshold',
+        ),
+        migrations.AddField(
+            model_name='budgetalert',
+            name='cleared_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='budgetalert',
+            constraint=models.UniqueConstraint(condition=models.Q(('cleared_at__isnull', True)), fields=('budget', 'threshold'), name='unique_budget_alert_threshold'),
+        ),
+    ]
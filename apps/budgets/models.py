@@ -20,4 +20,38 @@ class Budget(models.Model):
         ordering = ['-month']
     
     def __str__(self):
-        return f"{self.user.username} - {self.month.strftime('%B %Y')} - ₹{self.budget_amount}"
\ No newline at end of file
+        return f"{self.user.username} - {self.month.strftime('%B %Y')} - ₹{self.budget_amount}"
+
+
+class BudgetAlert(models.Model):
+    """
+    A budget's spending crossed one of BUDGET_ALERT_THRESHOLDS (percent).
+    
+    Recorded with the spending and budget amount at the moment it was
+    crossed. When spending falls back below the threshold the alert is
+    cleared (``cleared_at``), so crossing it again records a new one; a
+    budget has at most one uncleared alert per threshold.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='budget_alerts')
+    budget = models.ForeignKey(Budget, on_delete=models.CASCADE, related_name='alerts')
+    month = models.DateField()
+    threshold = models.PositiveSmallIntegerField(help_text="Percent of the budget")
+    spent = models.DecimalField(max_digits=12, decimal_places=2)
+    budget_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+    cleared_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-id']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['budget', 'threshold'], condition=models.Q(cleared_at__isnull=True),
+                name='unique_budget_alert_threshold',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-id'], name='budget_alert_user_feed'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.month.strftime('%B %Y')} - {self.threshold}%"
@@ -1,8 +1,6 @@
 from rest_framework import serializers
-from .models import Budget
-from django.db.models import Sum
-from apps.transactions.models import Transaction
-from datetime import datetime
+from .models import Budget, BudgetAlert
+from apps.transactions import rollups
 
 class BudgetSerializer(serializers.ModelSerializer):
     """
@@ -21,40 +19,35 @@ class BudgetSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
     
+    def update(self, instance, validated_data):
+        instance = super().update(instance, validated_data)
+        # The month may have changed; drop the precomputed total
+        instance.__dict__.pop('month_expenses', None)
+        return instance
+    
+    def month_expenses(self, obj):
+        """
+        Expenses for the budget month.
+        
+        BudgetViewSet annotates ``month_expenses`` onto every budget in one
+        query; objects without it are looked up once and cached, so the
+        three computed fields never cost more than a single query.
+        """
+        if not hasattr(obj, 'month_expenses'):
+            obj.month_expenses = rollups.month_expenses(obj.user_id, obj.month)
+        return obj.month_expenses or 0
+    
     def get_actual_expenses(self, obj):
         """
         Calculate actual expenses for the budget month.
         """
-        # Get start and end of month
-        year = obj.month.year
-        month = obj.month.month
-        
-        # Get next month for end date
-        if month == 12:
-            next_month = 1
-            next_year = year + 1
-        else:
-            next_month = month + 1
-            next_year = year
-        
-        start_date = datetime(year, month, 1).date()
-        end_date = datetime(next_year, next_month, 1).date()
-        
-        # Sum expenses for the month
-        expenses = Transaction.objects.filter(
-            user=obj.user,
-            type='expense',
-            date__gte=start_date,
-            date__lt=end_date
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        return str(expenses)
+        return str(self.month_expenses(obj))
     
     def get_remaining(self, obj):
         """
         Calculate remaining budget.
         """
-        actual = float(self.get_actual_expenses(obj))
+        actual = float(self.month_expenses(obj))
         budget = float(obj.budget_amount)
         remaining = budget - actual
         return str(remaining)
@@ -63,11 +56,30 @@ class BudgetSerializer(serializers.ModelSerializer):
         """
         Calculate percentage of budget used.
         """
-        actual = float(self.get_actual_expenses(obj))
+        actual = float(self.month_expenses(obj))
         budget = float(obj.budget_amount)
         
         if budget == 0:
             return 0
         
         percentage = (actual / budget) * 100
-        return round(percentage, 2)
\ No newline at end of file
+        return round(percentage, 2)
+
+
+class BudgetAlertSerializer(serializers.ModelSerializer):
+    """
+    A threshold crossing, with the figures at the time it happened.
+    """
+    percentage_used = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = BudgetAlert
+        fields = [
+            'id', 'budget', 'month', 'threshold', 'spent', 'budget_amount', 'percentage_used', 'created_at', 'cleared_at',
+        ]
+        read_only_fields = fields
+    
+    def get_percentage_used(self, obj):
+        if obj.budget_amount == 0:
+            return 0
+        return round(float(obj.spent / obj.budget_amount * 100), 2)
@@ -0,0 +1,63 @@
+"""
+Evaluate budget alerts from the write path.
+
+The transactions app is installed before this one, so its rollup
+receivers have already applied a write by the time these run.
+"""
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from apps.transactions.models import Transaction
+from apps.sync.changes import deleting_user
+from apps.transactions.signals import transactions_bulk_created
+from . import alerts
+from .models import Budget
+
+
+@receiver(post_save, sender=Transaction)
+def evaluate_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # The month the transaction is in now, and the month it left (loaded
+    # by the rollup's pre_save handler), if either was an expense
+    dates = [instance.date] if instance.type == 'expense' else []
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous is not None and previous[3] == 'expense':
+        dates.append(previous[1])
+    alerts.evaluate(instance.user_id, dates)
+
+
+@receiver(post_delete, sender=Transaction)
+def evaluate_on_delete(sender, instance, origin=None, **kwargs):
+    # Nothing to evaluate when the whole user is being deleted
+    if instance.type == 'expense' and not deleting_user(origin):
+        alerts.evaluate(instance.user_id, [instance.date])
+
+
+@receiver(transactions_bulk_created, sender=Transaction)
+def evaluate_on_bulk_create(sender, user, transactions, **kwargs):
+    alerts.evaluate(user.pk, {instance.date for instance in transactions if instance.type == 'expense'})
+
+
+@receiver(pre_save, sender=Budget)
+def remember_previous_month(sender, instance, raw=False, **kwargs):
+    instance._alerts_previous_month = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._alerts_previous_month = (
+        Budget.objects.filter(pk=instance.pk).values_list('month', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Budget)
+def evaluate_on_budget_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    months = [instance.month]
+    previous = getattr(instance, '_alerts_previous_month', None)
+    if previous is not None and previous != sender._meta.get_field('month').to_python(instance.month):
+        # The old month's alerts don't apply to the new one
+        alerts.clear(instance)
+        months.append(previous)
+    alerts.evaluate(instance.user_id, months)
@@ -1,3 +1,205 @@
-from django.test import TestCase
+from datetime import date
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.transactions.importers import save_transactions
+from apps.transactions.models import Transaction
+from .models import Budget, BudgetAlert
+
+
+class BudgetListQueryCountTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='budgeter', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_month(self, month):
+        Budget.objects.create(user=self.user, month=date(2025, month, 1), budget_amount=Decimal('1000'))
+        Transaction.objects.create(
+            user=self.user, type='expense', amount=Decimal('250'), date=date(2025, month, 10)
+        )
+
+    def count_list_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('budgets:budget-list'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response.data
+
+    def test_list_query_count_does_not_grow_with_months(self):
+        self.add_month(1)
+        single, _ = self.count_list_queries()
+
+        for month in range(2, 13):
+            self.add_month(month)
+        many, data = self.count_list_queries()
+
+        self.assertEqual(single, many)
+        self.assertEqual(len(data), 12)
+        for budget in data:
+            self.assertEqual(Decimal(budget['actual_expenses']), Decimal('250'))
+            self.assertEqual(budget['percentage_used'], 25.0)
+
+
+class ComparisonTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='comparer', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def spend(self, month, amount):
+        Transaction.objects.create(user=self.user, type='expense', amount=Decimal(amount), date=date(2025, month, 5))
+
+    def test_range_with_an_unbudgeted_month(self):
+        for month in (1, 3):
+            Budget.objects.create(user=self.user, month=date(2025, month, 1), budget_amount=Decimal('100'))
+        self.spend(1, '40')
+        self.spend(2, '500')
+        self.spend(3, '60.50')
+
+        response = self.client.get(reverse('budgets:budget-comparison'), {'start': '2025-01', 'end': '2025-03'})
+        self.assertEqual(response.status_code, 200)
+        data = response.data
+        self.assertEqual(data['budget_amount'], '200.00')
+        self.assertEqual(data['actual_expenses'], '100.50')
+        self.assertEqual(data['remaining'], '99.50')
+        self.assertEqual(data['percentage_used'], 50.25)
+        self.assertEqual(data['unbudgeted_expenses'], '500.00')
+        self.assertEqual(
+            [(month['budget_amount'], month['actual_expenses']) for month in data['months']],
+            [('100.00', '40.00'), (None, '500.00'), ('100.00', '60.50')],
+        )
+
+
+@override_settings(BUDGET_ALERT_THRESHOLDS=[50, 80, 100])
+class BudgetAlertTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alerted', password='pass12345')
+        self.budget = Budget.objects.create(user=self.user, month=date(2025, 5, 1), budget_amount=Decimal('100'))
+
+    def spend(self, amount, day=date(2025, 5, 10)):
+        return Transaction.objects.create(user=self.user, type='expense', amount=Decimal(amount), date=day)
+
+    def alerts(self):
+        return list(BudgetAlert.objects.order_by('id').values_list('threshold', 'spent', 'cleared_at'))
+
+    def active(self):
+        return sorted(
+            BudgetAlert.objects.filter(budget=self.budget, cleared_at__isnull=True).values_list('threshold', flat=True)
+        )
+
+    def test_crossing_fires_once(self):
+        self.spend('30')
+        self.assertEqual(self.alerts(), [])
+        self.spend('25')
+        self.assertEqual(self.alerts(), [(50, Decimal('55.00'), None)])
+        # Further spending below the next threshold adds nothing
+        self.spend('10')
+        self.spend('5')
+        self.assertEqual(self.active(), [50])
+        self.assertEqual(BudgetAlert.objects.count(), 1)
+
+    def test_one_write_can_cross_several_thresholds(self):
+        self.spend('120')
+        self.assertEqual(self.active(), [50, 80, 100])
+
+    def test_fires_again_after_dropping_below_and_recrossing(self):
+        first = self.spend('60')
+        self.assertEqual(self.active(), [50])
+
+        first.delete()
+        self.assertEqual(self.active(), [])
+        self.assertIsNotNone(BudgetAlert.objects.get().cleared_at)
+
+        self.spend('70')
+        self.assertEqual(self.active(), [50])
+        self.assertEqual(
+            [(threshold, cleared is None) for threshold, _, cleared in self.alerts()],
+            [(50, False), (50, True)],
+        )
+
+    def test_update_lowering_an_expense_clears_higher_thresholds(self):
+        txn = self.spend('90')
+        self.assertEqual(self.active(), [50, 80])
+        txn.amount = Decimal('60')
+        txn.save()
+        self.assertEqual(self.active(), [50])
+        txn.amount = Decimal('85')
+        txn.save()
+        self.assertEqual(self.active(), [50, 80])
+        self.assertEqual(BudgetAlert.objects.filter(threshold=80).count(), 2)
+
+    def test_moving_an_expense_out_of_the_month(self):
+        txn = self.spend('90')
+        txn.date = date(2025, 6, 1)
+        txn.save()
+        self.assertEqual(self.active(), [])
+
+        txn.date = date(2025, 5, 2)
+        txn.type = 'income'
+        txn.save()
+        self.assertEqual(self.active(), [])
+        txn.type = 'expense'
+        txn.save()
+        self.assertEqual(self.active(), [50, 80])
+
+    def test_budget_changes(self):
+        self.spend('90')
+        self.budget.budget_amount = Decimal('200')
+        self.budget.save()
+        self.assertEqual(self.active(), [])
+        self.budget.budget_amount = Decimal('90')
+        self.budget.save()
+        self.assertEqual(self.active(), [50, 80, 100])
+
+    def test_moving_the_budget_to_another_month(self):
+        self.spend('85')
+        self.spend('40', day=date(2025, 6, 3))
+        self.assertEqual(self.active(), [50, 80])
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.put(
+            reverse('budgets:budget-detail', args=[self.budget.pk]), {'month': '2025-06-01', 'budget_amount': '60'}
+        )
+        self.assertEqual(response.status_code, 200)
+        # May's alerts are cleared and June is evaluated on its own
+        self.assertEqual(
+            list(BudgetAlert.objects.filter(cleared_at__isnull=True).values_list('month', 'threshold', 'spent')),
+            [(date(2025, 6, 1), 50, Decimal('40.00'))],
+        )
+        self.assertEqual(BudgetAlert.objects.filter(month=date(2025, 5, 1), cleared_at__isnull=False).count(), 2)
+
+        # And further June spending raises June's next threshold
+        self.spend('10', day=date(2025, 6, 4))
+        self.assertEqual(self.active(), [50, 80])
+
+    def test_bulk_import(self):
+        save_transactions(self.user, [
+            Transaction(user=self.user, type='expense', amount=Decimal('45'), date=date(2025, 5, day))
+            for day in (1, 2)
+        ])
+        self.assertEqual(self.active(), [50, 80])
+
+    def test_deleting_the_user(self):
+        self.spend('90')
+        self.user.delete()
+        self.assertFalse(BudgetAlert.objects.exists())
+
+    def test_feed(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        txn = self.spend('60')
+        txn.delete()
+        self.spend('55')
+        response = client.get(reverse('budgets:budget-alerts'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(alert['threshold'], alert['cleared_at'] is None) for alert in response.data],
+                         [(50, True), (50, False)])
+        newest = response.data[0]['id']
+        self.assertEqual(client.get(reverse('budgets:budget-alerts'), {'since': newest}).data, [])
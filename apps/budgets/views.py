@@ -2,11 +2,13 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Sum
-from datetime import datetime
-from .models import Budget
-from .serializers import BudgetSerializer
-from apps.transactions.models import Transaction
+from django.conf import settings
+from .models import Budget, BudgetAlert
+from .comparison import compare, current_month, months_between, parse_month
+from .serializers import BudgetAlertSerializer, BudgetSerializer
+from apps.transactions import rollups
+from apps.sync.cache import cached
+from apps.sync.versions import conditional
 
 class BudgetViewSet(viewsets.ModelViewSet):
     """
@@ -19,8 +21,13 @@ class BudgetViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         """
         Only return budgets for the current user.
+        
+        Each budget is annotated with its month's expenses so the
+        serializer never has to query per budget.
         """
-        return Budget.objects.filter(user=self.request.user)
+        return Budget.objects.filter(user=self.request.user).annotate(
+            month_expenses=rollups.month_expenses_subquery()
+        )
     
     def perform_create(self, serializer):
         """
@@ -29,99 +36,119 @@ class BudgetViewSet(viewsets.ModelViewSet):
         serializer.save(user=self.request.user)
     
     @action(detail=False, methods=['get'])
+    @conditional
+    @cached
     def current(self, request):
         """
-        Get current month's budget.
+        Get current month's budget, or another month's.
         
-        Endpoint: GET /api/budgets/current/
+        Endpoint: GET /api/budgets/current/?month=YYYY-MM
         """
-        # Get first day of current month
-        today = datetime.now().date()
-        current_month = datetime(today.year, today.month, 1).date()
+        try:
+            month = parse_month(request.query_params['month'])
+        except KeyError:
+            month = current_month()
+        except ValueError as exc:
+            return Response({'month': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            budget = Budget.objects.get(user=request.user, month=current_month)
+            budget = self.get_queryset().get(month=month)
             serializer = self.get_serializer(budget)
             return Response(serializer.data)
         except Budget.DoesNotExist:
             return Response(
-                {'detail': 'No budget set for current month'},
+                {'detail': f"No budget set for {self.describe(request, month, month)}"},
                 status=status.HTTP_404_NOT_FOUND
             )
     
     @action(detail=False, methods=['get'])
+    @conditional
+    @cached
     def comparison(self, request):
         """
-        Get budget vs actual comparison for current month.
+        Get budget vs actual comparison for a month or a range of months.
         
         Endpoint: GET /api/budgets/comparison/
         
-        Returns:
+        Query params (default: the current month):
+            month: YYYY-MM
+            start, end: YYYY-MM, an inclusive range of months
+        
+        Returns the range totals plus the same figures per month:
         {
-            "budget_amount": "50000.00",
-            "actual_expenses": "28000.00",
+            "start": "2025-01-01",
+            "end": "2025-03-01",
+            "budget_amount": "150000.00",
+            "actual_expenses": "128000.00",
             "remaining": "22000.00",
-            "percentage_used": 56.0,
-            "by_category": [...]
+            "percentage_used": 85.33,
+            "by_category": [...],
+            "unbudgeted_expenses": "0.00",
+            "months": [{"month": "2025-01-01", "budget_amount": "50000.00", ...}, ...]
         }
         """
-        # Get first day of current month
-        today = datetime.now().date()
-        current_month = datetime(today.year, today.month, 1).date()
-        
         try:
-            budget = Budget.objects.get(user=request.user, month=current_month)
-        except Budget.DoesNotExist:
+            start, end = self.month_range(request)
+        except ValueError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        data = compare(request.user, start, end)
+        if data is None:
             return Response(
-                {'detail': 'No budget set for current month'},
+                {'detail': f"No budget set for {self.describe(request, start, end)}"},
                 status=status.HTTP_404_NOT_FOUND
             )
+        return Response(data)
+    
+    @action(detail=False, methods=['get'])
+    def alerts(self, request):
+        """
+        Budget threshold alerts, newest first.
         
-        # Calculate expenses by category
-        year = current_month.year
-        month = current_month.month
-        
-        # Get next month for end date
-        if month == 12:
-            next_month = 1
-            next_year = year + 1
-        else:
-            next_month = month + 1
-            next_year = year
-        
-        start_date = datetime(year, month, 1).date()
-        end_date = datetime(next_year, next_month, 1).date()
+        Endpoint: GET /api/budgets/alerts/?since=<id>&before=<id>&limit=<n>
         
-        # Group expenses by category
-        expenses_by_category = Transaction.objects.filter(
-            user=request.user,
-            type='expense',
-            date__gte=start_date,
-            date__lt=end_date
-        ).values(
-            'category__name', 'category__id'
-        ).annotate(
-            total=Sum('amount')
-        ).order_by('-total')
+        Poll with ``since`` set to the newest id already seen to receive
+        only new alerts; page back through older ones with ``before``.
+        """
+        try:
+            since = int(request.query_params.get('since') or 0)
+            before = int(request.query_params.get('before') or 0)
+            limit = int(request.query_params.get('limit') or settings.BUDGET_ALERTS_PAGE_SIZE)
+            if since < 0 or before < 0 or limit < 1:
+                raise ValueError
+        except ValueError:
+            return Response(
+                {'error': 'since, before and limit must be non-negative integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Calculate totals
-        total_expenses = sum(float(item['total']) for item in expenses_by_category)
-        budget_amount = float(budget.budget_amount)
-        remaining = budget_amount - total_expenses
-        percentage_used = (total_expenses / budget_amount * 100) if budget_amount > 0 else 0
+        alerts = BudgetAlert.objects.filter(user=request.user, id__gt=since)
+        if before:
+            alerts = alerts.filter(id__lt=before)
+        alerts = alerts.order_by('-id')[:min(limit, settings.BUDGET_ALERTS_PAGE_SIZE)]
+        return Response(BudgetAlertSerializer(alerts, many=True).data)
+    
+    def month_range(self, request):
+        """``(start, end)`` months requested by month= or start=/end=."""
+        params = request.query_params
+        if 'month' in params:
+            start = end = parse_month(params['month'])
+        elif 'start' in params or 'end' in params:
+            if not ('start' in params and 'end' in params):
+                raise ValueError("Pass both start and end.")
+            start, end = parse_month(params['start']), parse_month(params['end'])
+        else:
+            start = end = current_month()
         
-        return Response({
-            'budget_amount': str(budget.budget_amount),
-            'actual_expenses': str(total_expenses),
-            'remaining': str(remaining),
-            'percentage_used': round(percentage_used, 2),
-            'by_category': [
-                {
-                    'category_id': item['category__id'],
-                    'category_name': item['category__name'] or 'Uncategorized',
-                    'amount': str(item['total']),
-                    'percentage': round(float(item['total']) / total_expenses * 100, 2) if total_expenses > 0 else 0
-                }
-                for item in expenses_by_category
-            ]
-        })
\ No newline at end of file
+        if start > end:
+            raise ValueError("end must not be before start.")
+        if len(months_between(start, end)) > settings.BUDGET_COMPARISON_MAX_MONTHS:
+            raise ValueError(f"A range can span at most {settings.BUDGET_COMPARISON_MAX_MONTHS} months.")
+        return start, end
+    
+    def describe(self, request, start, end):
+        if not {'month', 'start', 'end'} & set(request.query_params):
+            return 'current month'
+        if start == end:
+            return start.strftime('%Y-%m')
+        return f"{start:%Y-%m} to {end:%Y-%m}"
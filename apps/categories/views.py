@@ -3,6 +3,8 @@ from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated
 from .models import Category
 from .serializers import CategorySerializer
+from apps.sync.cache import cached
+from apps.sync.versions import conditional
 
 # Create your views here.
 
@@ -13,6 +15,11 @@ class CategoryViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         return Category.objects.filter(user=self.request.user)
+
+    @conditional
+    @cached
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -0,0 +1,248 @@
+"""
+Prometheus metrics without a client library or a metrics server.
+
+Each process keeps its counters and histograms in memory. With
+METRICS_MULTIPROCESS_DIR set (needed under gunicorn, where every worker
+is its own process), a process also writes its values to
+``<dir>/<pid>.json`` at most every METRICS_FLUSH_SECONDS and when it
+exits. The metrics endpoint, served by whichever worker gets the scrape,
+adds up every file in the directory and its own live values, so the
+totals cover all workers. Files of exited workers are kept: their
+requests still count, and counters must not go backwards. Empty the
+directory when the service starts.
+
+Files are replaced atomically (write, then rename), so a scrape never
+reads a half-written one.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+GEMINI_LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, registry, name, documentation, labelnames):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes the labels {', '.join(self.labelnames)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        self.registry.update(self, self.key(labels), lambda value: (value or 0) + amount)
+
+    def merge(self, current, other):
+        return (current or 0) + other
+
+    def samples(self, labels, value):
+        yield self.name, labels, value
+
+
+class Histogram(Metric):
+    """Stored as one count per bucket (not cumulative), then sum and count."""
+
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames, buckets):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(float(bound) for bound in buckets)
+
+    def observe(self, value, **labels):
+        def add(values):
+            values = values or [0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    values[index] += 1
+                    break
+            values[-2] += value
+            values[-1] += 1
+            return values
+
+        self.registry.update(self, self.key(labels), add)
+
+    def merge(self, current, other):
+        if current is None:
+            return list(other)
+        return [a + b for a, b in zip(current, other)]
+
+    def samples(self, labels, values):
+        cumulative = 0
+        for bound, count in zip(self.buckets, values):
+            cumulative += count
+            yield f'{self.name}_bucket', labels + (('le', format_value(bound)),), cumulative
+        yield f'{self.name}_bucket', labels + (('le', '+Inf'),), values[-1]
+        yield f'{self.name}_sum', labels, values[-2]
+        yield f'{self.name}_count', labels, values[-1]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.values = {}  # (metric name, label values) -> value
+        self.lock = threading.Lock()
+        self.pid = None
+        self.last_flush = 0.0
+        atexit.register(self.flush)
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(self, name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def directory(self):
+        return settings.METRICS_MULTIPROCESS_DIR or None
+
+    def path(self, pid):
+        return Path(self.directory()) / f'{pid}.json'
+
+    def adopt_process(self):
+        """
+        Start this process's values; call with the lock held.
+
+        Values inherited over fork() belong to the parent. A file left by
+        an earlier process with the same pid is taken over, so reusing
+        the pid doesn't erase that process's counts.
+        """
+        self.pid = os.getpid()
+        self.values = {}
+        if self.directory():
+            try:
+                self.values = self.read(self.path(self.pid))
+            except FileNotFoundError:
+                pass
+
+    def update(self, metric, key, change):
+        with self.lock:
+            if self.pid != os.getpid():
+                self.adopt_process()
+            self.values[metric.name, key] = change(self.values.get((metric.name, key)))
+            due = time.monotonic() - self.last_flush >= settings.METRICS_FLUSH_SECONDS
+        if due and self.directory():
+            self.flush()
+
+    def flush(self):
+        """Write this process's values to its file in the multiprocess directory."""
+        if not self.directory() or self.pid != os.getpid():
+            return
+        with self.lock:
+            data = [[name, list(key), value] for (name, key), value in self.values.items()]
+            self.last_flush = time.monotonic()
+        path = self.path(self.pid)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_suffix(f'.{threading.get_ident()}.tmp')
+        temporary.write_text(json.dumps(data))
+        os.replace(temporary, path)
+
+    @staticmethod
+    def read(path):
+        return {(name, tuple(key)): value for name, key, value in json.loads(path.read_text())}
+
+    def collect(self):
+        """Values of every process: the other processes' files plus our live values."""
+        merged = {}
+
+        def add(values):
+            for (name, key), value in values.items():
+                metric = self.metrics.get(name)
+                if metric is not None:
+                    merged[name, key] = metric.merge(merged.get((name, key)), value)
+
+        if self.directory():
+            for path in Path(self.directory()).glob('*.json'):
+                if path.stem == str(os.getpid()) and self.pid == os.getpid():
+                    continue  # our live values are newer
+                try:
+                    add(self.read(path))
+                except (FileNotFoundError, ValueError):
+                    continue  # removed or not ours
+        with self.lock:
+            if self.pid == os.getpid():
+                add(dict(self.values))
+        return merged
+
+    def exposition(self):
+        """All metrics in the Prometheus text format."""
+        values = self.collect()
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f'# HELP {name} {escape(metric.documentation, quotes=False)}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for (metric_name, key), value in sorted(values.items()):
+                if metric_name != name:
+                    continue
+                for sample, labels, number in metric.samples(tuple(zip(metric.labelnames, key)), value):
+                    lines.append(f'{sample}{format_labels(labels)} {format_value(number)}')
+        return '\n'.join(lines) + '\n'
+
+
+def escape(text, quotes=True):
+    text = text.replace('\\', r'\\').replace('\n', r'\n')
+    return text.replace('"', r'\"') if quotes else text
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels) + '}'
+
+
+def format_value(number):
+    if isinstance(number, float) and number.is_integer():
+        return str(int(number)) if abs(number) < 1e15 else repr(number)
+    return repr(number) if isinstance(number, float) else str(number)
+
+
+registry = Registry()
+
+REQUEST_DURATION = registry.histogram(
+    'http_request_duration_seconds', 'Time to produce the response, by route.',
+    ['method', 'route'], buckets=LATENCY_BUCKETS,
+)
+REQUESTS = registry.counter(
+    'http_requests_total', 'Responses by route and status code.',
+    ['method', 'route', 'status'],
+)
+REQUEST_QUERIES = registry.histogram(
+    'http_request_db_queries', 'SQL queries per request, by route (sampled requests only).',
+    ['method', 'route'], buckets=QUERY_COUNT_BUCKETS,
+)
+GEMINI_DURATION = registry.histogram(
+    'gemini_request_duration_seconds', 'Duration of Gemini generate_content calls, including streaming.',
+    ['operation'], buckets=GEMINI_LATENCY_BUCKETS,
+)
+GEMINI_FAILURES = registry.counter(
+    'gemini_request_failures_total', 'Gemini calls that raised an error.',
+    ['operation'],
+)
+GEMINI_TOKENS = registry.counter(
+    'gemini_tokens_total', 'Tokens reported in Gemini usage metadata.',
+    ['operation', 'kind'],
+)
@@ -0,0 +1,196 @@
+"""
+Per-request cost instrumentation.
+
+RequestMetricsMiddleware measures, for a sampled fraction of requests
+(REQUEST_METRICS_SAMPLE_RATE):
+
+- db: number of queries and time spent in them, via an execute_wrapper
+  on every database connection
+- view: time in the view, including its queries and serializer work
+- render: time rendering the response (DRF's renderer: JSON encoding or
+  the browsable API)
+- total: the whole request, inside this middleware
+
+The figures go out in a ``Server-Timing`` header (visible in browser
+dev tools) and, for requests slower than SLOW_REQUEST_MS, as one JSON
+line on the ``apps.monitoring.slow_requests`` logger with the statements
+that cost most. Identical SQL is grouped, so an N+1 shows up as one
+statement run N times.
+
+Every request, sampled or not, is also counted in the Prometheus
+metrics of apps.monitoring.metrics: latency and status by route, plus
+the query count of the sampled ones.
+
+Streaming responses are measured up to the point the response is
+returned; queries made while the body streams aren't counted.
+"""
+
+import json
+import logging
+import random
+import re
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics as prometheus
+
+logger = logging.getLogger('apps.monitoring.slow_requests')
+
+
+class RequestMetrics:
+    """Timings and queries of one request, attached to it as ``request.metrics``."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_started = None
+        self.render_started = None
+        self.render_finished = None
+        self.finished = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = {}  # sql -> [count, seconds]
+
+    def __call__(self, execute, sql, params, many, context):
+        """execute_wrapper hook: time the statement."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.db_time += elapsed
+            entry = self.statements.get(sql)
+            if entry is None:
+                self.statements[sql] = [1, elapsed]
+            else:
+                entry[0] += 1
+                entry[1] += elapsed
+
+    @property
+    def total_time(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def view_time(self):
+        if self.view_started is None:
+            return None
+        return (self.render_started or self.finished or time.perf_counter()) - self.view_started
+
+    @property
+    def render_time(self):
+        if self.render_started is None or self.render_finished is None:
+            return None
+        return self.render_finished - self.render_started
+
+    def top_statements(self, limit):
+        """The ``limit`` statements with the most total time, slowest first."""
+        ranked = sorted(self.statements.items(), key=lambda item: item[1][1], reverse=True)
+        return [
+            {'sql': sql, 'count': count, 'ms': round(seconds * 1000, 2)}
+            for sql, (count, seconds) in ranked[:limit]
+        ]
+
+    def server_timing(self):
+        entries = [f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"']
+        if self.view_time is not None:
+            entries.append(f'view;dur={self.view_time * 1000:.1f}')
+        if self.render_time is not None:
+            entries.append(f'render;dur={self.render_time * 1000:.1f}')
+        entries.append(f'total;dur={self.total_time * 1000:.1f}')
+        return ', '.join(entries)
+
+
+ROUTE_GROUP = re.compile(r'\(\?P<(\w+)>[^)]*\)')
+
+
+def route_of(request):
+    """
+    The matched URL pattern, e.g. ``/api/transactions/<pk>/``, or None if
+    no pattern matched.
+
+    Regex groups from DRF's router are shown as ``<name>``, so every
+    transaction's detail URL has the same route.
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None or not match.route:
+        return None
+    return '/' + ROUTE_GROUP.sub(r'<\1>', match.route).lstrip('^').rstrip('$')
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.REQUEST_METRICS_ENABLED:
+            return self.get_response(request)
+        if random.random() >= settings.REQUEST_METRICS_SAMPLE_RATE:
+            started = time.perf_counter()
+            response = self.get_response(request)
+            self.count(request, response, time.perf_counter() - started)
+            return response
+
+        metrics = request.metrics = RequestMetrics()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(metrics))
+            response = self.get_response(request)
+        metrics.finished = time.perf_counter()
+        self.count(request, response, metrics.total_time, metrics.queries)
+
+        if settings.REQUEST_METRICS_SERVER_TIMING:
+            response['Server-Timing'] = metrics.server_timing()
+        if metrics.total_time * 1000 >= settings.SLOW_REQUEST_MS:
+            self.log_slow_request(request, response, metrics)
+        return response
+
+    def count(self, request, response, duration, queries=None):
+        """Add the request to the Prometheus metrics."""
+        labels = {'method': request.method, 'route': route_of(request) or 'unmatched'}
+        prometheus.REQUEST_DURATION.observe(duration, **labels)
+        prometheus.REQUESTS.inc(status=response.status_code, **labels)
+        if queries is not None:
+            prometheus.REQUEST_QUERIES.observe(queries, **labels)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = getattr(request, 'metrics', None)
+        if metrics is not None:
+            metrics.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # Called just before DRF's Response (a SimpleTemplateResponse) is
+        # rendered; the post-render callback marks the end
+        metrics = getattr(request, 'metrics', None)
+        if metrics is not None:
+            metrics.render_started = time.perf_counter()
+
+            def rendered(response):
+                metrics.render_finished = time.perf_counter()
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def log_slow_request(self, request, response, metrics):
+        user = getattr(request, 'user', None)
+
+        def ms(seconds):
+            return None if seconds is None else round(seconds * 1000, 1)
+
+        logger.warning(json.dumps({
+            'event': 'slow_request',
+            'method': request.method,
+            'path': request.path,
+            'route': route_of(request),
+            'status': response.status_code,
+            'user_id': user.pk if user is not None and user.is_authenticated else None,
+            'total_ms': ms(metrics.total_time),
+            'view_ms': ms(metrics.view_time),
+            'render_ms': ms(metrics.render_time),
+            'db_ms': ms(metrics.db_time),
+            'queries': metrics.queries,
+            'distinct_queries': len(metrics.statements),
+            'top_queries': metrics.top_statements(settings.SLOW_REQUEST_TOP_QUERIES),
+        }))
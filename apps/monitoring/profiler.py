@@ -0,0 +1,222 @@
+"""
+On-demand profiling of single requests, for staff.
+
+A staff user adds ``?profile=1`` or an ``X-Profile: 1`` header to any
+request. ProfilerMiddleware then runs the request under a sampling
+profiler. A background thread records the request thread's call stack
+every PROFILER_INTERVAL_MS, and every SQL statement is logged with its
+parameters and duration. The response itself is unchanged apart from an
+``X-Profile`` header with the URL of the stored profile.
+
+Profiles are JSON files in PROFILER_DIR, shared by all workers; only the
+newest PROFILER_KEEP are kept. The stacks are stored in the collapsed
+format (``frame;frame;frame count``) read by flamegraph.pl, speedscope
+and most other flame graph tools.
+
+Sampling measures wall-clock time, so waits on the database or on
+Gemini show up as wide frames. Profiled requests skip the response
+cache, so the view really runs. The request runs as the staff user who
+sent it.
+"""
+
+import json
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.users.authentication import authenticate
+
+PROFILE_ID_LENGTH = 32
+
+
+class StackSampler:
+    """Counts the call stacks of one thread, sampled from a background thread."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='profiler', daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            frames = []
+            while frame is not None:
+                frames.append(frame_name(frame.f_code))
+                frame = frame.f_back
+            if frames:
+                self.stacks[';'.join(reversed(frames))] += 1
+                self.samples += 1
+
+    def collapsed(self):
+        """The stacks in the collapsed format, most frequent first."""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+def frame_name(code):
+    """``function (path/to/file.py:line)`` with the path shortened."""
+    filename = code.co_filename
+    base = str(settings.BASE_DIR) + '/'
+    if filename.startswith(base):
+        filename = filename[len(base):]
+    elif 'site-packages/' in filename:
+        filename = filename.split('site-packages/', 1)[1]
+    return f'{code.co_qualname} ({filename}:{code.co_firstlineno})'.replace(';', ',')
+
+
+class QueryLog:
+    """execute_wrapper hook that records each statement with its parameters and duration."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.queries = []
+        self.dropped = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            if len(self.queries) < self.limit:
+                self.queries.append({
+                    'sql': sql,
+                    'params': None if many else [str(param) for param in params or ()],
+                    'many': many,
+                    'database': context['connection'].alias,
+                    'ms': round(elapsed * 1000, 3),
+                })
+            else:
+                self.dropped += 1
+
+
+def profile_dir():
+    return Path(settings.PROFILER_DIR)
+
+
+def profile_path(profile_id):
+    """Path of a stored profile, or None if the id isn't one we'd have made."""
+    if len(profile_id) != PROFILE_ID_LENGTH or not all(char in '0123456789abcdef' for char in profile_id):
+        return None
+    return profile_dir() / f'{profile_id}.json'
+
+
+def save(profile):
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{profile['id']}.json"
+    temporary = path.with_suffix('.tmp')
+    temporary.write_text(json.dumps(profile))
+    temporary.replace(path)
+
+    stored = sorted(directory.glob('*.json'), key=lambda item: item.stat().st_mtime, reverse=True)
+    for old in stored[settings.PROFILER_KEEP:]:
+        old.unlink(missing_ok=True)
+
+
+def load(profile_id):
+    """The stored profile, or None."""
+    path = profile_path(profile_id)
+    if path is None:
+        return None
+    try:
+        return json.loads(path.read_text())
+    except FileNotFoundError:
+        return None
+
+
+def recent():
+    """Summaries of the stored profiles, newest first."""
+    profiles = []
+    for path in sorted(profile_dir().glob('*.json'), key=lambda item: item.stat().st_mtime, reverse=True):
+        try:
+            profile = json.loads(path.read_text())
+        except (FileNotFoundError, ValueError):
+            continue
+        profiles.append({
+            key: profile[key]
+            for key in ('id', 'created_at', 'method', 'path', 'status', 'user_id', 'duration_ms', 'samples')
+        })
+        profiles[-1]['queries'] = len(profile['queries'])
+    return profiles
+
+
+def wants_profile(request):
+    return (
+        request.GET.get('profile', '').lower() in ('1', 'true', 'yes')
+        or request.headers.get('X-Profile', '').lower() in ('1', 'true', 'yes')
+    )
+
+
+def staff_user(request):
+    """The staff user making the request (session or API token), or None."""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        user = authenticate(request)
+    if user is None or not user.is_active or not user.is_staff:
+        return None
+    return user
+
+
+class ProfilerMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.PROFILER_ENABLED or not wants_profile(request):
+            return self.get_response(request)
+        user = staff_user(request)
+        if user is None:
+            return self.get_response(request)
+
+        request.profile = profile_id = uuid.uuid4().hex
+        queries = QueryLog(settings.PROFILER_MAX_QUERIES)
+        created_at = timezone.now()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            sampler = stack.enter_context(
+                StackSampler(threading.get_ident(), settings.PROFILER_INTERVAL_MS / 1000)
+            )
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        save({
+            'id': profile_id,
+            'created_at': created_at.isoformat(),
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'user_id': user.pk,
+            'duration_ms': round(duration * 1000, 1),
+            'interval_ms': settings.PROFILER_INTERVAL_MS,
+            'samples': sampler.samples,
+            'stacks': sampler.collapsed(),
+            'queries': queries.queries,
+            'queries_dropped': queries.dropped,
+        })
+        response['X-Profile'] = request.build_absolute_uri(
+            reverse('monitoring:profile-detail', args=[profile_id])
+        )
+        return response
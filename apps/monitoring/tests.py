@@ -0,0 +1,356 @@
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from apps.ai import fakes, services
+from . import metrics, profiler
+from .middleware import RequestMetricsMiddleware
+
+SERVER_TIMING = re.compile(
+    r'^db;dur=(?P<db>[\d.]+);desc="(?P<queries>\d+) queries"'
+    r'(, view;dur=(?P<view>[\d.]+))?(, render;dur=(?P<render>[\d.]+))?, total;dur=(?P<total>[\d.]+)$'
+)
+
+
+def run_queries(count):
+    """A get_response that runs ``count`` queries."""
+    def get_response(request):
+        with connection.cursor() as cursor:
+            for _ in range(count):
+                cursor.execute('SELECT 1')
+        return HttpResponse()
+    return get_response
+
+
+@override_settings(
+    REQUEST_METRICS_ENABLED=True, REQUEST_METRICS_SAMPLE_RATE=1.0,
+    REQUEST_METRICS_SERVER_TIMING=True, SLOW_REQUEST_MS=10_000,
+)
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='measured', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def timing(self, response):
+        match = SERVER_TIMING.match(response['Server-Timing'])
+        self.assertIsNotNone(match, response['Server-Timing'])
+        return match
+
+    def test_server_timing_counts_the_requests_queries(self):
+        executed = []
+
+        def count(execute, sql, params, many, context):
+            executed.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            response = self.client.get(reverse('transactions:transaction-list'))
+        self.assertEqual(response.status_code, 200)
+
+        timing = self.timing(response)
+        self.assertEqual(int(timing['queries']), len(executed))
+        self.assertGreater(len(executed), 0)
+        self.assertIsNotNone(timing['view'])
+        self.assertIsNotNone(timing['render'])
+        self.assertLessEqual(float(timing['db']), float(timing['total']))
+        self.assertLessEqual(float(timing['view']), float(timing['total']))
+
+    def test_queries_are_attributed_per_request(self):
+        factory = RequestFactory()
+        for count in (3, 0, 5):
+            response = RequestMetricsMiddleware(run_queries(count))(factory.get('/'))
+            self.assertEqual(int(self.timing(response)['queries']), count)
+
+    def test_concurrent_requests_are_measured_separately(self):
+        # Each thread has its own connection, and so its own wrapper
+        factory = RequestFactory()
+        start = threading.Barrier(2)
+        results = {}
+
+        def request(count):
+            def get_response(request):
+                start.wait()
+                response = run_queries(count)(request)
+                connection.close()
+                return response
+            results[count] = RequestMetricsMiddleware(get_response)(factory.get('/'))
+
+        threads = [threading.Thread(target=request, args=(count,)) for count in (2, 7)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual({count: int(self.timing(response)['queries']) for count, response in results.items()},
+                         {2: 2, 7: 7})
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=0.0)
+    def test_unsampled_requests_get_no_header(self):
+        response = self.client.get(reverse('transactions:transaction-list'))
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(REQUEST_METRICS_SERVER_TIMING=False)
+    def test_header_can_be_turned_off(self):
+        response = self.client.get(reverse('transactions:transaction-list'))
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(SLOW_REQUEST_MS=0, SLOW_REQUEST_TOP_QUERIES=1)
+    def test_slow_request_log_groups_statements(self):
+        request = RequestFactory().get('/slow/')
+        with self.assertLogs('apps.monitoring.slow_requests', 'WARNING') as logs:
+            RequestMetricsMiddleware(run_queries(4))(request)
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(entry['event'], 'slow_request')
+        self.assertEqual(entry['path'], '/slow/')
+        self.assertEqual((entry['queries'], entry['distinct_queries']), (4, 1))
+        self.assertEqual([(query['sql'], query['count']) for query in entry['top_queries']], [('SELECT 1', 4)])
+
+
+class PrometheusTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.registry = metrics.Registry()
+        self.requests = self.registry.counter('app_requests_total', 'Requests.\nBy "path".', ['path'])
+        self.latency = self.registry.histogram('app_latency_seconds', 'Latency.', ['path'], buckets=(0.1, 1))
+
+    def test_exposition_format(self):
+        self.requests.inc(path='/a')
+        self.requests.inc(2, path='/a')
+        self.requests.inc(path='say "hi"\\')
+        for value in (0.05, 0.5, 0.5, 3):
+            self.latency.observe(value, path='/a')
+
+        self.assertEqual(self.registry.exposition(), (
+            '# HELP app_latency_seconds Latency.\n'
+            '# TYPE app_latency_seconds histogram\n'
+            'app_latency_seconds_bucket{path="/a",le="0.1"} 1\n'
+            'app_latency_seconds_bucket{path="/a",le="1"} 3\n'
+            'app_latency_seconds_bucket{path="/a",le="+Inf"} 4\n'
+            'app_latency_seconds_sum{path="/a"} 4.05\n'
+            'app_latency_seconds_count{path="/a"} 4\n'
+            '# HELP app_requests_total Requests.\\nBy "path".\n'
+            '# TYPE app_requests_total counter\n'
+            'app_requests_total{path="/a"} 3\n'
+            'app_requests_total{path="say \\"hi\\"\\\\"} 1\n'
+        ))
+
+    def test_labels_must_match(self):
+        with self.assertRaises(ValueError):
+            self.requests.inc(route='/a')
+        with self.assertRaises(ValueError):
+            self.registry.counter('app_requests_total', 'Again.')
+
+    def test_merges_every_process_file(self):
+        with override_settings(METRICS_MULTIPROCESS_DIR=self.directory, METRICS_FLUSH_SECONDS=0):
+            self.requests.inc(path='/a')
+            self.latency.observe(0.5, path='/a')
+            self.assertTrue(os.path.exists(os.path.join(self.directory, f'{os.getpid()}.json')))
+
+            # Two other workers, one of them already exited
+            for pid, count in ((101, 4), (102, 10)):
+                with open(os.path.join(self.directory, f'{pid}.json'), 'w') as file:
+                    json.dump([
+                        ['app_requests_total', ['/a'], count],
+                        ['app_requests_total', ['/b'], 1],
+                        ['app_latency_seconds', ['/a'], [1, 0, 0.05, 1]],
+                        ['unknown_metric', [], 3],
+                    ], file)
+            with open(os.path.join(self.directory, 'broken.json'), 'w') as file:
+                file.write('{')
+
+            values = self.registry.collect()
+        self.assertEqual(values['app_requests_total', ('/a',)], 15)
+        self.assertEqual(values['app_requests_total', ('/b',)], 2)
+        # Per-bucket counts, then sum and count
+        buckets = values['app_latency_seconds', ('/a',)]
+        self.assertEqual(buckets[:2] + buckets[3:], [2, 1, 3])
+        self.assertAlmostEqual(buckets[2], 0.6)
+        self.assertNotIn(('unknown_metric', ()), values)
+
+    def test_forked_process_starts_from_its_own_file(self):
+        with override_settings(METRICS_MULTIPROCESS_DIR=self.directory, METRICS_FLUSH_SECONDS=0):
+            self.requests.inc(path='/a')
+            # A child inherits the parent's values but must not count them again
+            with mock.patch('os.getpid', return_value=os.getpid() + 100_000):
+                self.requests.inc(path='/a')
+                values = self.registry.collect()
+        self.assertEqual(values['app_requests_total', ('/a',)], 2)
+
+    def test_endpoint_permissions(self):
+        url = reverse('monitoring:metrics')
+        user = User.objects.create_user(username='plain', password='pass12345')
+        staff = User.objects.create_user(username='staff', password='pass12345', is_staff=True)
+        client = APIClient()
+        self.assertEqual(client.get(url).status_code, 401)
+        client.force_authenticate(user)
+        self.assertEqual(client.get(url).status_code, 403)
+        client.force_authenticate(staff)
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        self.assertIn(b'# TYPE http_requests_total counter', response.content)
+
+        with override_settings(METRICS_TOKEN='scrape-me'):
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer scrape-me').status_code, 200)
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+
+
+@override_settings(GEMINI_CLIENT='apps.ai.fakes', GEMINI_MODEL='gemini-2.5-flash', AI_ADVICE_CACHE_SIZE=0)
+class GeminiMetricsTests(TestCase):
+    def setUp(self):
+        services.reset_model_cache()
+        self.addCleanup(services.reset_model_cache)
+        self.user = User.objects.create_user(username='advised', password='pass12345')
+
+    def value(self, metric, *labels):
+        return metrics.registry.collect().get((metric.name, labels))
+
+    def test_generate_latency_and_tokens(self):
+        before = self.value(metrics.GEMINI_DURATION, 'generate') or [0] * (len(metrics.GEMINI_LATENCY_BUCKETS) + 2)
+        prompt_before = self.value(metrics.GEMINI_TOKENS, 'generate', 'prompt') or 0
+        with mock.patch.object(fakes, 'GENERATE_LATENCY', 0.3):
+            result = services.FinancialAdvisor.get_advice(self.user, 'How can I save?')
+        self.assertTrue(result['success'])
+
+        after = self.value(metrics.GEMINI_DURATION, 'generate')
+        self.assertEqual(after[-1] - before[-1], 1)
+        self.assertGreaterEqual(after[-2] - before[-2], 0.3)
+        # 0.3s lands in the 0.5s bucket
+        bucket = metrics.GEMINI_LATENCY_BUCKETS.index(0.5)
+        self.assertEqual(after[bucket] - before[bucket], 1)
+        self.assertGreater(self.value(metrics.GEMINI_TOKENS, 'generate', 'prompt'), prompt_before)
+
+    def test_failures_are_counted(self):
+        failures = self.value(metrics.GEMINI_FAILURES, 'generate') or 0
+        count = (self.value(metrics.GEMINI_DURATION, 'generate') or [0])[-1]
+        with self.assertRaises(RuntimeError):
+            with services.observe_gemini('generate'):
+                raise RuntimeError('quota')
+        self.assertEqual(self.value(metrics.GEMINI_FAILURES, 'generate'), failures + 1)
+        self.assertEqual(self.value(metrics.GEMINI_DURATION, 'generate')[-1], count + 1)
+
+
+class ProfilerTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        settings = override_settings(PROFILER_ENABLED=True, PROFILER_DIR=directory.name, PROFILER_INTERVAL_MS=1)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.staff = User.objects.create_user(username='staff', password='pass12345', is_staff=True)
+        self.user = User.objects.create_user(username='plain', password='pass12345')
+        self.url = reverse('transactions:transaction-list')
+
+    def auth(self, user):
+        return {'HTTP_AUTHORIZATION': f'Token {Token.objects.get_or_create(user=user)[0].key}'}
+
+    def stored(self):
+        return sorted(self.directory.glob('*.json'))
+
+    def test_staff_request_is_profiled(self):
+        response = self.client.get(self.url, {'profile': '1'}, **self.auth(self.staff))
+        self.assertEqual(response.status_code, 200)
+        profile_id = response['X-Profile'].rstrip('/').rsplit('/', 1)[1]
+        self.assertEqual(self.stored(), [self.directory / f'{profile_id}.json'])
+
+        profile = profiler.load(profile_id)
+        self.assertEqual((profile['user_id'], profile['status'], profile['method']), (self.staff.pk, 200, 'GET'))
+        self.assertTrue(profile['queries'])
+        self.assertTrue(all(query['sql'] and query['ms'] >= 0 for query in profile['queries']))
+
+        detail = self.client.get(response['X-Profile'], **self.auth(self.staff))
+        self.assertEqual(detail.data['id'], profile_id)
+        collapsed = self.client.get(response['X-Profile'], {'fmt': 'collapsed'}, **self.auth(self.staff))
+        self.assertEqual(collapsed.content.decode(), profile['stacks'])
+        listing = self.client.get(reverse('monitoring:profile-list'), **self.auth(self.staff))
+        self.assertEqual([item['id'] for item in listing.data], [profile_id])
+
+    def test_header_also_triggers_profiling(self):
+        response = self.client.get(self.url, HTTP_X_PROFILE='1', **self.auth(self.staff))
+        self.assertIn('X-Profile', response)
+
+    def test_non_staff_requests_are_unaffected(self):
+        plain = self.client.get(self.url, **self.auth(self.user))
+        with mock.patch.object(profiler, 'StackSampler') as sampler:
+            response = self.client.get(self.url, {'profile': '1'}, HTTP_X_PROFILE='1', **self.auth(self.user))
+            anonymous = self.client.get(self.url, {'profile': '1'})
+        sampler.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile', response)
+        self.assertEqual(response.content, plain.content)
+        self.assertEqual(anonymous.status_code, 401)
+        self.assertNotIn('X-Profile', anonymous)
+        self.assertEqual(self.stored(), [])
+
+        for url in (reverse('monitoring:profile-list'), reverse('monitoring:profile-detail', args=['0' * 32])):
+            self.assertEqual(self.client.get(url, **self.auth(self.user)).status_code, 403)
+
+    def test_staff_requests_without_the_flag_are_not_profiled(self):
+        response = self.client.get(self.url, **self.auth(self.staff))
+        self.assertNotIn('X-Profile', response)
+        self.assertEqual(self.stored(), [])
+
+    @override_settings(PROFILER_ENABLED=False)
+    def test_disabled(self):
+        response = self.client.get(self.url, {'profile': '1'}, **self.auth(self.staff))
+        self.assertNotIn('X-Profile', response)
+
+    def test_sampler_thread_is_stopped_and_joined(self):
+        samplers = []
+        real = profiler.StackSampler
+
+        def track(*args):
+            samplers.append(real(*args))
+            return samplers[-1]
+
+        with mock.patch.object(profiler, 'StackSampler', side_effect=track):
+            self.client.get(self.url, {'profile': '1'}, **self.auth(self.staff))
+        self.assertEqual(len(samplers), 1)
+        self.assertTrue(samplers[0].stopped.is_set())
+        self.assertFalse(samplers[0].thread.is_alive())
+        self.assertNotIn('profiler', [thread.name for thread in threading.enumerate()])
+
+    def test_sampler_records_the_target_threads_stack(self):
+        def busy_wait():
+            deadline = time.perf_counter() + 0.05
+            while time.perf_counter() < deadline:
+                pass
+
+        with profiler.StackSampler(threading.get_ident(), 0.001) as sampler:
+            busy_wait()
+        self.assertFalse(sampler.thread.is_alive())
+        self.assertGreater(sampler.samples, 0)
+        self.assertIn('busy_wait', sampler.collapsed())
+        # The thread is stopped even when the profiled code raises
+        with self.assertRaises(ValueError):
+            with profiler.StackSampler(threading.get_ident(), 0.001) as failing:
+                raise ValueError
+        self.assertFalse(failing.thread.is_alive())
+
+    def test_old_profiles_are_pruned(self):
+        with override_settings(PROFILER_KEEP=2):
+            for _ in range(3):
+                self.client.get(self.url, {'profile': '1'}, **self.auth(self.staff))
+                time.sleep(0.01)
+        self.assertEqual(len(self.stored()), 2)
+
+    def test_profile_ids_are_validated(self):
+        self.assertIsNone(profiler.profile_path('../../etc/passwd'))
+        self.assertIsNone(profiler.load('x' * 32))
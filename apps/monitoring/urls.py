@@ -0,0 +1,10 @@
+from django.urls import path
+from . import views
+
+app_name = 'monitoring'
+
+urlpatterns = [
+    path('metrics/', views.metrics, name='metrics'),
+    path('profiles/', views.profiles, name='profile-list'),
+    path('profiles/<str:profile_id>/', views.profile_detail, name='profile-detail'),
+]
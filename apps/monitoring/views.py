@@ -0,0 +1,66 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import BasePermission, IsAdminUser
+from rest_framework.response import Response
+
+from . import profiler
+from .metrics import CONTENT_TYPE, registry
+
+
+class CanScrapeMetrics(BasePermission):
+    """Staff users, or a scraper sending ``Authorization: Bearer <METRICS_TOKEN>``."""
+
+    def has_permission(self, request, view):
+        token = settings.METRICS_TOKEN
+        if token:
+            sent = request.META.get('HTTP_AUTHORIZATION', '')
+            if hmac.compare_digest(sent.encode(), f'Bearer {token}'.encode()):
+                return True
+        return bool(request.user and request.user.is_staff)
+
+
+@api_view(['GET'])
+@permission_classes([CanScrapeMetrics])
+def metrics(request):
+    """
+    Prometheus metrics for all worker processes (staff or scraper token)
+    
+    GET /api/monitoring/metrics/
+    """
+    return HttpResponse(registry.exposition(), content_type=CONTENT_TYPE)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def profiles(request):
+    """
+    Recently stored request profiles, newest first (staff only)
+    
+    GET /api/monitoring/profiles/
+    
+    Profile a request by adding ?profile=1 or an "X-Profile: 1" header.
+    """
+    return Response(profiler.recent())
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def profile_detail(request, profile_id):
+    """
+    One stored request profile (staff only)
+    
+    GET /api/monitoring/profiles/<id>/              -> JSON: stacks, SQL and timings
+    GET /api/monitoring/profiles/<id>/?fmt=collapsed -> stacks for flame graph tools
+    """
+    profile = profiler.load(profile_id)
+    if profile is None:
+        return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+    if request.query_params.get('fmt') == 'collapsed':
+        response = HttpResponse(profile['stacks'], content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="profile-{profile_id}.folded"'
+        return response
+    return Response(profile)
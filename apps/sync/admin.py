@@ -0,0 +1,8 @@
+from django.contrib import admin
+from .models import Change
+
+@admin.register(Change)
+class ChangeAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'model', 'object_id', 'deleted', 'changed_at']
+    list_filter = ['model', 'deleted']
+    search_fields = ['user__username']
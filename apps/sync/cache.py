@@ -0,0 +1,133 @@
+"""
+Versioned response cache for per-user read endpoints.
+
+``cached`` stores the response data of a read-only viewset action in the
+RESPONSE_CACHE_ALIAS Django cache under a key built from the user, their
+data version (see versions.py) and the request's representation. Any
+write moves the version on, so later requests look up fresh keys and
+never see stale data; nothing is deleted and nothing has to scan keys,
+the old entries simply age out after RESPONSE_CACHE_TTL seconds.
+
+Each response carries ``X-Cache: HIT`` or ``MISS``, and the counters
+behind ``ResponseCacheStats`` report the hit ratio per endpoint for this
+worker process.
+
+``RedisCache`` is Django's Redis backend with the client library made
+configurable, so tests and local runs can point it at the in-process
+stand-in in fakes.py instead of a Redis-protocol server.
+"""
+
+import functools
+import sys
+import threading
+from collections import defaultdict
+from importlib import import_module
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends import redis as redis_backend
+from rest_framework.response import Response
+
+from .versions import fingerprint, is_settled, request_version
+
+
+class RedisCacheClient(redis_backend.RedisCacheClient):
+    """
+    RedisCacheClient that loads the client library named by the ``library`` option.
+
+    Django's constructor imports ``redis`` and takes the client, pool and
+    parser classes from it. For another library it is run with that
+    library standing in for ``redis`` in sys.modules.
+    """
+
+    _import_lock = threading.Lock()
+
+    def __init__(self, servers, library='redis', **options):
+        if library == 'redis':
+            super().__init__(servers, **options)
+            return
+        with self._import_lock:
+            previous = sys.modules.get('redis')
+            sys.modules['redis'] = import_module(library)
+            try:
+                super().__init__(servers, **options)
+            finally:
+                if previous is None:
+                    del sys.modules['redis']
+                else:
+                    sys.modules['redis'] = previous
+
+
+class RedisCache(redis_backend.RedisCache):
+    def __init__(self, server, params):
+        super().__init__(server, params)
+        self._class = RedisCacheClient
+
+
+class ResponseCacheStats:
+    """Per-process hit/miss counters, by endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = defaultdict(lambda: {'hits': 0, 'misses': 0})
+
+    def record(self, endpoint, hit):
+        with self._lock:
+            self._counts[endpoint]['hits' if hit else 'misses'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._counts.clear()
+
+    def stats(self):
+        with self._lock:
+            endpoints = {name: dict(counts) for name, counts in self._counts.items()}
+        for counts in endpoints.values():
+            lookups = counts['hits'] + counts['misses']
+            counts['hit_ratio'] = round(counts['hits'] / lookups, 4) if lookups else 0.0
+        hits = sum(counts['hits'] for counts in endpoints.values())
+        misses = sum(counts['misses'] for counts in endpoints.values())
+        return {
+            'backend': settings.CACHES[settings.RESPONSE_CACHE_ALIAS]['BACKEND'],
+            'ttl_seconds': settings.RESPONSE_CACHE_TTL,
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            'endpoints': endpoints,
+        }
+
+
+response_cache_stats = ResponseCacheStats()
+
+
+def cache_key(request, version):
+    return f'response:{request.user.pk}:{version}:{fingerprint(request, version)}'
+
+
+def cached(action):
+    """Serve a viewset action's 200 responses from the versioned response cache."""
+    @functools.wraps(action)
+    def wrapper(self, request, *args, **kwargs):
+        # Profiled requests (apps.monitoring.profiler) must run the view
+        if settings.RESPONSE_CACHE_TTL <= 0 or getattr(request, 'profile', None):
+            return action(self, request, *args, **kwargs)
+
+        cache = caches[settings.RESPONSE_CACHE_ALIAS]
+        endpoint = f'{type(self).__name__}.{action.__name__}'
+        version, changed_at = request_version(request)
+        key = cache_key(request, version)
+
+        data = cache.get(key)
+        if data is not None:
+            response_cache_stats.record(endpoint, hit=True)
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response_cache_stats.record(endpoint, hit=False)
+        response = action(self, request, *args, **kwargs)
+        if response.status_code == 200 and is_settled(changed_at):
+            cache.set(key, response.data, settings.RESPONSE_CACHE_TTL)
+        response['X-Cache'] = 'MISS'
+        return response
+    return wrapper
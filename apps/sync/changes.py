@@ -0,0 +1,216 @@
+"""
+Recording and reading the sync change log.
+
+Writes call ``record()`` (through the receivers in signals.py), which
+replaces the object's previous Change row with a new one, or just inserts
+one for objects that were created. Reads page through ``Change`` rows
+with ``id > cursor`` in id order and load the current state of the
+objects they point at.
+
+Sequence numbers are handed out when a row is inserted but become
+visible when its transaction commits. If two transactions of the same
+user could interleave, the one with the lower number might commit after
+a client had already read past it, and the client would never see it.
+Writers therefore hold a per-user lock from their first Change insert
+until they commit (``lock()``), so each user's rows become visible in id
+order and the cursor can never pass an uncommitted row:
+
+- SQLite allows one writing transaction at a time, which already gives
+  that order.
+- PostgreSQL takes a transaction-level advisory lock per user; writes of
+  different users don't wait for each other.
+
+Other databases get no such guarantee. On those, SYNC_SETTLE_SECONDS
+holds back changes younger than that many seconds, which only narrows
+the window: a transaction that takes longer than that to commit can
+still be missed.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from apps.budgets.models import Budget
+from apps.budgets.serializers import BudgetSerializer
+from apps.categories.models import Category
+from apps.categories.serializers import CategorySerializer
+from apps.transactions import rollups
+from apps.transactions.models import Transaction
+from apps.transactions.serializers import TransactionValuesSerializer
+from .models import Change
+
+
+def deleting_user(origin):
+    """Whether a delete cascades from removing the user (their rows all go)."""
+    return isinstance(origin, User) or getattr(origin, 'model', None) is User
+
+
+def record(user_id, model, object_ids, deleted=False, created=False):
+    """
+    Log that ``object_ids`` of ``model`` changed (or were deleted).
+
+    ``created`` means the objects were just inserted, so they have no
+    earlier rows to replace and the delete is skipped.
+    """
+    object_ids = list(dict.fromkeys(object_ids))
+    if not object_ids:
+        return
+
+    now = timezone.now()
+    if created:
+        with transaction.atomic():
+            lock([user_id])
+            Change.objects.bulk_create([
+                Change(user_id=user_id, model=model, object_id=object_id, deleted=deleted, changed_at=now)
+                for object_id in object_ids
+            ])
+        return
+
+    def replace():
+        with transaction.atomic():
+            lock([user_id])
+            Change.objects.filter(user_id=user_id, model=model, object_id__in=object_ids).delete()
+            Change.objects.bulk_create([
+                Change(user_id=user_id, model=model, object_id=object_id, deleted=deleted, changed_at=now)
+                for object_id in object_ids
+            ])
+
+    try:
+        replace()
+    except IntegrityError:
+        # A concurrent write logged the same object between our delete
+        # and insert; its row is now visible, so the retry replaces it
+        replace()
+
+
+# Namespace of the advisory locks, so they can't collide with other users
+# of pg_advisory_xact_lock(int, int)
+LOCK_NAMESPACE = 0x73796e63  # 'sync'
+
+
+def lock(user_ids):
+    """
+    Hold the change log of ``user_ids`` until the current transaction ends.
+
+    Call inside ``transaction.atomic()`` before inserting Change rows.
+    Users are locked in id order so concurrent callers can't deadlock.
+    """
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        for user_id in sorted(set(user_ids)):
+            cursor.execute('SELECT pg_advisory_xact_lock(%s, %s)', [LOCK_NAMESPACE, user_id])
+
+
+def record_budget_months(user_id, dates):
+    """Log the budgets of the months containing ``dates``; their spending changed."""
+    months = {rollups.month_start(value) for value in dates}
+    budget_ids = Budget.objects.filter(user_id=user_id, month__in=months).values_list('id', flat=True)
+    record(user_id, Change.BUDGET, budget_ids)
+
+
+def record_all(user_ids):
+    """
+    Log every transaction, category and budget of ``user_ids`` as changed.
+
+    For bulk loads that write rows without signals (the generate_data
+    command). One INSERT ... SELECT per model, so no ids pass through
+    Python; the users' existing log entries are replaced.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    quote = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(user_ids))
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    with transaction.atomic(), connection.cursor() as cursor:
+        lock(user_ids)
+        Change.objects.filter(user_id__in=user_ids).delete()
+        for model, source in ((Change.CATEGORY, Category), (Change.BUDGET, Budget), (Change.TRANSACTION, Transaction)):
+            cursor.execute(
+                f"INSERT INTO {quote(Change._meta.db_table)} (user_id, model, object_id, deleted, changed_at) "
+                f"SELECT user_id, %s, id, %s, %s FROM {quote(source._meta.db_table)} "
+                f"WHERE user_id IN ({placeholders}) ORDER BY id",
+                [model, False, now, *user_ids],
+            )
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+def settled_before():
+    """Changes after this time are held back; None when SYNC_SETTLE_SECONDS is 0."""
+    if settings.SYNC_SETTLE_SECONDS <= 0:
+        return None
+    return timezone.now() - timedelta(seconds=settings.SYNC_SETTLE_SECONDS)
+
+
+def load_transactions(user, ids):
+    rows = TransactionValuesSerializer.values(Transaction.objects.filter(user=user, pk__in=ids))
+    return TransactionValuesSerializer(rows, many=True).data
+
+
+def load_categories(user, ids):
+    return CategorySerializer(Category.objects.filter(user=user, pk__in=ids), many=True).data
+
+
+def load_budgets(user, ids):
+    budgets = Budget.objects.filter(user=user, pk__in=ids).annotate(
+        month_expenses=rollups.month_expenses_subquery()
+    )
+    return BudgetSerializer(budgets, many=True).data
+
+
+LOADERS = {
+    Change.TRANSACTION: ('transactions', load_transactions),
+    Change.CATEGORY: ('categories', load_categories),
+    Change.BUDGET: ('budgets', load_budgets),
+}
+
+
+def changes_since(user, cursor, limit):
+    """
+    Everything that changed for ``user`` after sequence number ``cursor``.
+
+    Returns the response payload: current objects grouped by kind, ids of
+    deleted objects, the cursor to send next time and whether more
+    changes are waiting.
+    """
+    log = Change.objects.filter(user=user, id__gt=cursor)
+    cutoff = settled_before()
+    if cutoff is not None:
+        log = log.filter(changed_at__lte=cutoff)
+    page = list(
+        log.order_by('id')
+        .values_list('id', 'model', 'object_id', 'deleted')[:limit + 1]
+    )
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    changed = {model: [] for model in LOADERS}
+    deleted = {key: [] for key, _ in LOADERS.values()}
+    for _, model, object_id, is_deleted in page:
+        if is_deleted:
+            deleted[LOADERS[model][0]].append(object_id)
+        else:
+            changed[model].append(object_id)
+
+    objects = {}
+    for model, (key, load) in LOADERS.items():
+        ids = changed[model]
+        objects[key] = list(load(user, ids)) if ids else []
+        # Deleted since the page was read: report it now, the tombstone
+        # arrives again in a later sync
+        found = {item['id'] for item in objects[key]}
+        deleted[key].extend(object_id for object_id in ids if object_id not in found)
+
+    return {
+        'cursor': str(page[-1][0] if page else cursor),
+        'has_more': has_more,
+        'changes': objects,
+        'deleted': deleted,
+    }
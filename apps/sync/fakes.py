@@ -0,0 +1,133 @@
+"""
+In-process stand-in for the redis client library.
+
+Set CACHE_BACKEND=redis and CACHE_REDIS_LIBRARY=apps.sync.fakes to run
+the Redis cache backend without a server. It implements the commands
+Django's RedisCache uses, with Redis semantics (bytes values, expiry in
+seconds, NX), on a dictionary shared by every client of the same URL
+within the process.
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+_servers = {}
+_servers_lock = threading.Lock()
+
+connection = SimpleNamespace(DefaultParser=None)
+
+
+class Server:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data = {}  # key -> (value, expires_at or None)
+
+
+class ConnectionPool:
+    def __init__(self, url, **options):
+        with _servers_lock:
+            self.server = _servers.setdefault(url, Server())
+
+    @classmethod
+    def from_url(cls, url, **options):
+        return cls(url, **options)
+
+
+def encode(value):
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode()
+
+
+class Redis:
+    def __init__(self, connection_pool):
+        self._server = connection_pool.server
+
+    def _live(self, key):
+        entry = self._server.data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+            del self._server.data[key]
+            return None
+        return entry
+
+    def get(self, key):
+        with self._server.lock:
+            entry = self._live(key)
+            return entry[0] if entry else None
+
+    def mget(self, keys):
+        with self._server.lock:
+            return [entry[0] if entry else None for entry in map(self._live, keys)]
+
+    def set(self, key, value, ex=None, nx=False):
+        with self._server.lock:
+            if nx and self._live(key):
+                return None
+            expires_at = time.monotonic() + ex if ex is not None else None
+            self._server.data[key] = (encode(value), expires_at)
+            return True
+
+    def mset(self, mapping):
+        for key, value in mapping.items():
+            self.set(key, value)
+        return True
+
+    def delete(self, *keys):
+        with self._server.lock:
+            return sum(self._server.data.pop(key, None) is not None for key in keys)
+
+    def exists(self, key):
+        with self._server.lock:
+            return int(self._live(key) is not None)
+
+    def expire(self, key, seconds):
+        with self._server.lock:
+            entry = self._live(key)
+            if entry is None:
+                return False
+            self._server.data[key] = (entry[0], time.monotonic() + seconds)
+            return True
+
+    def persist(self, key):
+        with self._server.lock:
+            entry = self._live(key)
+            if entry is None or entry[1] is None:
+                return False
+            self._server.data[key] = (entry[0], None)
+            return True
+
+    def incr(self, key, amount=1):
+        with self._server.lock:
+            entry = self._live(key)
+            value = int(entry[0]) + amount if entry else amount
+            self._server.data[key] = (encode(value), entry[1] if entry else None)
+            return value
+
+    def flushdb(self):
+        with self._server.lock:
+            self._server.data.clear()
+            return True
+
+    def pipeline(self):
+        return Pipeline(self)
+
+
+class Pipeline:
+    """Queues commands and runs them on execute(), like redis-py's pipeline."""
+
+    def __init__(self, client):
+        self._client = client
+        self._commands = []
+
+    def __getattr__(self, name):
+        command = getattr(self._client, name)
+
+        def queue(*args, **kwargs):
+            self._commands.append((command, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        commands, self._commands = self._commands, []
+        return [command(*args, **kwargs) for command, args, kwargs in commands]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.25 on 2026-10-18 02:53
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+from django.utils import timezone
+
+
+def backfill_changes(apps, schema_editor):
+    """Log every existing object so a first sync (cursor 0) returns it."""
+    Change = apps.get_model('sync', 'Change')
+    now = timezone.now()
+    for model, name in (('categories.Category', 'category'), ('budgets.Budget', 'budget'),
+                        ('transactions.Transaction', 'transaction')):
+        rows = apps.get_model(model).objects.order_by('id').values_list('user_id', 'id')
+        Change.objects.bulk_create(
+            (
+                Change(user_id=user_id, model=name, object_id=object_id, changed_at=now)
+                for user_id, object_id in rows.iterator()
+            ),
+            batch_size=1000,
+        )
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('budgets', '0001_initial'),
+        ('categories', '0001_initial'),
+        ('transactions', '0003_transaction_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(choices=[('transaction', 'Transaction'), ('category', 'Category'), ('budget', 'Budget')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sync_changes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['user', 'id'], name='sync_change_user_seq')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='change',
+            constraint=models.UniqueConstraint(fields=('user', 'model', 'object_id'), name='unique_sync_change_object'),
+        ),
+        migrations.RunPython(backfill_changes, migrations.RunPython.noop),
+    ]
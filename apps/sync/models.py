@@ -0,0 +1,42 @@
+from django.db import models
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+
+class Change(models.Model):
+    """
+    Change log entry for delta sync.
+    
+    The log is compacted: there is at most one row per object, replaced
+    (with a new, higher id) every time the object changes. The id is the
+    sync sequence number, so everything a client hasn't seen is simply
+    ``id > cursor``. Deleted objects keep a tombstone row with
+    ``deleted=True`` so the deletion reaches every device.
+    """
+    TRANSACTION = 'transaction'
+    CATEGORY = 'category'
+    BUDGET = 'budget'
+    MODEL_CHOICES = [
+        (TRANSACTION, 'Transaction'),
+        (CATEGORY, 'Category'),
+        (BUDGET, 'Budget'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sync_changes')
+    model = models.CharField(max_length=20, choices=MODEL_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['id']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'model', 'object_id'], name='unique_sync_change_object'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'id'], name='sync_change_user_seq'),
+        ]
+    
+    def __str__(self):
+        action = 'deleted' if self.deleted else 'changed'
+        return f"#{self.id} {self.model} {self.object_id} {action}"
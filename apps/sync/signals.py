@@ -0,0 +1,65 @@
+"""
+Feed the sync change log from writes to transactions, categories and
+budgets, including the bulk and cascade paths that send no save signals.
+"""
+
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from apps.budgets.models import Budget
+from apps.categories.models import Category
+from apps.transactions.models import Transaction
+from apps.transactions.signals import transactions_bulk_created
+from . import changes
+from .models import Change
+
+MODELS = {
+    Transaction: Change.TRANSACTION,
+    Category: Change.CATEGORY,
+    Budget: Change.BUDGET,
+}
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Budget)
+def log_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    changes.record(instance.user_id, MODELS[sender], [instance.pk])
+
+    if sender is Transaction:
+        # Budgets report the month's spending, so they change too. The
+        # previous values are loaded by the rollup's pre_save handler.
+        dates = [instance.date]
+        previous = getattr(instance, '_rollup_previous', None)
+        if previous is not None:
+            dates.append(previous[1])
+        changes.record_budget_months(instance.user_id, dates)
+
+
+@receiver(post_delete, sender=Transaction)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Budget)
+def log_delete(sender, instance, origin=None, **kwargs):
+    if changes.deleting_user(origin):
+        return
+    changes.record(instance.user_id, MODELS[sender], [instance.pk], deleted=True)
+
+    if sender is Transaction:
+        changes.record_budget_months(instance.user_id, [instance.date])
+
+
+@receiver(pre_delete, sender=Category)
+def log_uncategorized_transactions(sender, instance, origin=None, **kwargs):
+    """Deleting a category sets its transactions' category to NULL without signals."""
+    if changes.deleting_user(origin):
+        return
+    ids = Transaction.objects.filter(category=instance).values_list('id', flat=True)
+    changes.record(instance.user_id, Change.TRANSACTION, ids)
+
+
+@receiver(transactions_bulk_created, sender=Transaction)
+def log_bulk_create(sender, user, transactions, **kwargs):
+    changes.record(user.pk, Change.TRANSACTION, [instance.pk for instance in transactions], created=True)
+    changes.record_budget_months(user.pk, {instance.date for instance in transactions})
@@ -0,0 +1,274 @@
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+
+from apps.budgets.models import Budget
+from apps.categories.models import Category
+from apps.transactions.models import Transaction
+from . import fakes
+from .cache import RedisCacheClient, response_cache_stats
+from .models import Change
+
+
+class SyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='syncer', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add(self, amount='10', day=date(2025, 1, 5), category=None):
+        return Transaction.objects.create(
+            user=self.user, type='expense', amount=Decimal(amount), date=day, category=category
+        )
+
+    def sync(self, cursor=None, **params):
+        if cursor is not None:
+            params['cursor'] = cursor
+        response = self.client.get(reverse('sync:sync'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def ids(self, data, key='transactions'):
+        return [item['id'] for item in data['changes'][key]]
+
+    def test_cursor_pages_through_everything_once(self):
+        created = [self.add(amount=str(index + 1)) for index in range(5)]
+
+        seen = []
+        cursor = None
+        pages = 0
+        while True:
+            data = self.sync(cursor, limit=2)
+            seen.extend(self.ids(data))
+            cursor = data['cursor']
+            pages += 1
+            if not data['has_more']:
+                break
+        self.assertEqual(pages, 3)
+        self.assertEqual(sorted(seen), [txn.pk for txn in created])
+
+        # Nothing new: the same cursor comes back empty
+        data = self.sync(cursor)
+        self.assertEqual((data['cursor'], self.ids(data)), (cursor, []))
+
+        # Only what changed afterwards
+        created[1].amount = Decimal('99')
+        created[1].save()
+        data = self.sync(cursor)
+        self.assertEqual(self.ids(data), [created[1].pk])
+        self.assertEqual(data['changes']['transactions'][0]['amount'], '99.00')
+
+    def test_log_keeps_one_row_per_object(self):
+        category = Category.objects.create(user=self.user, name='Food', type='expense')
+        txn = self.add(category=category)
+        for amount in ('11', '12', '13'):
+            txn.amount = Decimal(amount)
+            txn.save()
+
+        self.assertEqual(Change.objects.filter(user=self.user, model=Change.TRANSACTION).count(), 1)
+        self.assertEqual(Change.objects.filter(user=self.user, model=Change.CATEGORY).count(), 1)
+        data = self.sync()
+        self.assertEqual(self.ids(data), [txn.pk])
+        self.assertEqual(data['changes']['transactions'][0]['amount'], '13.00')
+
+    def test_deletes_leave_tombstones(self):
+        budget = Budget.objects.create(user=self.user, month=date(2025, 1, 1), budget_amount=Decimal('100'))
+        kept, removed = self.add(), self.add()
+        removed_id = removed.pk
+        cursor = self.sync()['cursor']
+
+        removed.delete()
+        data = self.sync(cursor)
+        self.assertEqual(data['deleted']['transactions'], [removed_id])
+        # The month's spending changed, so its budget is sent again
+        self.assertEqual(self.ids(data, 'budgets'), [budget.pk])
+        self.assertEqual(Decimal(data['changes']['budgets'][0]['actual_expenses']), Decimal('10'))
+
+        # A device that never saw the transaction still learns it's gone
+        data = self.sync()
+        self.assertEqual(self.ids(data), [kept.pk])
+        self.assertEqual(data['deleted']['transactions'], [removed_id])
+        self.assertTrue(Change.objects.get(model=Change.TRANSACTION, object_id=removed_id).deleted)
+
+    def test_other_users_changes_are_not_sent(self):
+        other = User.objects.create_user(username='other', password='pass12345')
+        Transaction.objects.create(user=other, type='expense', amount=Decimal('1'), date=date(2025, 1, 1))
+        mine = self.add()
+        self.assertEqual(self.ids(self.sync()), [mine.pk])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('sync:sync'), {'cursor': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(SYNC_SETTLE_SECONDS=5)
+    def test_settle_window_holds_back_young_changes(self):
+        settled = self.add()
+        Change.objects.filter(object_id=settled.pk).update(changed_at=timezone.now() - timedelta(seconds=10))
+        young = self.add()
+
+        data = self.sync()
+        self.assertEqual(self.ids(data), [settled.pk])
+        cursor = data['cursor']
+        self.assertEqual(cursor, str(Change.objects.get(object_id=settled.pk).pk))
+
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() + timedelta(seconds=6)):
+            data = self.sync(cursor)
+        self.assertEqual(self.ids(data), [young.pk])
+
+    def test_no_settle_window_by_default(self):
+        txn = self.add()
+        self.assertEqual(self.ids(self.sync()), [txn.pk])
+
+
+class ResponseCacheMixin:
+    def setUp(self):
+        caches['default'].clear()
+        response_cache_stats.clear()
+        self.addCleanup(response_cache_stats.clear)
+        self.user = User.objects.create_user(username='cached', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.add('10')
+
+    def add(self, amount):
+        return Transaction.objects.create(
+            user=self.user, type='expense', amount=Decimal(amount), date=timezone.localdate()
+        )
+
+    def summary(self):
+        response = self.client.get(reverse('transactions:transaction-summary'))
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_hit_after_miss(self):
+        first = self.summary()
+        self.assertEqual(first['X-Cache'], 'MISS')
+        with self.assertNumQueries(1):  # the data version
+            second = self.summary()
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.data, first.data)
+
+        stats = response_cache_stats.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_write_invalidates(self):
+        self.assertEqual(self.summary()['X-Cache'], 'MISS')
+        self.add('5')
+        response = self.summary()
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(Decimal(response.data['total_expenses']), Decimal('15'))
+        self.assertEqual(self.summary()['X-Cache'], 'HIT')
+
+    def test_users_do_not_share_entries(self):
+        self.summary()
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user(username='other', password='pass12345'))
+        response = other.get(reverse('transactions:transaction-summary'))
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(Decimal(response.data['total_expenses']), Decimal('0'))
+
+
+class LocMemResponseCacheTests(ResponseCacheMixin, TestCase):
+    pass
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'apps.sync.cache.RedisCache',
+        'LOCATION': 'redis://fake-response-cache/0',
+        'OPTIONS': {'library': 'apps.sync.fakes'},
+    },
+})
+class FakeRedisResponseCacheTests(ResponseCacheMixin, TestCase):
+    def test_backend_uses_the_configured_library(self):
+        redis = sys.modules.get('redis')
+        client = caches['default']._cache
+        self.assertIsInstance(client, RedisCacheClient)
+        self.assertIs(client._client, fakes.Redis)
+        self.assertIs(client._pool_class, fakes.ConnectionPool)
+        # The library only stands in for redis while the client is built
+        self.assertIs(sys.modules.get('redis'), redis)
+
+        self.summary()
+        self.assertTrue(fakes._servers['redis://fake-response-cache/0'].data)
+
+    def test_expiry_and_add(self):
+        cache = caches['default']
+        self.assertTrue(cache.add('key', {'a': 1}, 60))
+        self.assertFalse(cache.add('key', 'other', 60))
+        self.assertEqual(cache.get('key'), {'a': 1})
+        cache.set('short', 1, 0.05)
+        with mock.patch('time.monotonic', return_value=time.monotonic() + 1):
+            self.assertIsNone(cache.get('short'))
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='etagged', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Category.objects.create(user=self.user, name='Food', type='expense')
+        self.url = reverse('transactions:transaction-summary')
+
+    def get(self, url=None, **headers):
+        return self.client.get(url or self.url, **headers)
+
+    def test_etag(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['ETag'], r'^W/"[0-9a-f]{40}"$')
+        self.assertNotIn('Last-Modified', response)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('Authorization', response['Vary'])
+        # Stable for the same data and request, different per representation
+        self.assertEqual(self.get()['ETag'], response['ETag'])
+        self.assertNotEqual(self.get(f'{self.url}?type=expense')['ETag'], response['ETag'])
+
+    def test_if_none_match_gives_304(self):
+        etag = self.get()['ETag']
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_if_modified_since_is_ignored(self):
+        # A second write within the same second would still match a date
+        self.get()
+        Transaction.objects.create(user=self.user, type='expense', amount=Decimal('5'), date=date(2025, 1, 1))
+        future = http_date(time.time() + 60)
+        self.assertEqual(self.get(HTTP_IF_MODIFIED_SINCE=future).status_code, 200)
+
+    def test_write_changes_the_etag(self):
+        etag = self.get()['ETag']
+        Transaction.objects.create(user=self.user, type='expense', amount=Decimal('5'), date=date(2025, 1, 1))
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_other_users_writes_keep_the_etag(self):
+        etag = self.get()['ETag']
+        other = User.objects.create_user(username='other', password='pass12345')
+        Transaction.objects.create(user=other, type='expense', amount=Decimal('5'), date=date(2025, 1, 1))
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_304_costs_one_query(self):
+        for url in (
+            self.url,
+            reverse('transactions:transaction-timeseries'),
+            reverse('categories:category-list'),
+        ):
+            etag = self.get(url)['ETag']
+            with self.assertNumQueries(1):
+                response = self.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
@@ -0,0 +1,97 @@
+"""
+Per-user data versions and conditional GET.
+
+Every write to a user's transactions, categories or budgets appends a
+row to the sync change log (see signals.py) with a higher id than any
+before it, so the user's newest Change row is a data version that moves
+on every write: its id is the version and its ``changed_at`` the time
+of the last write. Reading it is a single index lookup.
+
+Each user's Change rows become visible in id order (see changes.py), so
+a write always moves the version once it commits. On databases without
+that guarantee, responses computed within SYNC_SETTLE_SECONDS of the
+latest change are neither validated nor cached, like sync holds those
+changes back.
+
+``conditional`` wraps read-only viewset actions with ETag handling. A
+request whose ETag still matches gets a 304 before the wrapped action
+(and its aggregate queries) runs. There is deliberately no
+Last-Modified: HTTP dates have whole-second precision, so a second write
+within the same second would leave If-Modified-Since matching, and the
+date doesn't cover the query string or today's date either.
+"""
+
+import functools
+import hashlib
+
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+
+from .changes import settled_before
+from .models import Change
+
+
+def data_version(user):
+    """``(version, last_modified)`` of the user's data; ``(0, None)`` before any write."""
+    latest = (
+        Change.objects.filter(user=user)
+        .order_by('-id')
+        .values_list('id', 'changed_at')
+        .first()
+    )
+    return latest or (0, None)
+
+
+def request_version(request):
+    """``data_version()`` of the requesting user, read once per request."""
+    if not hasattr(request, '_data_version'):
+        request._data_version = data_version(request.user)
+    return request._data_version
+
+
+def is_settled(changed_at):
+    cutoff = settled_before()
+    return changed_at is None or cutoff is None or changed_at <= cutoff
+
+
+def fingerprint(request, version):
+    """
+    Hash identifying this user, data version and representation.
+
+    The query string and the accepted renderer select different
+    representations. Today's date is included because several views
+    report on "the current month".
+    """
+    parts = [
+        str(request.user.pk),
+        str(version),
+        request.path,
+        request.META.get('QUERY_STRING', ''),
+        getattr(getattr(request, 'accepted_renderer', None), 'format', '') or '',
+        timezone.localdate().isoformat(),
+    ]
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()
+
+
+def conditional(action):
+    """Serve 304 Not Modified for a viewset action when the user's data hasn't changed."""
+    @functools.wraps(action)
+    def wrapper(self, request, *args, **kwargs):
+        version, changed_at = request_version(request)
+        if not is_settled(changed_at):
+            return action(self, request, *args, **kwargs)
+
+        etag = f'W/"{fingerprint(request, version)}"'
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = action(self, request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+        response['ETag'] = etag
+        # Per-user data: shared caches must key on the credentials, and
+        # clients should revalidate rather than reuse blindly
+        patch_vary_headers(response, ['Authorization'])
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+    return wrapper
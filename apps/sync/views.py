@@ -0,0 +1,55 @@
+from django.conf import settings
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from .cache import response_cache_stats
+from .changes import changes_since
+
+
+@api_view(['GET'])
+def sync(request):
+    """
+    Delta sync for offline clients.
+    
+    GET /api/sync/?cursor=<cursor>&limit=<n>
+    
+    Returns the transactions, categories and budgets created or updated
+    since ``cursor``, plus the ids of those deleted. Start without a
+    cursor (or with 0) to receive everything, store the returned
+    ``cursor`` and send it next time. While ``has_more`` is true, call
+    again straight away with the new cursor.
+    
+    Response:
+    {
+        "cursor": "1042",
+        "has_more": false,
+        "changes": {"transactions": [...], "categories": [...], "budgets": [...]},
+        "deleted": {"transactions": [17], "categories": [], "budgets": []}
+    }
+    """
+    try:
+        cursor = int(request.query_params.get('cursor') or 0)
+        limit = int(request.query_params.get('limit') or settings.SYNC_PAGE_SIZE)
+        if cursor < 0 or limit < 1:
+            raise ValueError
+    except ValueError:
+        return Response(
+            {'error': 'cursor and limit must be non-negative integers'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    limit = min(limit, settings.SYNC_PAGE_SIZE)
+    return Response(changes_since(request.user, cursor, limit))
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def cache_stats(request):
+    """
+    Response cache hit/miss counters for this worker process (staff only)
+    
+    GET /api/sync/cache/stats/
+    """
+    return Response(response_cache_stats.stats())
@@ -1,9 +1,16 @@
 from django.contrib import admin
-from .models import Transaction
+from .models import Transaction, MonthlyRollup
 
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
     list_display = ['description', 'type', 'amount', 'category', 'user', 'date']
     list_filter = ['type', 'date', 'created_at']
     search_fields = ['description', 'user__username']
-    date_hierarchy = 'date'
\ No newline at end of file
+    date_hierarchy = 'date'
+
+@admin.register(MonthlyRollup)
+class MonthlyRollupAdmin(admin.ModelAdmin):
+    list_display = ['user', 'month', 'type', 'category', 'total', 'count']
+    list_filter = ['type', 'month']
+    search_fields = ['user__username']
+    date_hierarchy = 'month'
@@ -0,0 +1,208 @@
+"""
+Income/expense aggregation shared by the analytics endpoints.
+
+Totals are computed with conditional aggregation (``SUM(...) FILTER
+(WHERE type = ...)``) so income and expense figures come back from a
+single query. The same helpers work over raw transactions and over the
+monthly rollup; only the column names differ.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.db.models import Count, DateField, F, Q, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek, TruncYear
+
+from .models import MonthlyRollup
+from .rollups import CENT, next_month
+
+
+RAW = {
+    'amount': 'amount',
+    'count': lambda condition: Count('id', filter=condition),
+    'month': TruncMonth('date'),
+    'date': 'date',
+}
+ROLLUP = {
+    'amount': 'total',
+    'count': lambda condition: Sum('count', filter=condition),
+    'month': F('month'),
+    'date': 'month',
+}
+
+ZERO = Decimal('0.00')
+
+INTERVALS = {'day': TruncDay, 'week': TruncWeek, 'month': TruncMonth, 'year': TruncYear}
+
+
+def source_for(queryset):
+    """Column mapping for a Transaction or MonthlyRollup queryset."""
+    return ROLLUP if queryset.model is MonthlyRollup else RAW
+
+
+def totals_expressions(source):
+    income = Q(type='income')
+    expense = Q(type='expense')
+    return {
+        'total_income': Sum(source['amount'], filter=income),
+        'total_expenses': Sum(source['amount'], filter=expense),
+        'income_count': source['count'](income),
+        'expense_count': source['count'](expense),
+    }
+
+
+def rounded(totals):
+    """Amounts rounded to cents; SQLite sums decimals as floats."""
+    return {
+        key: value.quantize(CENT) if isinstance(value, Decimal) else value
+        for key, value in totals.items()
+    }
+
+
+def format_totals(row):
+    """
+    Render one aggregate row the way the summary endpoint always has.
+
+    Amounts are rounded to cents first (see ``rounded()``), so every
+    endpoint reports the same figures to the cent on every database.
+    """
+    row = rounded(row)
+    # Empty and zero-filled buckets render as "0.00" like any other amount
+    income = row.get('total_income') or ZERO
+    expenses = row.get('total_expenses') or ZERO
+    return {
+        'total_income': str(income),
+        'total_expenses': str(expenses),
+        'balance': str(income - expenses),
+        'income_count': row.get('income_count') or 0,
+        'expense_count': row.get('expense_count') or 0,
+    }
+
+
+def totals(queryset):
+    """Income/expense totals and counts in one query."""
+    return format_totals(queryset.order_by().aggregate(**totals_expressions(source_for(queryset))))
+
+
+def by_category(queryset):
+    """Totals per category, largest expense first."""
+    rows = (
+        queryset.order_by()
+        .values('category_id', 'category__name')
+        .annotate(**totals_expressions(source_for(queryset)))
+        .order_by(F('total_expenses').desc(nulls_last=True), 'category__name')
+    )
+    return [
+        {
+            'category_id': row['category_id'],
+            'category_name': row['category__name'] or 'Uncategorized',
+            **format_totals(row),
+        }
+        for row in rows
+    ]
+
+
+def by_month(queryset):
+    """Totals per calendar month, oldest first."""
+    source = source_for(queryset)
+    rows = (
+        queryset.order_by()
+        .annotate(period=source['month'])
+        .values('period')
+        .annotate(**totals_expressions(source))
+        .order_by('period')
+    )
+    return [{'month': row['period'].isoformat(), **format_totals(row)} for row in rows]
+
+
+def truncate(value, interval):
+    """Start of the ``interval`` bucket containing ``value`` (weeks start on Monday)."""
+    if interval == 'week':
+        return value - timedelta(days=value.weekday())
+    if interval == 'month':
+        return value.replace(day=1)
+    if interval == 'year':
+        return value.replace(month=1, day=1)
+    return value
+
+
+def periods(start, end, interval):
+    """Every bucket start from the bucket containing ``start`` to the one containing ``end``."""
+    period, end = truncate(start, interval), truncate(end, interval)
+    while period <= end:
+        yield period
+        if interval == 'day':
+            period += timedelta(days=1)
+        elif interval == 'week':
+            period += timedelta(days=7)
+        elif interval == 'month':
+            period = next_month(period)
+        else:
+            period = period.replace(year=period.year + 1)
+
+
+def add_totals(total, row):
+    for key in ('total_income', 'total_expenses', 'income_count', 'expense_count'):
+        total[key] = (total.get(key) or 0) + (row[key] or 0)
+
+
+def series(queryset, interval, max_buckets, start=None, end=None, split_category=False):
+    """
+    Totals per ``interval`` bucket from one grouped query, zero-filled.
+
+    Buckets run from ``start`` to ``end``, or across the buckets that have
+    data when a bound is omitted. With ``split_category`` the same query
+    is grouped by category too, and each category gets its own zero-filled
+    series next to the overall one. Raises ValueError if the range spans
+    more than ``max_buckets`` buckets.
+    """
+    source = source_for(queryset)
+    fields = ['period', 'category_id', 'category__name'] if split_category else ['period']
+    rows = list(
+        queryset.order_by()
+        .annotate(period=INTERVALS[interval](source['date'], output_field=DateField()))
+        .values(*fields)
+        .annotate(**totals_expressions(source))
+    )
+
+    found = [row['period'] for row in rows]
+    start = start or min(found, default=None)
+    end = end or max(found, default=None)
+    buckets = list(islice(periods(start, end, interval), max_buckets + 1)) if start and end else []
+    if len(buckets) > max_buckets:
+        raise ValueError(
+            f"The range spans more than {max_buckets} {interval} buckets. "
+            f"Use a larger interval or a shorter range."
+        )
+
+    overall = defaultdict(dict)
+    categories = {}
+    for row in rows:
+        add_totals(overall[row['period']], row)
+        if split_category:
+            category = categories.setdefault(row['category_id'], {
+                'name': row['category__name'], 'periods': defaultdict(dict), 'totals': {},
+            })
+            add_totals(category['periods'][row['period']], row)
+            add_totals(category['totals'], row)
+
+    def fill(values):
+        return [{'period': period.isoformat(), **format_totals(values.get(period, {}))} for period in buckets]
+
+    result = {'series': fill(overall)}
+    if split_category:
+        ordered = sorted(
+            categories.items(),
+            key=lambda item: (-(item[1]['totals'].get('total_expenses') or 0), item[1]['name'] or ''),
+        )
+        result['by_category'] = [
+            {
+                'category_id': category_id,
+                'category_name': category['name'] or 'Uncategorized',
+                'series': fill(category['periods']),
+            }
+            for category_id, category in ordered
+        ]
+    return result
@@ -0,0 +1,93 @@
+"""
+Streaming export of transactions as CSV or NDJSON.
+
+Rows are read with ``.values().iterator(chunk_size=...)`` (a server-side
+cursor on PostgreSQL) and encoded in small batches, so an export holds one
+chunk of rows in memory however long the user's history is. The encoded
+stream can optionally be gzipped on the fly.
+"""
+
+import csv
+import io
+import zlib
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+
+# Column name -> values() lookup; matches TransactionSerializer's output
+COLUMNS = {
+    'id': 'id',
+    'date': 'date',
+    'type': 'type',
+    'amount': 'amount',
+    'category': 'category_id',
+    'category_name': 'category__name',
+    'description': 'description',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+}
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+
+def rows(queryset):
+    """Yield one dict per transaction, keyed by export column."""
+    lookups = list(COLUMNS.values())
+    for values in queryset.values(*lookups).iterator(chunk_size=settings.TRANSACTION_EXPORT_CHUNK_SIZE):
+        row = {column: values[lookup] for column, lookup in COLUMNS.items()}
+        row['amount'] = str(row['amount'])
+        row['created_at'] = timezone.localtime(row['created_at']).isoformat()
+        row['updated_at'] = timezone.localtime(row['updated_at']).isoformat()
+        yield row
+
+
+def batched_text(lines, size=500):
+    """Join encoded lines into larger pieces to keep per-yield overhead low."""
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= size:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def csv_lines(queryset):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(COLUMNS))
+    writer.writeheader()
+    for row in rows(queryset):
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def ndjson_lines(queryset):
+    encoder = DjangoJSONEncoder()
+    for row in rows(queryset):
+        yield encoder.encode(row) + '\n'
+
+
+def gzipped(chunks):
+    """Gzip a stream of byte strings incrementally."""
+    compressor = zlib.compressobj(wbits=31)  # 31 = gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream(queryset, fmt, compress=False):
+    """Byte chunks of the export of ``queryset`` in ``fmt``."""
+    lines = csv_lines(queryset) if fmt == 'csv' else ndjson_lines(queryset)
+    chunks = (text.encode() for text in batched_text(lines))
+    return gzipped(chunks) if compress else chunks
@@ -0,0 +1,291 @@
+"""
+Bulk import of bank statements (CSV or OFX).
+
+The uploaded file is read as a stream and handled in chunks of
+TRANSACTION_IMPORT_CHUNK_SIZE rows. Each chunk is validated in Python,
+its categories are resolved through an in-memory name -> id map, and the
+valid rows are inserted with one ``bulk_create`` inside one database
+transaction. Invalid rows are reported with their row number and skipped;
+they never abort the rest of the file. Only one chunk is held in memory at
+a time, so memory use does not grow with the size of the file.
+
+CSV files need a header row with at least ``date`` and ``amount``.
+``type``, ``category`` and ``description`` are optional. Without a type
+column, negative amounts are expenses and positive amounts are income;
+amounts are always stored unsigned.
+"""
+
+import codecs
+import csv
+import re
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+
+from apps.categories.models import Category
+from .models import Transaction
+from .signals import transactions_bulk_created
+
+
+class StatementError(Exception):
+    """The file as a whole can't be imported (bad format or header)."""
+
+
+TYPES = {choice for choice, _ in Transaction.TYPE_CHOICES}
+
+CSV_ALIASES = {
+    'date': 'date', 'posted': 'date', 'transaction date': 'date',
+    'amount': 'amount', 'value': 'amount',
+    'type': 'type',
+    'category': 'category', 'category_name': 'category',
+    'description': 'description', 'memo': 'description', 'details': 'description', 'name': 'description',
+}
+
+AMOUNT_FIELD = Transaction._meta.get_field('amount')
+MAX_AMOUNT = Decimal(10) ** (AMOUNT_FIELD.max_digits - AMOUNT_FIELD.decimal_places)
+CATEGORY_NAME_LENGTH = Category._meta.get_field('name').max_length
+
+
+def detect_format(filename, fmt=None):
+    """'csv' or 'ofx', from an explicit ``fmt`` or the file extension."""
+    fmt = (fmt or filename.rsplit('.', 1)[-1]).lower()
+    if fmt in ('ofx', 'qfx'):
+        return 'ofx'
+    if fmt in ('csv', 'txt'):
+        return 'csv'
+    raise StatementError(f"Unsupported file format: {fmt!r}. Use CSV or OFX.")
+
+
+def decode(binary_file):
+    """Decode an uploaded file chunk by chunk without reading it whole."""
+    reader = codecs.getincrementaldecoder('utf-8-sig')(errors='replace')
+    for chunk in binary_file.chunks():
+        text = reader.decode(chunk)
+        if text:
+            yield text
+    tail = reader.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+def lines(text_chunks):
+    buffer = ''
+    for text in text_chunks:
+        buffer += text
+        *complete, buffer = buffer.split('\n')
+        for line in complete:
+            yield line + '\n'
+    if buffer:
+        yield buffer
+
+
+def read_csv(binary_file):
+    """Yield ``(row_number, fields)`` with fields keyed by canonical column name."""
+    reader = csv.reader(lines(decode(binary_file)))
+    header = next(reader, None)
+    if header is None:
+        raise StatementError("The file is empty.")
+    columns = [CSV_ALIASES.get(name.strip().lower()) for name in header]
+    missing = {'date', 'amount'} - set(columns)
+    if missing:
+        raise StatementError(f"Missing column(s): {', '.join(sorted(missing))}.")
+
+    for values in reader:
+        if not any(value.strip() for value in values):
+            continue
+        fields = {
+            column: value.strip()
+            for column, value in zip(columns, values)
+            if column is not None
+        }
+        yield reader.line_num, fields
+
+
+OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+
+def ofx_tags(binary_file):
+    """Yield ``(closing, tag, value)`` for every tag in an OFX file."""
+    buffer = ''
+    for text in decode(binary_file):
+        buffer += text
+        # Only parse up to the last tag opening; the rest waits for more input
+        cut = buffer.rfind('<')
+        if cut <= 0:
+            continue
+        ready, buffer = buffer[:cut], buffer[cut:]
+        yield from OFX_TAG.findall(ready)
+    yield from OFX_TAG.findall(buffer)
+
+
+def read_ofx(binary_file):
+    """
+    Yield ``(transaction_number, fields)`` for each <STMTTRN> in an OFX file.
+
+    Handles both SGML (OFX 1.x, unclosed leaf tags) and XML (OFX 2.x)
+    files, including ones with no line breaks at all.
+    """
+    current = None
+    number = 0
+    for closing, tag, value in ofx_tags(binary_file):
+        tag = tag.upper()
+        if tag == 'STMTTRN':
+            if closing and current is not None:
+                number += 1
+                yield number, ofx_fields(current)
+            current = None if closing else {}
+        elif current is not None and not closing:
+            current[tag] = value.strip()
+
+
+def ofx_fields(values):
+    name = values.get('NAME', '')
+    memo = values.get('MEMO', '')
+    return {
+        'date': values.get('DTPOSTED', '')[:8],
+        'amount': values.get('TRNAMT', ''),
+        'description': ' - '.join(part for part in (name, memo) if part),
+    }
+
+
+def parse_date(value, date_format=None):
+    if date_format:
+        return datetime.strptime(value, date_format).date()
+    if len(value) == 8 and value.isdigit():
+        return datetime.strptime(value, '%Y%m%d').date()
+    return date.fromisoformat(value)
+
+
+def parse_row(fields, date_format=None):
+    """
+    Validate one row.
+
+    Returns ``(values, errors)``: the cleaned values, or a dict of field
+    errors in the same shape the serializer would produce.
+    """
+    errors = {}
+    values = {'description': fields.get('description', '')}
+
+    try:
+        values['date'] = parse_date(fields.get('date', ''), date_format)
+    except ValueError:
+        errors['date'] = ["Invalid date."]
+
+    amount = None
+    try:
+        amount = Decimal(fields.get('amount', '').replace(',', ''))
+        if not amount.is_finite():
+            raise InvalidOperation
+    except InvalidOperation:
+        errors['amount'] = ["A valid number is required."]
+    else:
+        if abs(amount) >= MAX_AMOUNT:
+            errors['amount'] = [f"Ensure the amount is less than {MAX_AMOUNT}."]
+        elif amount != amount.quantize(Decimal('0.01')):
+            errors['amount'] = ["Ensure that there are no more than 2 decimal places."]
+        else:
+            values['amount'] = abs(amount)
+
+    txn_type = fields.get('type', '').lower()
+    if txn_type:
+        if txn_type not in TYPES:
+            errors['type'] = [f'"{txn_type}" is not a valid choice.']
+        values['type'] = txn_type
+    elif amount is not None and 'amount' not in errors:
+        if amount == 0:
+            errors['type'] = ["Can't infer the type of a zero amount."]
+        values['type'] = 'expense' if amount < 0 else 'income'
+
+    category = fields.get('category', '')
+    if len(category) > CATEGORY_NAME_LENGTH:
+        errors['category'] = [f"Ensure this field has no more than {CATEGORY_NAME_LENGTH} characters."]
+    values['category'] = category or None
+
+    return values, errors
+
+
+def save_transactions(user, instances):
+    """
+    Insert ``instances`` (all owned by ``user``) in one transaction.
+
+    Every bulk insert of transactions should go through here so the
+    listeners of transactions_bulk_created see it.
+    """
+    with transaction.atomic():
+        Transaction.objects.bulk_create(instances)
+        transactions_bulk_created.send(sender=Transaction, user=user, transactions=instances)
+
+
+class Importer:
+    """
+    Imports one statement file for one user.
+
+    Usage::
+
+        result = Importer(user).run(uploaded_file, 'csv')
+    """
+
+    def __init__(self, user, date_format=None, default_category=None):
+        self.user = user
+        self.date_format = date_format
+        self.default_category = default_category or None
+        self.chunk_size = settings.TRANSACTION_IMPORT_CHUNK_SIZE
+        self.max_errors = settings.TRANSACTION_IMPORT_MAX_ERRORS
+        self.categories = {
+            (name, txn_type): pk
+            for pk, name, txn_type in Category.objects.filter(user=user).values_list('id', 'name', 'type')
+        }
+        self.imported = 0
+        self.failed = 0
+        self.categories_created = 0
+        self.errors = []
+
+    def run(self, binary_file, fmt):
+        rows = read_ofx(binary_file) if fmt == 'ofx' else read_csv(binary_file)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            self.import_chunk(chunk)
+        return self.result()
+
+    def import_chunk(self, chunk):
+        instances = []
+        for number, fields in chunk:
+            values, errors = parse_row(fields, self.date_format)
+            if errors:
+                self.add_error(number, errors)
+                continue
+            category = values.pop('category') or self.default_category
+            values['category_id'] = self.category_id(category, values['type']) if category else None
+            instances.append(Transaction(user=self.user, **values))
+
+        if instances:
+            save_transactions(self.user, instances)
+            self.imported += len(instances)
+
+    def category_id(self, name, txn_type):
+        key = (name, txn_type)
+        if key not in self.categories:
+            category, created = Category.objects.get_or_create(user=self.user, name=name, type=txn_type)
+            self.categories[key] = category.pk
+            self.categories_created += created
+        return self.categories[key]
+
+    def add_error(self, row, errors):
+        self.failed += 1
+        # Keep the response (and memory) bounded on a badly broken file
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'row': row, 'errors': errors})
+
+    def result(self):
+        return {
+            'imported': self.imported,
+            'failed': self.failed,
+            'categories_created': self.categories_created,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+        }
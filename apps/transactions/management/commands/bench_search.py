@@ -0,0 +1,98 @@
+import random
+import statistics
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.filters import OrderingFilter, SearchFilter
+from rest_framework.test import force_authenticate
+
+from apps.transactions.importers import save_transactions
+from apps.transactions.models import Transaction
+from apps.transactions.search import TransactionSearchFilter
+from apps.transactions.views import TransactionViewSet
+
+MERCHANTS = [
+    'Walmart', 'Starbucks', 'Amazon', 'Netflix', 'Spotify', 'Uber', 'Shell', 'Target',
+    'Costco', 'Apple', 'Airbnb', 'Zomato', 'Swiggy', 'Flipkart', 'Reliance', 'Tesco',
+]
+WORDS = [
+    'grocery', 'coffee', 'subscription', 'fuel', 'rent', 'salary', 'refund', 'dinner',
+    'lunch', 'taxi', 'electricity', 'insurance', 'gym', 'pharmacy', 'books', 'gift',
+    'transfer', 'interest', 'bonus', 'parking', 'toll', 'hotel', 'flight', 'repair',
+]
+QUERIES = ['coffee', 'star', 'walmart grocery', 'electricity payment', 'zzz']
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare list latency of DRF's SearchFilter (ILIKE scan) with the indexed "
+        "TransactionSearchFilter. Generates --rows transactions for a benchmark "
+        "user on first run and reuses them afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help="Transactions to search (default 1,000,000).")
+        parser.add_argument('--runs', type=int, default=5, help="Requests per query and backend (default 5).")
+        parser.add_argument('--username', default='bench-search', help="Benchmark user (default bench-search).")
+
+    def handle(self, *args, **options):
+        user, _ = User.objects.get_or_create(username=options['username'])
+        existing = Transaction.objects.filter(user=user).count()
+        if existing < options['rows']:
+            self.generate(user, options['rows'] - existing)
+
+        backends = {
+            'SearchFilter': [DjangoFilterBackend, SearchFilter, OrderingFilter],
+            'TransactionSearchFilter': [DjangoFilterBackend, TransactionSearchFilter, OrderingFilter],
+        }
+        self.stdout.write(f"{options['rows']:,} rows, median of {options['runs']} requests")
+        with override_settings(ALLOWED_HOSTS=['*']):
+            for query in QUERIES:
+                line = f"  {query!r:<24}"
+                for label, filter_backends in backends.items():
+                    view_class = type('BenchViewSet', (TransactionViewSet,), {
+                        'filter_backends': filter_backends,
+                        'search_fields': ['description'],  # used by SearchFilter only
+                    })
+                    view = view_class.as_view({'get': 'list'})
+                    timings, count = self.measure(view, user, query, options['runs'])
+                    line += f"  {label} {statistics.median(timings) * 1000:8.1f} ms ({count} hits)"
+                self.stdout.write(line)
+
+    def measure(self, view, user, query, runs):
+        factory = RequestFactory()
+        timings = []
+        count = None
+        for _ in range(runs):
+            request = factory.get('/api/transactions/', {'search': query})
+            force_authenticate(request, user=user)
+            started = time.perf_counter()
+            response = view(request)
+            timings.append(time.perf_counter() - started)
+            count = response.data['count']
+        return timings, count
+
+    def generate(self, user, rows):
+        self.stdout.write(f"Generating {rows:,} transactions for {user.username}...")
+        rng = random.Random(rows)
+        start = date.today() - timedelta(days=5 * 365)
+        batch = 10_000
+        for offset in range(0, rows, batch):
+            save_transactions(user, [
+                Transaction(
+                    user=user,
+                    type=rng.choice(('income', 'expense')),
+                    amount=Decimal(rng.randint(100, 500_000)) / 100,
+                    description=f"{rng.choice(MERCHANTS)} {' '.join(rng.sample(WORDS, 2))} #{rng.randint(1, 99999)}",
+                    date=start + timedelta(days=rng.randint(0, 5 * 365)),
+                )
+                for _ in range(min(batch, rows - offset))
+            ])
+            self.stdout.write(f"  {min(offset + batch, rows):,}", ending='\r')
+        self.stdout.write('')
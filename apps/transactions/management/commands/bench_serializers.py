@@ -0,0 +1,102 @@
+import statistics
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from apps.categories.models import Category
+from apps.transactions.importers import save_transactions
+from apps.transactions.models import Transaction
+from apps.transactions.serializers import TransactionSerializer, TransactionValuesSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def model_serializer(queryset):
+    return TransactionSerializer(queryset, many=True).data
+
+
+def model_serializer_joined(queryset):
+    return TransactionSerializer(queryset.select_related('category'), many=True).data
+
+
+def values_serializer(queryset):
+    return TransactionValuesSerializer(TransactionValuesSerializer.values(queryset), many=True).data
+
+
+MODES = {
+    'ModelSerializer (lazy category)': model_serializer,
+    'ModelSerializer + select_related': model_serializer_joined,
+    'TransactionValuesSerializer': values_serializer,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare serializing transaction lists with TransactionSerializer and the "
+        ".values()-based TransactionValuesSerializer. Uses throwaway rows inside a "
+        "rolled back transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', type=int, nargs='+', default=[1000, 10000],
+            help="List sizes to serialize (default 1000 10000).",
+        )
+        parser.add_argument('--runs', type=int, default=3, help="Runs per mode (default 3).")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user('bench-serializers')
+                categories = [
+                    Category.objects.create(user=user, name=f'Category {i}', type='expense')
+                    for i in range(10)
+                ]
+                created = 0
+                for rows in sorted(options['rows']):
+                    save_transactions(user, [
+                        Transaction(
+                            user=user, category=categories[i % len(categories)], type='expense',
+                            amount=Decimal(i % 5000) / 100 + 1, description=f'Row {i}',
+                            date=date(2024, 1, 1) + timedelta(days=i % 365),
+                        )
+                        for i in range(created, rows)
+                    ])
+                    created = rows
+                    self.compare(Transaction.objects.filter(user=user)[:rows], rows, options['runs'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def compare(self, queryset, rows, runs):
+        self.stdout.write(f"{rows:,} rows, median of {runs} runs")
+        reference = None
+        for label, serialize in MODES.items():
+            timings = []
+            for _ in range(runs):
+                counter = QueryCounter()
+                with connection.execute_wrapper(counter):
+                    started = time.perf_counter()
+                    data = serialize(queryset.all())
+                    timings.append(time.perf_counter() - started)
+            reference = reference if reference is not None else data
+            same = 'identical' if data == reference else 'DIFFERENT OUTPUT'
+            self.stdout.write(
+                f"  {label:<34} {statistics.median(timings) * 1000:9.1f} ms"
+                f"  {counter.count:6} queries  {same}"
+            )
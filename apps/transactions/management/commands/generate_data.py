@@ -0,0 +1,240 @@
+import csv
+import io
+import math
+import random
+import time
+from collections import defaultdict
+from itertools import accumulate
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.budgets import alerts
+from apps.budgets.models import Budget
+from apps.categories.models import Category
+from apps.sync import changes
+from apps.transactions import rollups
+from apps.transactions.models import Transaction
+
+# name -> (weight, median amount, merchants). Each user ranks the
+# categories in their own random order and weights them by rank, so
+# every user has a few dominant categories and a long tail.
+EXPENSE_CATEGORIES = {
+    'Groceries': (1, 45, ['Walmart', 'Costco', 'Tesco', 'Reliance Fresh', 'Farmers market']),
+    'Dining': (1, 25, ['Starbucks', 'Zomato', 'Swiggy', 'Pizza place', 'Cafe']),
+    'Transport': (1, 18, ['Uber', 'Shell', 'Metro card', 'Parking', 'Toll']),
+    'Shopping': (1, 60, ['Amazon', 'Flipkart', 'Target', 'IKEA', 'Mall']),
+    'Utilities': (1, 90, ['Electricity', 'Water', 'Internet', 'Mobile plan', 'Gas']),
+    'Entertainment': (1, 30, ['Netflix', 'Spotify', 'Cinema', 'Concert', 'Steam']),
+    'Health': (1, 55, ['Pharmacy', 'Clinic', 'Gym', 'Dentist', 'Insurance']),
+    'Rent': (0.15, 1200, ['Landlord', 'Rent transfer']),
+    'Travel': (0.2, 300, ['Airbnb', 'Airline', 'Hotel', 'Train tickets']),
+    'Education': (0.2, 120, ['Course', 'Books', 'Tuition']),
+    'Gifts': (0.3, 50, ['Gift shop', 'Flowers', 'Donation']),
+}
+INCOME_CATEGORIES = {
+    'Salary': (8, 3500, ['Employer payroll']),
+    'Freelance': (3, 600, ['Client invoice', 'Upwork', 'Consulting']),
+    'Interest': (2, 15, ['Savings interest', 'Dividend']),
+}
+INCOME_SHARE = 0.08          # of transactions
+UNCATEGORIZED_SHARE = 0.03   # of transactions
+CATEGORY_SKEW = 1.2          # Zipf exponent over each user's category ranking
+AMOUNT_SPREAD = 0.8          # sigma of the log-normal amounts
+WORDS = ['weekly', 'monthly', 'online', 'store', 'payment', 'refund', 'order', 'card', 'cash', 'transfer']
+
+COLUMNS = ['user_id', 'category_id', 'type', 'amount', 'description', 'date', 'created_at', 'updated_at']
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate synthetic users with categories, transactions and monthly budgets "
+        "for load testing. The same --seed and arguments always produce the same data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help="Users to create (default 10).")
+        parser.add_argument('--transactions', type=int, default=1000, help="Transactions per user (default 1,000).")
+        parser.add_argument('--years', type=int, default=3, help="Years of history per user (default 3).")
+        parser.add_argument(
+            '--end', type=date.fromisoformat, default=None,
+            help="Last date of the history, YYYY-MM-DD (default today). Pin it to reproduce data on another day.",
+        )
+        parser.add_argument('--seed', type=int, default=0, help="Random seed (default 0).")
+        parser.add_argument('--prefix', default='loadtest', help="Username prefix (default loadtest).")
+        parser.add_argument('--password', default='loadtest123', help="Password of every generated user.")
+        parser.add_argument('--batch-size', type=int, default=10_000, help="Rows per insert (default 10,000).")
+        parser.add_argument(
+            '--no-copy', action='store_true',
+            help="On PostgreSQL, use batched INSERTs instead of COPY.",
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['transactions'] < 0 or options['years'] < 1 or options['batch_size'] < 1:
+            raise CommandError("--users, --years and --batch-size must be positive, --transactions not negative.")
+
+        usernames = [f"{options['prefix']}{index:05d}" for index in range(options['users'])]
+        taken = User.objects.filter(username__in=usernames).count()
+        if taken:
+            raise CommandError(f"{taken} of the usernames already exist. Use another --prefix.")
+
+        end = options['end'] or timezone.localdate()
+        start = date(end.year - options['years'], end.month, 1)
+        use_copy = connection.vendor == 'postgresql' and not options['no_copy']
+        self.stdout.write(
+            f"Generating {options['users']:,} users x {options['transactions']:,} transactions "
+            f"from {start} to {end} (seed {options['seed']}, {'COPY' if use_copy else 'batched INSERT'})"
+        )
+
+        started = time.perf_counter()
+        with transaction.atomic():
+            users = self.create_users(usernames, options['password'])
+            budgets = []
+            for index, user in enumerate(users):
+                rng = random.Random(f"{options['seed']}:{index}")
+                categories = self.create_categories(user)
+                spent = self.create_transactions(
+                    user, categories, rng, start, end, options['transactions'], options['batch_size'], use_copy,
+                )
+                budgets.extend(self.budgets(user, spent, rng, start, end))
+                self.stdout.write(f"  users {index + 1:,}/{len(users):,}", ending='\r')
+            self.stdout.write('')
+            Budget.objects.bulk_create(budgets, batch_size=options['batch_size'])
+
+            # The rows above were written without signals; bring the
+            # derived data up to date in bulk
+            user_ids = [user.pk for user in users]
+            for offset in range(0, len(user_ids), 100):
+                chunk = user_ids[offset:offset + 100]
+                rollups.rebuild(chunk)
+                changes.record_all(chunk)
+            months = defaultdict(list)
+            for budget in budgets:
+                months[budget.user_id].append(budget.month)
+            for user_id, user_months in months.items():
+                alerts.evaluate(user_id, user_months)
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        total = options['users'] * options['transactions']
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {total:,} transactions and {len(budgets):,} budgets for {len(users):,} users "
+            f"in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} transactions/s)."
+        ))
+
+    def create_users(self, usernames, password):
+        # Hashing is deliberately slow; every user shares the one hash
+        password = make_password(password)
+        return User.objects.bulk_create([
+            User(username=username, email=f'{username}@example.com', password=password)
+            for username in usernames
+        ])
+
+    def create_categories(self, user):
+        """The user's categories as (Category, weight, median amount, merchants) per type."""
+        created = Category.objects.bulk_create([
+            Category(user=user, name=name, type=txn_type)
+            for txn_type, spec in (('expense', EXPENSE_CATEGORIES), ('income', INCOME_CATEGORIES))
+            for name in spec
+        ])
+        specs = {**EXPENSE_CATEGORIES, **INCOME_CATEGORIES}
+        return {
+            txn_type: [(category, *specs[category.name]) for category in created if category.type == txn_type]
+            for txn_type in ('expense', 'income')
+        }
+
+    def create_transactions(self, user, categories, rng, start, end, count, batch_size, use_copy):
+        """Insert ``count`` transactions in batches; returns expenses per month."""
+        # Rank the expense categories in a per-user order, Zipf-weighted
+        ranked = list(categories['expense'])
+        rng.shuffle(ranked)
+        choices = {}
+        for txn_type, options in (('expense', ranked), ('income', categories['income'])):
+            weights = [
+                weight / (rank + 1) ** CATEGORY_SKEW if txn_type == 'expense' else weight
+                for rank, (_, weight, *_) in enumerate(options)
+            ]
+            choices[txn_type] = (
+                [(category.pk, math.log(median), merchants) for category, _, median, merchants in options],
+                list(accumulate(weights)),
+            )
+
+        dates = [start + timedelta(days=day) for day in range((end - start).days + 1)]
+        spent = defaultdict(Decimal)
+        for offset in range(0, count, batch_size):
+            rows = []
+            for _ in range(min(batch_size, count - offset)):
+                txn_type = 'income' if rng.random() < INCOME_SHARE else 'expense'
+                options, cum_weights = choices[txn_type]
+                category_id, mu, merchants = rng.choices(options, cum_weights=cum_weights)[0]
+                amount = f'{max(rng.lognormvariate(mu, AMOUNT_SPREAD), 0.5):.2f}'
+                txn_date = rng.choice(dates)
+                description = f"{rng.choice(merchants)} {rng.choice(WORDS)}"
+                if rng.random() < UNCATEGORIZED_SHARE:
+                    category_id = None
+                rows.append((category_id, txn_type, amount, description, txn_date))
+                if txn_type == 'expense':
+                    spent[txn_date.replace(day=1)] += Decimal(amount)
+            # Date order keeps index inserts local
+            rows.sort(key=lambda row: row[4])
+            if use_copy:
+                self.copy(user, rows)
+            else:
+                self.insert(user, rows)
+        return spent
+
+    def insert(self, user, rows):
+        """
+        Insert one batch with a single prepared INSERT.
+
+        bulk_create spends most of its time compiling the statement from
+        model instances; the values here are already in column form.
+        """
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {quote(Transaction._meta.db_table)} ({', '.join(map(quote, COLUMNS))}) "
+                f"VALUES ({', '.join(['%s'] * len(COLUMNS))})",
+                [
+                    (user.pk, category_id, txn_type, amount, description, txn_date.isoformat(), now, now)
+                    for category_id, txn_type, amount, description, txn_date in rows
+                ],
+            )
+
+    def copy(self, user, rows):
+        """Stream one batch into PostgreSQL with COPY ... FROM STDIN."""
+        now = timezone.now().isoformat()
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for category_id, txn_type, amount, description, txn_date in rows:
+            # An unquoted empty field is NULL in COPY's CSV format
+            writer.writerow([user.pk, category_id, txn_type, amount, description, txn_date.isoformat(), now, now])
+        buffer.seek(0)
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {quote(Transaction._meta.db_table)} ({', '.join(map(quote, COLUMNS))}) "
+                f"FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+
+    def budgets(self, user, spent, rng, start, end):
+        """A budget for every month, between 80% and 130% of what the user spent in it."""
+        budgets = []
+        month = start
+        while month <= end:
+            amount = spent.get(month, Decimal('0')) * Decimal(f'{rng.uniform(0.8, 1.3):.2f}')
+            budgets.append(Budget(
+                user=user, month=month,
+                budget_amount=max((amount / 10).quantize(Decimal('1')) * 10, Decimal('100')),
+            ))
+            month = rollups.next_month(month)
+        return budgets
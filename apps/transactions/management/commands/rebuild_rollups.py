@@ -0,0 +1,39 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.transactions import rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild or verify the monthly transaction rollup."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', action='append', dest='users', metavar='USERNAME',
+            help="Limit to this user (repeatable). Defaults to all users.",
+        )
+        parser.add_argument(
+            '--verify', action='store_true',
+            help="Only compare the rollup with raw transactions; exit non-zero on drift.",
+        )
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['users']:
+            users = User.objects.filter(username__in=options['users'])
+            missing = set(options['users']) - set(users.values_list('username', flat=True))
+            if missing:
+                raise CommandError(f"Unknown user(s): {', '.join(sorted(missing))}")
+            user_ids = list(users.values_list('id', flat=True))
+
+        if options['verify']:
+            mismatches = rollups.verify(user_ids)
+            for key, stored, expected in mismatches:
+                self.stdout.write(f"{key}: stored={stored} expected={expected}")
+            if mismatches:
+                raise CommandError(f"{len(mismatches)} rollup bucket(s) out of date")
+            self.stdout.write(self.style.SUCCESS("Rollup matches transactions."))
+            return
+
+        count = rollups.rebuild(user_ids)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} rollup bucket(s)."))
@@ -0,0 +1,65 @@
+# Generated by Django 4.2.25 on 2026-10-18 02:09
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def backfill_rollups(apps, schema_editor):
+    Transaction = apps.get_model('transactions', 'Transaction')
+    MonthlyRollup = apps.get_model('transactions', 'MonthlyRollup')
+    rows = (
+        Transaction.objects.order_by()
+        .annotate(bucket_month=TruncMonth('date'))
+        .values('user_id', 'bucket_month', 'category_id', 'type')
+        .annotate(total=Sum('amount'), count=Count('id'))
+    )
+    MonthlyRollup.objects.bulk_create(
+        (
+            MonthlyRollup(
+                user_id=row['user_id'], month=row['bucket_month'],
+                category_id=row['category_id'], type=row['type'],
+                total=row['total'], count=row['count'],
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('categories', '0001_initial'),
+        ('transactions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('type', models.CharField(choices=[('income', 'Income'), ('expense', 'Expense')], max_length=10)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='categories.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transaction_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-month'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='monthlyrollup',
+            constraint=models.UniqueConstraint(fields=('user', 'month', 'category', 'type'), name='unique_rollup_bucket'),
+        ),
+        migrations.AddConstraint(
+            model_name='monthlyrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('user', 'month', 'type'), name='unique_rollup_bucket_uncategorized'),
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
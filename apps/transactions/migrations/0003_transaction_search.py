@@ -0,0 +1,73 @@
+from django.db import migrations
+
+
+# Full-text indexes on Transaction.description, see apps/transactions/search.py
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS transactions_description_tsv ON transactions_transaction "
+    "USING GIN (to_tsvector('simple'::regconfig, description))",
+    "CREATE INDEX IF NOT EXISTS transactions_description_trgm ON transactions_transaction "
+    "USING GIN (description gin_trgm_ops)",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS transactions_description_trgm",
+    "DROP INDEX IF EXISTS transactions_description_tsv",
+]
+
+# External-content FTS5 table kept in step by triggers, so bulk inserts
+# and raw updates are indexed too
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE transactions_transaction_fts USING fts5("
+    "description, content='transactions_transaction', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER transactions_transaction_fts_insert AFTER INSERT ON transactions_transaction BEGIN "
+    "INSERT INTO transactions_transaction_fts(rowid, description) VALUES (new.id, new.description); END",
+    "CREATE TRIGGER transactions_transaction_fts_delete AFTER DELETE ON transactions_transaction BEGIN "
+    "INSERT INTO transactions_transaction_fts(transactions_transaction_fts, rowid, description) "
+    "VALUES ('delete', old.id, old.description); END",
+    "CREATE TRIGGER transactions_transaction_fts_update AFTER UPDATE OF description ON transactions_transaction BEGIN "
+    "INSERT INTO transactions_transaction_fts(transactions_transaction_fts, rowid, description) "
+    "VALUES ('delete', old.id, old.description); "
+    "INSERT INTO transactions_transaction_fts(rowid, description) VALUES (new.id, new.description); END",
+    "INSERT INTO transactions_transaction_fts(transactions_transaction_fts) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS transactions_transaction_fts_update",
+    "DROP TRIGGER IF EXISTS transactions_transaction_fts_delete",
+    "DROP TRIGGER IF EXISTS transactions_transaction_fts_insert",
+    "DROP TABLE IF EXISTS transactions_transaction_fts",
+]
+
+
+def sqlite_has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def run(statements):
+    def apply(apps, schema_editor):
+        connection = schema_editor.connection
+        if connection.vendor == 'sqlite' and not sqlite_has_fts5(connection):
+            # Search falls back to substring matching (see search.py)
+            return
+        for statement in statements.get(connection.vendor, []):
+            schema_editor.execute(statement)
+    return apply
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0002_monthlyrollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'postgresql': POSTGRES_FORWARD, 'sqlite': SQLITE_FORWARD}),
+            run({'postgresql': POSTGRES_REVERSE, 'sqlite': SQLITE_REVERSE}),
+        ),
+    ]
@@ -18,6 +18,51 @@ class Transaction(models.Model):
     
     class Meta:
         ordering = ['-date', '-created_at']
+        indexes = [
+            # The list, export and cursor pages: a user's rows in display
+            # order (id breaks ties for keyset pagination), plus date-range
+            # filters of any type
+            models.Index(fields=['user', '-date', '-created_at', '-id'], name='transaction_user_date'),
+            # Filtered summaries and time series, and the raw edges of the
+            # advisor's windows: one type over a date range
+            models.Index(fields=['user', 'type', 'date'], name='transaction_user_type_date'),
+        ]
     
     def __str__(self):
-        return f"{self.type} - {self.amount} - {self.date}"
\ No newline at end of file
+        return f"{self.type} - {self.amount} - {self.date}"
+
+
+class MonthlyRollup(models.Model):
+    """
+    Pre-aggregated monthly totals of transactions.
+    
+    One row per (user, month, category, type) holding the sum and count
+    of the matching transactions. Kept in step with Transaction by the
+    handlers in signals.py, so analytics endpoints read a handful of
+    rollup rows instead of re-scanning the user's whole history.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='transaction_rollups')
+    month = models.DateField(help_text="First day of the month")
+    category = models.ForeignKey('categories.Category', on_delete=models.CASCADE, null=True, related_name='+')
+    type = models.CharField(max_length=10, choices=Transaction.TYPE_CHOICES)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+    
+    class Meta:
+        ordering = ['-month']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'month', 'category', 'type'],
+                name='unique_rollup_bucket',
+            ),
+            # NULLs never collide in a unique index, so uncategorized
+            # buckets need their own partial constraint
+            models.UniqueConstraint(
+                fields=['user', 'month', 'type'],
+                condition=models.Q(category__isnull=True),
+                name='unique_rollup_bucket_uncategorized',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.month.strftime('%B %Y')} - {self.type} - {self.total}"
@@ -0,0 +1,183 @@
+"""
+Transaction list pagination.
+
+Page numbers stay the default for existing clients. Passing
+``?pagination=cursor`` (or following a ``cursor`` link) switches to keyset
+pagination: each page is fetched with a ``WHERE (date, created_at, id) < ...``
+seek on the current ordering instead of ``OFFSET``, and the ``COUNT(*)`` is
+only run when asked for with ``?count=true``, so every page costs the same
+however deep the client scrolls.
+"""
+
+import base64
+import binascii
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class TransactionPagination(PageNumberPagination):
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    mode_query_param = 'pagination'
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_cursor = (
+            self.cursor_query_param in request.query_params
+            or request.query_params.get(self.mode_query_param) == 'cursor'
+        )
+        if not self.use_cursor:
+            return super().paginate_queryset(queryset, request, view)
+        return self.paginate_keyset(queryset, request)
+
+    def get_paginated_response(self, data):
+        if not self.use_cursor:
+            return super().get_paginated_response(data)
+
+        payload = {}
+        if self.count is not None:
+            payload['count'] = self.count
+        payload['next'] = self.get_cursor_link(self.next_position, reverse=False)
+        payload['previous'] = self.get_cursor_link(self.previous_position, reverse=True)
+        payload['results'] = data
+        return Response(payload)
+
+    # ------------------------------------------------------------------
+    # Keyset mode
+    # ------------------------------------------------------------------
+
+    def paginate_keyset(self, queryset, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_keyset_ordering(queryset)
+        self.model = queryset.model
+
+        want_count = request.query_params.get(self.count_query_param, '').lower() in ('1', 'true', 'yes')
+        self.count = queryset.count() if want_count else None
+
+        cursor = self.decode_cursor(request)
+        reverse = cursor is not None and cursor['reverse']
+        ordering = [self.flip(field) for field in self.ordering] if reverse else self.ordering
+
+        queryset = queryset.order_by(*ordering)
+        if cursor is not None:
+            queryset = queryset.filter(self.seek_filter(ordering, cursor['values']))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        has_next = has_more if not reverse else True
+        has_previous = cursor is not None if not reverse else has_more
+
+        self.next_position = self.position(rows[-1]) if rows and has_next else None
+        self.previous_position = self.position(rows[0]) if rows and has_previous else None
+        return rows
+
+    def get_keyset_ordering(self, queryset):
+        """
+        Current ordering with a primary-key tiebreak appended.
+
+        Honours whatever OrderingFilter applied, falling back to the model's
+        default ``-date, -created_at``. The tiebreak makes every position
+        unique so no row is skipped or repeated between pages.
+        """
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        if not ordering or not all(isinstance(field, str) for field in ordering):
+            raise NotFound('Cursor pagination requires a plain field ordering.')
+
+        names = {field.lstrip('-') for field in ordering}
+        if not names & {'id', 'pk'}:
+            ordering.append('-id' if ordering[-1].startswith('-') else 'id')
+        return ordering
+
+    @staticmethod
+    def flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def seek_filter(self, ordering, values):
+        """
+        Rows strictly after ``values`` in ``ordering``.
+
+        Expands the row comparison ``(a, b, c) > (x, y, z)`` into
+        ``a > x OR (a = x AND b > y) OR ...`` so mixed directions work, and
+        adds a redundant bound on the leading column that lets the database
+        turn the whole thing into an index range scan.
+        """
+        names = [field.lstrip('-') for field in ordering]
+        lookups = ['lt' if field.startswith('-') else 'gt' for field in ordering]
+
+        seek = Q()
+        for index, name in enumerate(names):
+            clause = Q(**{f'{name}__{lookups[index]}': values[index]})
+            for prior, value in zip(names[:index], values[:index]):
+                clause &= Q(**{prior: value})
+            seek |= clause
+
+        leading = Q(**{f'{names[0]}__{lookups[0]}e': values[0]})
+        return leading & seek
+
+    def position(self, row):
+        return [self.field_value(row, field.lstrip('-')) for field in self.ordering]
+
+    @staticmethod
+    def field_value(row, name):
+        value = row[name] if isinstance(row, dict) else getattr(row, name)
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        if isinstance(value, (int, float, str)) or value is None:
+            return value
+        return str(value)
+
+    # ------------------------------------------------------------------
+    # Cursor encoding
+    # ------------------------------------------------------------------
+
+    def encode_cursor(self, values, reverse):
+        payload = json.dumps({'r': int(reverse), 'v': values}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            values = payload['v']
+            if len(values) != len(self.ordering):
+                raise ValueError
+            values = [
+                self.to_python(field.lstrip('-'), value)
+                for field, value in zip(self.ordering, values)
+            ]
+            return {'reverse': bool(payload['r']), 'values': values}
+        except (TypeError, ValueError, KeyError, binascii.Error, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def to_python(self, name, value):
+        try:
+            field = self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Annotation (e.g. a relevance score) – stored as plain JSON
+            return value
+        return field.to_python(value)
+
+    def get_cursor_link(self, position, reverse):
+        if position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(position, reverse))
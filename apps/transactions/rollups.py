@@ -0,0 +1,353 @@
+"""
+Monthly rollup maintenance and queries.
+
+MonthlyRollup keeps one (sum, count) bucket per user, month, category and
+type. Every write to Transaction is turned into a pair of deltas against
+those buckets (see signals.py), and the read paths below answer totals
+from the buckets instead of aggregating raw transactions.
+"""
+
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import Count, DateField, ExpressionWrapper, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import MonthlyRollup, Transaction
+
+
+CENT = Decimal('0.01')
+
+
+def month_start(value):
+    """First day of the month containing ``value``."""
+    return value.replace(day=1)
+
+
+def next_month(value):
+    """First day of the month after the one containing ``value``."""
+    if value.month == 12:
+        return date(value.year + 1, 1, 1)
+    return date(value.year, value.month + 1, 1)
+
+
+def bucket_key(user_id, txn_date, category_id, txn_type):
+    """Rollup bucket a transaction with these values belongs to."""
+    txn_date = Transaction._meta.get_field('date').to_python(txn_date)
+    return (user_id, month_start(txn_date), category_id, txn_type)
+
+
+def apply_delta(key, amount, count):
+    """
+    Add ``amount``/``count`` to the bucket identified by ``key``.
+
+    The update is a single ``UPDATE ... SET total = total + x`` so
+    concurrent writers never lose each other's changes. Negative deltas
+    against a missing bucket are ignored (the bucket was already removed,
+    e.g. while the owning user is being deleted), and buckets whose count
+    drops to zero are deleted so the table only holds live months.
+    """
+    user_id, month, category_id, txn_type = key
+    amount = Transaction._meta.get_field('amount').to_python(amount)
+    bucket = MonthlyRollup.objects.filter(
+        user_id=user_id, month=month, category_id=category_id, type=txn_type
+    )
+
+    updated = bucket.update(total=F('total') + amount, count=F('count') + count)
+    if not updated:
+        if count <= 0:
+            return
+        try:
+            with transaction.atomic():
+                MonthlyRollup.objects.create(
+                    user_id=user_id, month=month, category_id=category_id,
+                    type=txn_type, total=amount, count=count,
+                )
+        except IntegrityError:
+            # Another writer created the bucket first
+            bucket.update(total=F('total') + amount, count=F('count') + count)
+
+    if count < 0:
+        bucket.filter(count__lte=0).delete()
+
+
+UPSERT_SQL = (
+    "INSERT INTO {table} (user_id, month, category_id, type, total, count) "
+    "VALUES (%s, %s, %s, %s, %s, %s) "
+    "ON CONFLICT {target} DO UPDATE SET "
+    "total = {table}.total + excluded.total, count = {table}.count + excluded.count"
+)
+
+
+def apply_bulk(rows):
+    """
+    Fold many transactions into the rollup at once.
+
+    ``rows`` is an iterable of ``(user_id, date, category_id, type, amount)``
+    tuples for newly inserted transactions. Used by code paths that bypass
+    model signals (``bulk_create``). Deltas are summed per bucket in Python
+    and written with ``INSERT ... ON CONFLICT DO UPDATE`` (supported by both
+    SQLite and PostgreSQL), so each batch costs two statements however many
+    buckets it touches.
+    """
+    deltas = defaultdict(lambda: [Decimal('0'), 0])
+    amount_field = Transaction._meta.get_field('amount')
+    for user_id, txn_date, category_id, txn_type, amount in rows:
+        delta = deltas[bucket_key(user_id, txn_date, category_id, txn_type)]
+        delta[0] += amount_field.to_python(amount)
+        delta[1] += 1
+    if not deltas:
+        return
+
+    connection = connections[router.db_for_write(MonthlyRollup)]
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        for key, (amount, count) in deltas.items():
+            apply_delta(key, amount, count)
+        return
+
+    ops = connection.ops
+    table = ops.quote_name(MonthlyRollup._meta.db_table)
+    # The two unique constraints on the table, as ON CONFLICT targets
+    targets = {
+        True: '(user_id, month, type) WHERE category_id IS NULL',
+        False: '(user_id, month, category_id, type)',
+    }
+    for uncategorized, target in targets.items():
+        params = [
+            (
+                user_id, ops.adapt_datefield_value(month), category_id, txn_type,
+                ops.adapt_decimalfield_value(amount), count,
+            )
+            for (user_id, month, category_id, txn_type), (amount, count) in deltas.items()
+            if (category_id is None) == uncategorized
+        ]
+        if params:
+            sql = UPSERT_SQL.format(table=table, target=target)
+            with connection.cursor() as cursor:
+                cursor.executemany(sql, params)
+
+
+def merge_category_into_uncategorized(category):
+    """
+    Move a category's buckets into the uncategorized buckets.
+
+    Deleting a Category sets its transactions' category to NULL with a
+    bulk UPDATE that sends no signals, so the rollup has to be told.
+    """
+    buckets = MonthlyRollup.objects.filter(category=category)
+    for bucket in buckets:
+        apply_delta((bucket.user_id, bucket.month, None, bucket.type), bucket.total, bucket.count)
+    buckets.delete()
+
+
+def expected_buckets(user_ids=None):
+    """Rollup buckets recomputed from raw transactions."""
+    transactions = Transaction.objects.all()
+    if user_ids is not None:
+        transactions = transactions.filter(user_id__in=user_ids)
+
+    rows = (
+        transactions.order_by()
+        .annotate(bucket_month=TruncMonth('date'))
+        .values('user_id', 'bucket_month', 'category_id', 'type')
+        .annotate(total=Sum('amount'), count=Count('id'))
+    )
+    # SQLite sums decimals as floats; round back to cents before comparing
+    return {
+        (row['user_id'], row['bucket_month'], row['category_id'], row['type']): (
+            row['total'].quantize(CENT), row['count']
+        )
+        for row in rows
+    }
+
+
+def stored_buckets(user_ids=None):
+    """Rollup buckets as currently stored."""
+    rollups = MonthlyRollup.objects.all()
+    if user_ids is not None:
+        rollups = rollups.filter(user_id__in=user_ids)
+    return {
+        (row.user_id, row.month, row.category_id, row.type): (row.total, row.count)
+        for row in rollups
+    }
+
+
+def rebuild(user_ids=None):
+    """Recompute the rollup from raw transactions. Returns the bucket count."""
+    expected = expected_buckets(user_ids)
+    with transaction.atomic():
+        stale = MonthlyRollup.objects.all()
+        if user_ids is not None:
+            stale = stale.filter(user_id__in=user_ids)
+        stale.delete()
+        MonthlyRollup.objects.bulk_create(
+            [
+                MonthlyRollup(
+                    user_id=user_id, month=month, category_id=category_id,
+                    type=txn_type, total=total, count=count,
+                )
+                for (user_id, month, category_id, txn_type), (total, count) in expected.items()
+            ],
+            batch_size=1000,
+        )
+    return len(expected)
+
+
+def verify(user_ids=None):
+    """
+    Compare the stored rollup with raw transactions.
+
+    Returns a list of ``(key, stored, expected)`` tuples for every bucket
+    that differs; an empty list means the rollup is correct.
+    """
+    expected = expected_buckets(user_ids)
+    stored = stored_buckets(user_ids)
+    return [
+        (key, stored.get(key), expected.get(key))
+        for key in sorted(set(expected) | set(stored), key=str)
+        if stored.get(key) != expected.get(key)
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Read paths
+# ---------------------------------------------------------------------------
+
+def month_expenses(user, month):
+    """Total expenses for the month containing ``month``."""
+    return (
+        MonthlyRollup.objects.filter(user=user, month=month_start(month), type='expense')
+        .aggregate(total=Sum('total'))['total'] or 0
+    )
+
+
+def month_expenses_subquery(user_ref='user', month_ref='month'):
+    """
+    Correlated subquery for a month's expense total.
+
+    ``user_ref``/``month_ref`` name the outer query's user and month
+    columns, so a whole queryset of budgets can be annotated with their
+    actual expenses in a single SQL statement.
+    """
+    return Subquery(
+        MonthlyRollup.objects.filter(
+            user=OuterRef(user_ref),
+            month=TruncMonth(ExpressionWrapper(OuterRef(month_ref), output_field=DateField())),
+            type='expense',
+        )
+        .order_by()
+        .values('user')
+        .annotate(total=Sum('total'))
+        .values('total')
+    )
+
+
+def month_expenses_by_category(user, month):
+    """Expense totals per category for a month, largest first."""
+    return (
+        MonthlyRollup.objects.filter(user=user, month=month_start(month), type='expense')
+        .values('category__name', 'category__id')
+        .annotate(total=Sum('total'))
+        .order_by('-total')
+    )
+
+
+def split_window(start, end):
+    """
+    Split ``[start, end)`` into rollup months and raw-transaction edges.
+
+    Returns ``(rollup_filter, raw_filter)``: a Q over MonthlyRollup.month
+    for the whole months inside the window and a Q over Transaction.date
+    for the partial months at either edge. Either may be None.
+    ``end=None`` leaves the window open-ended.
+    """
+    full_start = start if start.day == 1 else next_month(start)
+    full_end = month_start(end) if end is not None else None
+
+    if full_end is not None and full_start >= full_end:
+        # No whole month inside the window
+        return None, Q(date__gte=start, date__lt=end)
+
+    rollup_filter = Q(month__gte=full_start)
+    if full_end is not None:
+        rollup_filter &= Q(month__lt=full_end)
+
+    raw_filter = None
+    if start < full_start:
+        raw_filter = Q(date__gte=start, date__lt=full_start)
+    if full_end is not None and full_end < end:
+        edge = Q(date__gte=full_end, date__lt=end)
+        raw_filter = edge if raw_filter is None else raw_filter | edge
+    return rollup_filter, raw_filter
+
+
+def windows_summary(user, windows):
+    """
+    Totals per type and category for several date windows at once.
+
+    ``windows`` maps a name to ``(start, end)`` (end exclusive, or None for
+    open-ended). Whole months come from the rollup and only the partial
+    months at each window's edges from raw transactions, and every window
+    is a conditional aggregate of the same two grouped queries. The cost
+    therefore depends on neither the window lengths nor their number.
+
+    Returns ``{name: {(type, category_id): row}}`` where each row holds
+    ``category_name``, ``total`` and ``count``.
+    """
+    rollup_aggregates, raw_aggregates = {}, {}
+    rollup_scope, raw_scope = Q(pk__in=[]), Q(pk__in=[])
+    raw_starts, raw_ends = [], []
+    names = list(windows)
+
+    for index, name in enumerate(names):
+        start, end = windows[name]
+        rollup_filter, raw_filter = split_window(start, end)
+        if rollup_filter is not None:
+            rollup_aggregates[f'w{index}_total'] = Sum('total', filter=rollup_filter)
+            rollup_aggregates[f'w{index}_count'] = Sum('count', filter=rollup_filter)
+            rollup_scope |= rollup_filter
+        if raw_filter is not None:
+            raw_aggregates[f'w{index}_total'] = Sum('amount', filter=raw_filter)
+            raw_aggregates[f'w{index}_count'] = Count('id', filter=raw_filter)
+            raw_scope |= raw_filter
+            # An open-ended window only has a raw edge in its first month
+            raw_starts.append(start)
+            raw_ends.append(end or next_month(start))
+
+    summary = {name: {} for name in names}
+
+    def merge(rows):
+        for row in rows:
+            key = (row['type'], row['category_id'])
+            for index, name in enumerate(names):
+                count = row.get(f'w{index}_count')
+                if not count:
+                    continue
+                entry = summary[name].setdefault(key, {
+                    'category_name': row['category__name'],
+                    'total': Decimal('0'),
+                    'count': 0,
+                })
+                entry['total'] += row[f'w{index}_total']
+                entry['count'] += count
+
+    if rollup_aggregates:
+        merge(
+            MonthlyRollup.objects.filter(rollup_scope, user=user)
+            .order_by()
+            .values('type', 'category_id', 'category__name')
+            .annotate(**rollup_aggregates)
+        )
+    if raw_aggregates:
+        merge(
+            # The overall bounds let the (user, date) index narrow the
+            # scan; the OR of the edges alone can't use it
+            Transaction.objects.filter(raw_scope, user=user, date__gte=min(raw_starts), date__lt=max(raw_ends))
+            .order_by()
+            .values('type', 'category_id', 'category__name')
+            .annotate(**raw_aggregates)
+        )
+
+    return summary
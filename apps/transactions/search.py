@@ -0,0 +1,141 @@
+"""
+Indexed search on transaction descriptions.
+
+TransactionSearchFilter replaces DRF's SearchFilter (``description ILIKE
+'%term%'``, a scan of every row the user owns) with the database's
+full-text index, created in migration 0003:
+
+- PostgreSQL: a GIN index on ``to_tsvector('simple', description)`` for
+  word-prefix matches and ranking, plus a trigram (pg_trgm) GIN index so
+  terms of three or more characters also match inside words.
+- SQLite: an FTS5 table (``transactions_transaction_fts``) maintained by
+  triggers, matched with prefix queries and ranked with bm25(). SQLite
+  builds without FTS5 get no table and use the fallback below.
+- Any other database falls back to case-insensitive substring matching.
+
+Every search term is a prefix ("gro" finds "Groceries") and all terms
+must match. Results are ordered by relevance unless the request asks for
+an explicit ``ordering``.
+
+Note that Django rebuilds SQLite tables for some schema changes to
+Transaction, which drops the FTS triggers; a migration making such a
+change must recreate them.
+"""
+
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, F, FloatField, Func, Q, Value
+from django.db.models.expressions import RawSQL
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
+
+
+FTS_TABLE = 'transactions_transaction_fts'
+TERM = re.compile(r'\w+')
+MAX_TERMS = 10
+
+_fts_tables = {}  # (alias, database name) -> whether FTS_TABLE exists
+
+
+class DescriptionVector(Func):
+    """``to_tsvector('simple', description)``, the indexed expression."""
+    function = 'to_tsvector'
+    template = "%(function)s('simple'::regconfig, %(expressions)s)"
+    output_field = SearchVectorField()
+
+
+class ILike(Func):
+    """``<expression> ILIKE <pattern>``, which can use the trigram index."""
+    arg_joiner = ' ILIKE '
+    template = '%(expressions)s'
+    output_field = BooleanField()
+
+
+def search_terms(text):
+    """Lower-cased word terms of a search string, at most MAX_TERMS."""
+    return TERM.findall(text.lower())[:MAX_TERMS]
+
+
+def like_pattern(term):
+    return '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+def search_postgresql(queryset, terms):
+    query = SearchQuery(' & '.join(f'{term}:*' for term in terms), config='simple', search_type='raw')
+    queryset = queryset.alias(document=DescriptionVector('description'))
+    matches = Q(document=query)
+
+    # Trigram matches catch terms in the middle of a word ("mart" in
+    # "Walmart"); shorter terms can't use the index and stay prefix-only
+    infix = [term for term in terms if len(term) >= 3]
+    if len(infix) == len(terms):
+        matches |= Q(*[ILike(F('description'), Value(like_pattern(term))) for term in infix])
+
+    return queryset.filter(matches).annotate(search_rank=SearchRank(F('document'), query))
+
+
+def sqlite_has_fts(alias):
+    """Whether migration 0003 created the FTS5 table (checked once per database)."""
+    connection = connections[alias]
+    key = (alias, connection.settings_dict['NAME'])
+    if key not in _fts_tables:
+        _fts_tables[key] = FTS_TABLE in connection.introspection.table_names()
+    return _fts_tables[key]
+
+
+def search_sqlite(queryset, terms):
+    if not sqlite_has_fts(queryset.db):
+        return search_fallback(queryset, terms)
+
+    table = queryset.model._meta.db_table
+    match = ' '.join(f'"{term}"*' for term in terms)
+    # Joining the FTS table (rather than a per-row subquery) lets SQLite
+    # run the MATCH once and compute bm25() from that single scan. The
+    # unary + keeps the planner from driving the join from the user's
+    # rows and re-running the MATCH for each of them. bm25() is lower for
+    # better matches.
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[f'+"{FTS_TABLE}".rowid = "{table}"."id"', f'"{FTS_TABLE}" MATCH %s'],
+        params=[match],
+    ).annotate(search_rank=RawSQL(f'-bm25("{FTS_TABLE}")', (), output_field=FloatField()))
+
+
+def search_fallback(queryset, terms):
+    for term in terms:
+        queryset = queryset.filter(description__icontains=term)
+    return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+BACKENDS = {
+    'postgresql': search_postgresql,
+    'sqlite': search_sqlite,
+}
+
+
+class TransactionSearchFilter(BaseFilterBackend):
+    """Drop-in replacement for SearchFilter on TransactionViewSet."""
+
+    search_param = api_settings.SEARCH_PARAM
+
+    def filter_queryset(self, request, queryset, view):
+        terms = search_terms(request.query_params.get(self.search_param, ''))
+        if not terms:
+            return queryset
+
+        backend = BACKENDS.get(connections[queryset.db].vendor, search_fallback)
+        queryset = backend(queryset, terms)
+
+        ordering = ['-search_rank', *queryset.model._meta.ordering]
+        return queryset.order_by(*ordering)
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            'name': self.search_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Words to find in the description (prefix match, all words required).',
+            'schema': {'type': 'string'},
+        }]
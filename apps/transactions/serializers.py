@@ -7,4 +7,50 @@ class TransactionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Transaction
         fields = ['id', 'user', 'category', 'category_name', 'type', 'amount', 'description', 'date', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'user', 'created_at', 'updated_at']
\ No newline at end of file
+        read_only_fields = ['id', 'user', 'created_at', 'updated_at']
+
+class TransactionValuesSerializer(serializers.BaseSerializer):
+    """
+    Read-only twin of TransactionSerializer for list responses.
+    
+    Works on ``.values()`` rows (see ``values()``) instead of model
+    instances, so listing skips model construction and DRF's per-field
+    attribute lookups. The output is identical to TransactionSerializer:
+    values that need formatting go through the same DRF fields, and
+    category_name is left out for uncategorized rows just as the nested
+    ``category.name`` source does.
+    """
+    
+    lookups = {
+        'id': 'id',
+        'user': 'user_id',
+        'category': 'category_id',
+        'category_name': 'category__name',
+        'type': 'type',
+        'amount': 'amount',
+        'description': 'description',
+        'date': 'date',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }
+    formatted = ('amount', 'date', 'created_at', 'updated_at')
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = TransactionSerializer().fields
+        self.formatters = {name: fields[name].to_representation for name in self.formatted}
+    
+    @classmethod
+    def values(cls, queryset, *extra):
+        """``queryset`` as dict rows carrying every serialized column plus ``extra``."""
+        lookups = list(cls.lookups.values())
+        return queryset.values(*lookups, *(name for name in extra if name not in lookups))
+    
+    def to_representation(self, row):
+        data = {name: row[lookup] for name, lookup in self.lookups.items()}
+        for name, format_value in self.formatters.items():
+            if data[name] is not None:
+                data[name] = format_value(data[name])
+        if data['category'] is None:
+            del data['category_name']
+        return data
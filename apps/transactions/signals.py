@@ -0,0 +1,82 @@
+"""
+Keep MonthlyRollup in step with Transaction writes.
+
+Every save or delete is translated into a negative delta for the bucket
+the row used to be in and a positive delta for the bucket it is in now.
+
+``transactions_bulk_created`` is sent by code that inserts transactions
+with ``bulk_create`` (which fires no model signals). Anything that reacts
+to new transactions must listen to it as well as to post_save.
+"""
+
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+
+from apps.categories.models import Category
+from apps.sync.changes import deleting_user
+from . import rollups
+from .models import Transaction
+
+
+# Sent with ``user`` and ``transactions`` (the inserted instances) after a
+# bulk insert, inside the same database transaction
+transactions_bulk_created = Signal()
+
+
+def _rollup_values(instance):
+    return (instance.user_id, instance.date, instance.category_id, instance.type, instance.amount)
+
+
+@receiver(pre_save, sender=Transaction)
+def remember_previous_bucket(sender, instance, raw=False, **kwargs):
+    """Load the stored values of a transaction that is about to be updated."""
+    instance._rollup_previous = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._rollup_previous = (
+        Transaction.objects.filter(pk=instance.pk)
+        .values_list('user_id', 'date', 'category_id', 'type', 'amount')
+        .first()
+    )
+
+
+@receiver(post_save, sender=Transaction)
+def update_rollup_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    previous = getattr(instance, '_rollup_previous', None)
+    current = _rollup_values(instance)
+    if previous is not None:
+        old_key = rollups.bucket_key(*previous[:4])
+        new_key = rollups.bucket_key(*current[:4])
+        if old_key == new_key:
+            # Only the amount (or description) changed; one update suffices
+            delta = sender._meta.get_field('amount').to_python(current[4]) - previous[4]
+            if delta:
+                rollups.apply_delta(new_key, delta, 0)
+            return
+        rollups.apply_delta(old_key, -previous[4], -1)
+
+    rollups.apply_delta(rollups.bucket_key(*current[:4]), current[4], 1)
+
+
+@receiver(post_delete, sender=Transaction)
+def update_rollup_on_delete(sender, instance, origin=None, **kwargs):
+    # The user's rollup rows are cascade-deleted with them
+    if deleting_user(origin):
+        return
+    values = _rollup_values(instance)
+    amount = sender._meta.get_field('amount').to_python(values[4])
+    rollups.apply_delta(rollups.bucket_key(*values[:4]), -amount, -1)
+
+
+@receiver(transactions_bulk_created, sender=Transaction)
+def update_rollup_on_bulk_create(sender, transactions, **kwargs):
+    rollups.apply_bulk(_rollup_values(instance) for instance in transactions)
+
+
+@receiver(pre_delete, sender=Category)
+def uncategorize_rollup(sender, instance, **kwargs):
+    """Mirror the SET_NULL cascade from Category onto the rollup."""
+    rollups.merge_category_into_uncategorized(instance)
@@ -1,3 +1,948 @@
-from django.test import TestCase
+import base64
+import csv
+import gzip
+import io
+import json
+import re
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.ai.services import FinancialAdvisor
+from apps.budgets import alerts
+from apps.budgets.models import Budget, BudgetAlert
+from apps.categories.models import Category
+from apps.sync.models import Change
+from . import exporters, rollups, search
+from .importers import save_transactions
+from .models import Transaction
+from .serializers import TransactionSerializer, TransactionValuesSerializer
+
+
+# SQLite: "SCAN <table>" reads every row (or every index entry) of a
+# table; "SEARCH" narrows by an index. Constant rows, subqueries and the
+# FTS virtual table are not tables.
+SQLITE_FULL_SCAN = re.compile(r'^SCAN (?!CONSTANT ROW|\(|\w+ VIRTUAL TABLE)')
+SQLITE_SORT = re.compile(r'TEMP B-TREE FOR (RIGHT PART OF )?ORDER BY')
+POSTGRES_FULL_SCAN = re.compile(r'Seq Scan on')
+POSTGRES_SORT = re.compile(r'(^|->\s+)(Incremental )?Sort\s+\(')
+
+
+@override_settings(RESPONSE_CACHE_TTL=0)
+class QueryPlanTests(TestCase):
+    """
+    EXPLAIN the statements behind the hot read paths and fail if one
+    reads a whole table, or sorts rows that an index should already
+    deliver in order.
+
+    The test tables are tiny, so PostgreSQL is told to avoid sequential
+    scans and sorts wherever an index allows it: a plan that still has
+    one means no index fits.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='planner', password='pass12345')
+        other = User.objects.create_user(username='neighbour', password='pass12345')
+        cls.category = Category.objects.create(user=cls.user, name='Groceries', type='expense')
+        for owner in (cls.user, other):
+            save_transactions(owner, [
+                Transaction(
+                    user=owner, type=('income', 'expense')[day % 2], amount=Decimal(10 + day),
+                    category=cls.category if owner == cls.user and day % 3 else None,
+                    description=f'Item {day}', date=date(2025, 1, 1) + timedelta(days=day * 3),
+                )
+                for day in range(120)
+            ])
+        for month in range(1, 7):
+            Budget.objects.create(user=cls.user, month=date(2025, month, 1), budget_amount=Decimal('500'))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                # Scoped to the test's transaction
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('SET LOCAL enable_sort = off')
+
+    def capture(self, run):
+        """The SELECT statements (with parameters) executed by ``run()``."""
+        statements = []
+
+        def record(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith('SELECT'):
+                statements.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            run()
+        self.assertTrue(statements)
+        return statements
+
+    def get(self, url, params=None):
+        def run():
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return self.capture(run)
+
+    def explain(self, sql, params):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                return [row[3] for row in cursor.fetchall()]
+            cursor.execute('EXPLAIN ' + sql, params)
+            return [row[0].strip() for row in cursor.fetchall()]
+
+    def assertIndexed(self, statements, ordered=False):
+        """No statement scans a whole table; with ``ordered``, none sorts either."""
+        full_scan, sort = {
+            'sqlite': (SQLITE_FULL_SCAN, SQLITE_SORT),
+            'postgresql': (POSTGRES_FULL_SCAN, POSTGRES_SORT),
+        }[connection.vendor]
+        for sql, params in statements:
+            plan = self.explain(sql, params)
+            for line in plan:
+                self.assertIsNone(full_scan.search(line), f"Full scan in plan of {sql}:\n" + '\n'.join(plan))
+                if ordered:
+                    self.assertIsNone(sort.search(line), f"Sort in plan of {sql}:\n" + '\n'.join(plan))
+
+    def test_list_pages_walk_the_index_in_order(self):
+        url = reverse('transactions:transaction-list')
+        self.assertIndexed(self.get(url), ordered=True)
+
+        first = self.client.get(url, {'pagination': 'cursor'})
+        self.assertIndexed(self.get(first.data['next']), ordered=True)
+
+    def test_filtered_list(self):
+        statements = self.get(reverse('transactions:transaction-list'), {
+            'type': 'expense', 'date_from': '2025-02-01', 'date_to': '2025-03-15',
+        })
+        self.assertIndexed(statements, ordered=True)
+
+    def test_export(self):
+        self.assertIndexed(self.get(reverse('transactions:transaction-export')), ordered=True)
+
+    def test_summary(self):
+        url = reverse('transactions:transaction-summary')
+        self.assertIndexed(self.get(url, {'breakdown': 'category,month'}))
+        self.assertIndexed(self.get(url, {'type': 'expense', 'date_from': '2025-02-01', 'date_to': '2025-03-15'}))
+        self.assertIndexed(self.get(url, {'date_from': '2025-02-10', 'breakdown': 'category'}))
+
+    def test_timeseries(self):
+        url = reverse('transactions:transaction-timeseries')
+        self.assertIndexed(self.get(url, {'interval': 'month'}))
+        self.assertIndexed(self.get(url, {'interval': 'week', 'type': 'expense', 'date_from': '2025-02-01'}))
+
+    def test_budgets(self):
+        self.assertIndexed(self.get(reverse('budgets:budget-list')))
+        self.assertIndexed(self.get(reverse('budgets:budget-comparison'), {'start': '2025-01', 'end': '2025-06'}))
+
+    def test_advisor_context(self):
+        statements = self.capture(
+            lambda: FinancialAdvisor.get_user_financial_context(self.user, today=date(2025, 6, 17))
+        )
+        self.assertIndexed(statements)
+
+
+@override_settings(TRANSACTION_IMPORT_CHUNK_SIZE=2)
+class ImportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='importer', password='pass12345')
+        self.groceries = Category.objects.create(user=self.user, name='Groceries', type='expense')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, name, content, **data):
+        response = self.client.post(
+            reverse('transactions:transaction-import-statement'),
+            {'file': SimpleUploadedFile(name, content.encode()), **data},
+            format='multipart',
+        )
+        self.assertIn(response.status_code, (200, 201), response.data)
+        self.assertEqual(rollups.verify([self.user.pk]), [])
+        return response.data
+
+    def imported(self):
+        return list(
+            Transaction.objects.filter(user=self.user).order_by('date', 'id')
+            .values_list('date', 'type', 'amount', 'category__name', 'description')
+        )
+
+    def test_csv_reports_bad_rows_and_imports_the_rest(self):
+        result = self.upload('statement.csv', (
+            'Date,Amount,Description\n'
+            '2025-01-05,-12.50,Coffee\n'
+            'yesterday,-3,Bad date\n'
+            '2025-01-06,abc,Bad amount\n'
+            '\n'
+            '2025-01-07,0,Zero\n'
+            '2025-01-08,1500,Salary\n'
+            '2025-01-09,-1.005,Too precise\n'
+        ))
+        self.assertEqual(result['imported'], 2)
+        self.assertEqual(result['failed'], 4)
+        self.assertFalse(result['errors_truncated'])
+        self.assertEqual(
+            [(error['row'], sorted(error['errors'])) for error in result['errors']],
+            [(3, ['date']), (4, ['amount']), (6, ['type']), (8, ['amount'])],
+        )
+        self.assertEqual(self.imported(), [
+            (date(2025, 1, 5), 'expense', Decimal('12.50'), None, 'Coffee'),
+            (date(2025, 1, 8), 'income', Decimal('1500.00'), None, 'Salary'),
+        ])
+
+    def test_missing_column_rejects_the_file(self):
+        response = self.client.post(
+            reverse('transactions:transaction-import-statement'),
+            {'file': SimpleUploadedFile('statement.csv', b'date,description\n2025-01-01,x\n')},
+            format='multipart',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['file'], 'Missing column(s): amount.')
+
+    def test_ofx(self):
+        # SGML with no line breaks, as some banks send it
+        result = self.upload('statement.ofx', (
+            'OFXHEADER:100<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>'
+            '<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20250203120000<TRNAMT>-42.10<NAME>Grocer<MEMO>Card 1234</STMTTRN>'
+            '<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20250204<TRNAMT>100.00<NAME>Refund</STMTTRN>'
+            '<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>garbage<TRNAMT>-1.00</STMTTRN>'
+            '</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>'
+        ))
+        self.assertEqual(result['imported'], 2)
+        self.assertEqual([error['row'] for error in result['errors']], [3])
+        self.assertEqual(self.imported(), [
+            (date(2025, 2, 3), 'expense', Decimal('42.10'), None, 'Grocer - Card 1234'),
+            (date(2025, 2, 4), 'income', Decimal('100.00'), None, 'Refund'),
+        ])
+
+    def test_categories_are_resolved_and_created_once(self):
+        result = self.upload('statement.csv', (
+            'date,amount,type,category\n'
+            '2025-03-01,10,expense,Groceries\n'
+            '2025-03-02,20,expense,Books\n'
+            '2025-03-03,30,expense,Books\n'
+            '2025-03-04,40,income,Groceries\n'
+            '2025-03-05,50,expense,\n'
+        ), category='Misc')
+        self.assertEqual(result['categories_created'], 3)
+        self.assertEqual(
+            [(name, txn_type) for _, txn_type, _, name, _ in self.imported()],
+            [('Groceries', 'expense'), ('Books', 'expense'), ('Books', 'expense'),
+             ('Groceries', 'income'), ('Misc', 'expense')],
+        )
+        self.assertEqual(
+            Transaction.objects.filter(user=self.user, date='2025-03-01').get().category_id, self.groceries.pk
+        )
+        self.assertEqual(Category.objects.filter(user=self.user).count(), 4)
+
+    def test_rollup_and_change_log_follow_the_import(self):
+        budget = Budget.objects.create(user=self.user, month=date(2025, 4, 1), budget_amount=Decimal('100'))
+        statements = []
+
+        def record(execute, sql, params, many, context):
+            statements.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            self.upload('statement.csv', (
+                'date,amount\n'
+                '2025-04-01,-10\n2025-04-15,-15.25\n2025-04-30,200\n2025-05-01,-5\n2025-05-02,-7.75\n'
+            ))
+
+        self.assertEqual(rollups.month_expenses(self.user, date(2025, 4, 1)), Decimal('25.25'))
+        self.assertEqual(rollups.month_expenses(self.user, date(2025, 5, 1)), Decimal('12.75'))
+        # New transactions are logged with plain inserts; nothing to replace
+        self.assertFalse([
+            sql for sql, params in statements
+            if sql.lstrip().upper().startswith('DELETE') and Change._meta.db_table in sql
+            and Change.TRANSACTION in (params or ())
+        ])
+        logged = Change.objects.filter(user=self.user, model=Change.TRANSACTION)
+        self.assertCountEqual(
+            logged.values_list('object_id', flat=True),
+            Transaction.objects.filter(user=self.user).values_list('id', flat=True),
+        )
+        self.assertTrue(Change.objects.filter(user=self.user, model=Change.BUDGET, object_id=budget.pk).exists())
+
+
+class RollupMaintenanceTests(TestCase):
+    """Every write path keeps MonthlyRollup equal to a fresh aggregate."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='roller', password='pass12345')
+        self.food = Category.objects.create(user=self.user, name='Food', type='expense')
+        self.rent = Category.objects.create(user=self.user, name='Rent', type='expense')
+
+    def add(self, amount, day, category=None, txn_type='expense'):
+        return Transaction.objects.create(
+            user=self.user, type=txn_type, amount=Decimal(amount), date=day, category=category
+        )
+
+    def assertBuckets(self, expected):
+        """``expected`` maps (month, category, type) to (total, count)."""
+        self.assertEqual(rollups.verify([self.user.pk]), [])
+        self.assertEqual(rollups.stored_buckets([self.user.pk]), {
+            (self.user.pk, month, category.pk if category else None, txn_type): (Decimal(total), count)
+            for (month, category, txn_type), (total, count) in expected.items()
+        })
+
+    def test_create(self):
+        self.add('10.25', date(2025, 1, 3), self.food)
+        self.add('4.75', date(2025, 1, 30), self.food)
+        self.add('100', date(2025, 1, 15), txn_type='income')
+        self.assertBuckets({
+            (date(2025, 1, 1), self.food, 'expense'): ('15.00', 2),
+            (date(2025, 1, 1), None, 'income'): ('100.00', 1),
+        })
+
+    def test_amount_update(self):
+        txn = self.add('10', date(2025, 1, 3), self.food)
+        self.add('5', date(2025, 1, 4), self.food)
+        txn.amount = Decimal('12.50')
+        txn.description = 'Changed'
+        txn.save()
+        self.assertBuckets({(date(2025, 1, 1), self.food, 'expense'): ('17.50', 2)})
+
+    def test_month_and_category_move(self):
+        txn = self.add('10', date(2025, 1, 3), self.food)
+        self.add('5', date(2025, 1, 4), self.food)
+        txn.date = date(2025, 2, 1)
+        txn.save()
+        self.assertBuckets({
+            (date(2025, 1, 1), self.food, 'expense'): ('5.00', 1),
+            (date(2025, 2, 1), self.food, 'expense'): ('10.00', 1),
+        })
+
+        txn.category = self.rent
+        txn.amount = Decimal('20')
+        txn.save()
+        self.assertBuckets({
+            (date(2025, 1, 1), self.food, 'expense'): ('5.00', 1),
+            (date(2025, 2, 1), self.rent, 'expense'): ('20.00', 1),
+        })
+
+    def test_delete(self):
+        first = self.add('10', date(2025, 1, 3), self.food)
+        second = self.add('5', date(2025, 1, 4), self.food)
+        first.delete()
+        self.assertBuckets({(date(2025, 1, 1), self.food, 'expense'): ('5.00', 1)})
+        # The last transaction takes its bucket with it
+        second.delete()
+        self.assertBuckets({})
+
+    def test_category_delete_merges_into_uncategorized(self):
+        self.add('10', date(2025, 1, 3), self.food)
+        self.add('5', date(2025, 2, 3), self.food)
+        self.add('2', date(2025, 1, 9))
+        self.food.delete()
+        self.assertBuckets({
+            (date(2025, 1, 1), None, 'expense'): ('12.00', 2),
+            (date(2025, 2, 1), None, 'expense'): ('5.00', 1),
+        })
+
+    def test_bulk_signal(self):
+        save_transactions(self.user, [
+            Transaction(user=self.user, type='expense', amount=Decimal(amount), date=day, category=category)
+            for amount, day, category in (
+                ('1.10', date(2025, 3, 1), self.food),
+                ('2.20', date(2025, 3, 31), self.food),
+                ('3.30', date(2025, 4, 1), self.food),
+                ('4.40', date(2025, 3, 2), None),
+            )
+        ])
+        self.assertBuckets({
+            (date(2025, 3, 1), self.food, 'expense'): ('3.30', 2),
+            (date(2025, 4, 1), self.food, 'expense'): ('3.30', 1),
+            (date(2025, 3, 1), None, 'expense'): ('4.40', 1),
+        })
+
+    def test_upsert_adds_to_existing_buckets(self):
+        self.add('10', date(2025, 3, 5), self.food)
+        self.add('1', date(2025, 3, 6))
+        # Both conflict targets: the categorized and the uncategorized bucket
+        save_transactions(self.user, [
+            Transaction(user=self.user, type='expense', amount=Decimal('2.50'), date=date(2025, 3, 7), category=self.food),
+            Transaction(user=self.user, type='expense', amount=Decimal('0.25'), date=date(2025, 3, 8)),
+            Transaction(user=self.user, type='expense', amount=Decimal('0.75'), date=date(2025, 3, 9)),
+        ])
+        self.assertBuckets({
+            (date(2025, 3, 1), self.food, 'expense'): ('12.50', 2),
+            (date(2025, 3, 1), None, 'expense'): ('2.00', 3),
+        })
+
+    def test_user_delete_costs_the_same_for_any_number_of_transactions(self):
+        def delete_queries(user, count):
+            save_transactions(user, [
+                Transaction(user=user, type='expense', amount=Decimal('1'), date=date(2025, 1, 1) + timedelta(days=day))
+                for day in range(count)
+            ])
+            user_id = user.pk
+            with CaptureQueriesContext(connection) as captured:
+                user.delete()
+            self.assertEqual(rollups.stored_buckets([user_id]), {})
+            return [query['sql'] for query in captured]
+
+        few = delete_queries(User.objects.create_user(username='few', password='pass12345'), 2)
+        many = delete_queries(User.objects.create_user(username='many', password='pass12345'), 60)
+        self.assertEqual(len(many), len(few))
+        # Rollup rows go with the user; nothing updates them one by one
+        self.assertFalse([sql for sql in many if sql.startswith('UPDATE') and 'monthlyrollup' in sql])
+
+
+@override_settings(RESPONSE_CACHE_TTL=0)
+class AnalyticsRoundingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='counter', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # Amounts that floats can't represent exactly
+        save_transactions(self.user, [
+            Transaction(
+                user=self.user, type=('expense', 'income')[index % 3 == 0],
+                amount=Decimal(('0.10', '0.20', '19.99', '1234.57')[index % 4]),
+                date=date(2024, 1, 1) + timedelta(days=index * 5),
+            )
+            for index in range(200)
+        ])
+
+    def test_summary_and_timeseries_agree_to_the_cent(self):
+        summary = self.client.get(reverse('transactions:transaction-summary'), {'breakdown': 'category,month'}).data
+        series = self.client.get(reverse('transactions:transaction-timeseries'), {'interval': 'month'}).data['series']
+
+        for key in ('total_income', 'total_expenses', 'balance'):
+            self.assertRegex(summary[key], r'^-?\d+\.\d{2}$')
+            self.assertEqual(Decimal(summary[key]), sum(Decimal(bucket[key]) for bucket in series))
+            for row in summary['by_category'] + summary['by_month']:
+                self.assertRegex(row[key], r'^-?\d+\.\d{2}$')
+
+        months = {row['month']: row for row in summary['by_month']}
+        for bucket in series:
+            if bucket['period'] in months:
+                self.assertEqual(months[bucket['period']]['total_expenses'], bucket['total_expenses'])
+
+
+@override_settings(RESPONSE_CACHE_TTL=0)
+class TimeSeriesTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='charted', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.food = Category.objects.create(user=self.user, name='Food', type='expense')
+        self.rent = Category.objects.create(user=self.user, name='Rent', type='expense')
+        for amount, day, category, txn_type in (
+            ('5', date(2025, 1, 1), self.food, 'expense'),     # a Wednesday
+            ('2.50', date(2025, 1, 5), self.food, 'expense'),  # the Sunday of the same week
+            ('30', date(2025, 1, 6), self.rent, 'expense'),
+            ('100', date(2025, 1, 6), None, 'income'),
+        ):
+            Transaction.objects.create(user=self.user, type=txn_type, amount=Decimal(amount), date=day, category=category)
+
+    def get(self, **params):
+        return self.client.get(reverse('transactions:transaction-timeseries'), params)
+
+    def points(self, series, key='total_expenses'):
+        return [(bucket['period'], bucket[key]) for bucket in series]
+
+    def test_zero_fill_renders_cents(self):
+        data = self.get(interval='day', date_from='2024-12-30', date_to='2025-01-03').data
+        self.assertEqual(self.points(data['series']), [
+            ('2024-12-30', '0.00'), ('2024-12-31', '0.00'), ('2025-01-01', '5.00'),
+            ('2025-01-02', '0.00'), ('2025-01-03', '0.00'),
+        ])
+        empty = data['series'][0]
+        self.assertEqual(
+            (empty['total_income'], empty['balance'], empty['income_count'], empty['expense_count']),
+            ('0.00', '0.00', 0, 0),
+        )
+
+    def test_weeks_start_on_monday(self):
+        data = self.get(interval='week').data
+        self.assertEqual(self.points(data['series']), [('2024-12-30', '7.50'), ('2025-01-06', '30.00')])
+        self.assertEqual(self.points(data['series'], 'total_income'), [('2024-12-30', '0.00'), ('2025-01-06', '100.00')])
+
+    def test_split_by_category(self):
+        data = self.get(interval='week', split='category').data
+        self.assertEqual(
+            [(row['category_name'], self.points(row['series'])) for row in data['by_category']],
+            [
+                ('Rent', [('2024-12-30', '0.00'), ('2025-01-06', '30.00')]),
+                ('Food', [('2024-12-30', '7.50'), ('2025-01-06', '0.00')]),
+                ('Uncategorized', [('2024-12-30', '0.00'), ('2025-01-06', '0.00')]),
+            ],
+        )
+        self.assertEqual(data['by_category'][2]['series'][1]['total_income'], '100.00')
+
+    @override_settings(TRANSACTION_TIMESERIES_MAX_BUCKETS=5)
+    def test_too_many_buckets(self):
+        self.assertEqual(self.get(interval='day', date_from='2025-01-01', date_to='2025-01-05').status_code, 200)
+        response = self.get(interval='day', date_from='2025-01-01', date_to='2025-01-06')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('interval', response.data)
+
+    def test_invalid_parameters(self):
+        for params in ({'interval': 'hour'}, {'split': 'type'}, {'date_from': '2025-02-01', 'date_to': '2025-01-01'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.get(**params).status_code, 400)
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='scroller', password='pass12345')
+        other = User.objects.create_user(username='bystander', password='pass12345')
+        # Few distinct amounts and dates, so every ordering has long runs of ties
+        for index in range(23):
+            Transaction.objects.create(
+                user=cls.user, type='expense', amount=Decimal(('5', '12.50', '40')[index % 3]),
+                date=date(2025, 1, 1) + timedelta(days=index % 4),
+                description=('Coffee beans', 'Coffee shop', 'Groceries')[index % 3] + f' {index}',
+            )
+        Transaction.objects.create(user=other, type='expense', amount=Decimal('5'), date=date(2025, 1, 1))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('transactions:transaction-list')
+
+    def get(self, url, params=None):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def walk(self, **params):
+        """Ids page by page following ``next``, then following ``previous`` back."""
+        forward = []
+        data = self.get(self.url, {'pagination': 'cursor', 'page_size': 5, **params})
+        self.assertIsNone(data['previous'])
+        while True:
+            forward.append([row['id'] for row in data['results']])
+            if data['next'] is None:
+                break
+            data = self.get(data['next'])
+
+        backward = [[row['id'] for row in data['results']]]
+        while data['previous'] is not None:
+            data = self.get(data['previous'])
+            backward.append([row['id'] for row in data['results']])
+        return forward, backward[::-1]
+
+    def expected(self, *ordering):
+        return list(Transaction.objects.filter(user=self.user).order_by(*ordering).values_list('id', flat=True))
+
+    def test_walks_every_ordering_forward_and_back(self):
+        for ordering, expected in (
+            (None, ('-date', '-created_at', '-id')),
+            ('-amount', ('-amount', '-id')),
+            ('amount', ('amount', 'id')),
+            ('date', ('date', 'id')),
+            ('-created_at', ('-created_at', '-id')),
+            ('amount,-date', ('amount', '-date', '-id')),
+        ):
+            with self.subTest(ordering=ordering):
+                forward, backward = self.walk(**({'ordering': ordering} if ordering else {}))
+                ids = [pk for page in forward for pk in page]
+                self.assertEqual(ids, self.expected(*expected))
+                self.assertEqual([len(page) for page in forward], [5, 5, 5, 5, 3])
+                # Walking back returns exactly the same pages
+                self.assertEqual(backward, forward)
+
+    def test_search(self):
+        forward, backward = self.walk(search='coffee')
+        ids = [pk for page in forward for pk in page]
+        coffee = Transaction.objects.filter(user=self.user, description__startswith='Coffee')
+        self.assertEqual(sorted(ids), sorted(coffee.values_list('id', flat=True)))
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(backward, forward)
+
+    def test_count_is_opt_in(self):
+        data = self.get(self.url, {'pagination': 'cursor'})
+        self.assertNotIn('count', data)
+        with self.assertNumQueries(1):
+            self.get(data['next'])
+        data = self.get(self.url, {'pagination': 'cursor', 'count': 'true', 'min_amount': '10'})
+        self.assertEqual(data['count'], 15)
+
+    def test_page_size_is_capped(self):
+        Transaction.objects.bulk_create([
+            Transaction(user=self.user, type='income', amount=Decimal('1'), date=date(2024, 1, 1))
+            for _ in range(100)
+        ])
+        data = self.get(self.url, {'pagination': 'cursor', 'page_size': 1000})
+        self.assertEqual(len(data['results']), 100)
+        self.assertIsNotNone(data['next'])
+
+    def test_invalid_or_tampered_cursor(self):
+        next_url = self.get(self.url, {'pagination': 'cursor', 'page_size': 5})['next']
+        cursor = parse_qs(urlparse(next_url).query)['cursor'][0]
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        for label, value in (
+            ('garbage', 'not-a-cursor'),
+            ('missing values', self.encode({'r': 0})),
+            ('too few values', self.encode({**payload, 'v': payload['v'][:1]})),
+            ('bad date', self.encode({**payload, 'v': ['yesterday', *payload['v'][1:]]})),
+        ):
+            with self.subTest(cursor=label):
+                response = self.client.get(self.url, {'cursor': value})
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.data['detail'], 'Invalid cursor')
+
+    @staticmethod
+    def encode(payload):
+        return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='searcher', password='pass12345')
+        other = User.objects.create_user(username='hidden', password='pass12345')
+        cls.rows = {}
+        for key, description, day in (
+            ('groceries', 'Groceries at the market', 1),
+            ('weekly', 'Weekly GROCERY run', 2),
+            ('coffee_shop', 'Coffee shop', 3),
+            ('coffee_beans', 'Coffee beans for the shop? No, for home', 4),
+            ('coffee_many', 'Coffee, coffee and more coffee', 5),
+            ('rent', 'Rent', 6),
+        ):
+            cls.rows[key] = Transaction.objects.create(
+                user=cls.user, type='expense', amount=Decimal('10'), date=date(2025, 1, day), description=description,
+            )
+        Transaction.objects.create(user=other, type='expense', amount=Decimal('1'), date=date(2025, 1, 1),
+                                   description='Groceries')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def find(self, text, **params):
+        response = self.client.get(reverse('transactions:transaction-list'), {'search': text, **params})
+        self.assertEqual(response.status_code, 200)
+        ids = {row.pk: key for key, row in self.rows.items()}
+        return [ids[row['id']] for row in response.data['results']]
+
+    def test_prefix_match(self):
+        self.assertEqual(sorted(self.find('groc')), ['groceries', 'weekly'])
+        self.assertEqual(sorted(self.find('COF')), ['coffee_beans', 'coffee_many', 'coffee_shop'])
+        self.assertEqual(self.find('xyz'), [])
+
+    def test_all_terms_must_match(self):
+        self.assertEqual(sorted(self.find('coffee shop')), ['coffee_beans', 'coffee_shop'])
+        self.assertEqual(sorted(self.find('shop, coffee!')), ['coffee_beans', 'coffee_shop'])
+        self.assertEqual(self.find('coffee rent'), [])
+
+    def test_blank_search_lists_everything(self):
+        self.assertEqual(len(self.find('  ?! ')), len(self.rows))
+
+    def test_ordered_by_relevance(self):
+        results = self.find('coffee')
+        if connection.vendor == 'sqlite' and not search.sqlite_has_fts(connection.alias):
+            self.skipTest('No FTS5: results are unranked')
+        # More occurrences in a shorter description rank first
+        self.assertEqual(results[0], 'coffee_many')
+        self.assertEqual(results[-1], 'coffee_beans')
+
+    def test_explicit_ordering_wins(self):
+        self.assertEqual(self.find('coffee', ordering='date'), ['coffee_shop', 'coffee_beans', 'coffee_many'])
+
+    @mock.patch.dict(search.BACKENDS, {}, clear=True)
+    def test_fallback_backend(self):
+        self.assertEqual(sorted(self.find('groc')), ['groceries', 'weekly'])
+        self.assertEqual(sorted(self.find('coffee shop')), ['coffee_beans', 'coffee_shop'])
+        # Unranked, so the default newest-first order applies
+        self.assertEqual(self.find('coffee'), ['coffee_many', 'coffee_beans', 'coffee_shop'])
+
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite only')
+    def test_sqlite_without_fts5_uses_the_fallback(self):
+        with mock.patch.dict(search._fts_tables, {(connection.alias, connection.settings_dict['NAME']): False}):
+            with CaptureQueriesContext(connection) as captured:
+                self.assertEqual(sorted(self.find('coffee shop')), ['coffee_beans', 'coffee_shop'])
+            self.assertEqual(self.find('coffee'), ['coffee_many', 'coffee_beans', 'coffee_shop'])
+        self.assertFalse([query for query in captured if search.FTS_TABLE in query['sql']])
+        self.assertTrue(search.sqlite_has_fts(connection.alias))
+
+
+class TransactionValuesSerializerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='serialized', password='pass12345')
+        food = Category.objects.create(user=self.user, name='Food', type='expense')
+        for amount, day, category, description in (
+            ('1234.5', date(2025, 1, 31), food, 'Groceries'),
+            ('0.1', date(2024, 2, 29), None, ''),
+            ('99999999.99', date(2025, 12, 1), food, 'Ünïcode “quotes”'),
+            ('7', date(2025, 6, 15), None, 'Uncategorized'),
+        ):
+            Transaction.objects.create(
+                user=self.user, type='expense', amount=Decimal(amount), date=day,
+                category=category, description=description,
+            )
+
+    def test_same_output_as_the_model_serializer(self):
+        queryset = Transaction.objects.filter(user=self.user).select_related('category').order_by('id')
+        expected = TransactionSerializer(queryset, many=True).data
+        actual = TransactionValuesSerializer(TransactionValuesSerializer.values(queryset), many=True).data
+
+        self.assertEqual(len(actual), 4)
+        for model_row, values_row in zip(expected, actual):
+            with self.subTest(id=model_row['id']):
+                self.assertEqual(list(values_row), list(model_row))
+                for name, value in model_row.items():
+                    self.assertEqual(values_row[name], value, name)
+                    self.assertIs(type(values_row[name]), type(value), name)
+
+        self.assertEqual([row['amount'] for row in actual], ['1234.50', '0.10', '99999999.99', '7.00'])
+        self.assertEqual(actual[1]['date'], '2024-02-29')
+        self.assertNotIn('category_name', actual[1])
+        self.assertEqual(actual[0]['category_name'], 'Food')
+
+    def test_list_matches_detail(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        listed = client.get(reverse('transactions:transaction-list'), {'page_size': 10}).data['results']
+        for row in listed:
+            self.assertEqual(row, client.get(reverse('transactions:transaction-detail', args=[row['id']])).data)
+
+
+@override_settings(TRANSACTION_EXPORT_CHUNK_SIZE=2)
+class ExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='exporter', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        food = Category.objects.create(user=self.user, name='Food', type='expense')
+        self.rows = [
+            Transaction.objects.create(
+                user=self.user, type=txn_type, amount=Decimal(amount), date=day, category=category,
+                description=description,
+            )
+            for txn_type, amount, day, category, description in (
+                ('expense', '12.5', date(2025, 1, 3), food, 'Bread, milk and "eggs"'),
+                ('income', '1000', date(2025, 1, 1), None, 'Salary'),
+                ('expense', '3.99', date(2025, 1, 2), None, 'Line one\nline two'),
+            )
+        ]
+        other = User.objects.create_user(username='not-exported', password='pass12345')
+        Transaction.objects.create(user=other, type='expense', amount=Decimal('1'), date=date(2025, 1, 1))
+
+    def export(self, **params):
+        response = self.client.get(reverse('transactions:transaction-export'), params)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content)
+
+    def expected(self, txn):
+        txn.refresh_from_db()
+        return {
+            'id': txn.pk,
+            'date': txn.date.isoformat(),
+            'type': txn.type,
+            'amount': f'{txn.amount:.2f}',
+            'category': txn.category_id,
+            'category_name': txn.category.name if txn.category else None,
+            'description': txn.description,
+            'created_at': timezone.localtime(txn.created_at).isoformat(),
+            'updated_at': timezone.localtime(txn.updated_at).isoformat(),
+        }
+
+    def test_csv(self):
+        response, body = self.export()
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertRegex(response['Content-Disposition'], r'^attachment; filename="transactions-\d{4}-\d{2}-\d{2}\.csv"$')
+
+        reader = csv.DictReader(io.StringIO(body.decode()))
+        self.assertEqual(reader.fieldnames, list(exporters.COLUMNS))
+        newest_first = [self.rows[0], self.rows[2], self.rows[1]]
+        self.assertEqual(list(reader), [
+            {name: '' if value is None else str(value) for name, value in self.expected(txn).items()}
+            for txn in newest_first
+        ])
+
+    def test_ndjson(self):
+        response, body = self.export(fmt='ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertTrue(response['Content-Disposition'].endswith('.ndjson"'))
+        lines = body.decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines],
+                         [self.expected(txn) for txn in (self.rows[0], self.rows[2], self.rows[1])])
+
+    def test_filters_and_ordering(self):
+        _, body = self.export(fmt='ndjson', type='expense', ordering='amount')
+        self.assertEqual([json.loads(line)['id'] for line in body.decode().splitlines()],
+                         [self.rows[2].pk, self.rows[0].pk])
+        _, body = self.export(fmt='ndjson', search='salary')
+        self.assertEqual([json.loads(line)['id'] for line in body.decode().splitlines()], [self.rows[1].pk])
+        _, body = self.export(date_from='2026-01-01')
+        self.assertEqual(body.decode().splitlines(), [','.join(exporters.COLUMNS)])
+
+    def test_gzip_round_trip(self):
+        for fmt in ('csv', 'ndjson'):
+            with self.subTest(fmt=fmt):
+                _, plain = self.export(fmt=fmt)
+                response, compressed = self.export(fmt=fmt, gzip='true')
+                self.assertEqual(response['Content-Type'], 'application/gzip')
+                self.assertTrue(response['Content-Disposition'].endswith(f'.{fmt}.gz"'))
+                self.assertEqual(gzip.decompress(compressed), plain)
+
+    def test_unknown_format(self):
+        response = self.client.get(reverse('transactions:transaction-export'), {'fmt': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(RESPONSE_CACHE_TTL=0)
+class SummaryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='summarized', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.food = Category.objects.create(user=self.user, name='Food', type='expense')
+        self.rent = Category.objects.create(user=self.user, name='Rent', type='expense')
+        self.salary = Category.objects.create(user=self.user, name='Salary', type='income')
+        for txn_type, amount, day, category, description in (
+            ('expense', '12.50', date(2025, 1, 3), self.food, 'Groceries'),
+            ('expense', '7.25', date(2025, 2, 8), self.food, 'Coffee beans'),
+            ('expense', '800', date(2025, 2, 1), self.rent, 'February rent'),
+            ('expense', '3', date(2025, 2, 20), None, 'Coffee'),
+            ('income', '2000', date(2025, 1, 31), self.salary, 'January salary'),
+            ('income', '50.10', date(2025, 2, 14), None, 'Refund'),
+        ):
+            Transaction.objects.create(
+                user=self.user, type=txn_type, amount=Decimal(amount), date=day,
+                category=category, description=description,
+            )
+        other = User.objects.create_user(username='elsewhere', password='pass12345')
+        Transaction.objects.create(user=other, type='expense', amount=Decimal('99'), date=date(2025, 1, 5))
+
+    def summary(self, **params):
+        response = self.client.get(reverse('transactions:transaction-summary'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def totals(self, data):
+        return (data['total_income'], data['total_expenses'], data['balance'],
+                data['income_count'], data['expense_count'])
+
+    def test_unfiltered(self):
+        self.assertEqual(self.totals(self.summary()), ('2050.10', '822.75', '1227.35', 2, 4))
+
+    def test_filters(self):
+        for params, expected in (
+            ({'type': 'expense'}, ('0.00', '822.75', '-822.75', 0, 4)),
+            ({'category': self.food.pk}, ('0.00', '19.75', '-19.75', 0, 2)),
+            ({'date_from': '2025-02-01'}, ('50.10', '810.25', '-760.15', 1, 3)),
+            ({'date_from': '2025-01-01', 'date_to': '2025-01-31'}, ('2000.00', '12.50', '1987.50', 1, 1)),
+            ({'min_amount': '10', 'max_amount': '1000'}, ('50.10', '812.50', '-762.40', 1, 2)),
+            ({'search': 'coffee'}, ('0.00', '10.25', '-10.25', 0, 2)),
+            ({'search': 'coffee', 'date_from': '2025-02-10'}, ('0.00', '3.00', '-3.00', 0, 1)),
+            ({'date_from': '2030-01-01'}, ('0.00', '0.00', '0.00', 0, 0)),
+        ):
+            with self.subTest(params=params):
+                self.assertEqual(self.totals(self.summary(**params)), expected)
+
+    def test_breakdown_by_category(self):
+        rows = self.summary(breakdown='category')['by_category']
+        self.assertEqual(
+            [(row['category_id'], row['category_name'], *self.totals(row)) for row in rows],
+            [
+                (self.rent.pk, 'Rent', '0.00', '800.00', '-800.00', 0, 1),
+                (self.food.pk, 'Food', '0.00', '19.75', '-19.75', 0, 2),
+                (None, 'Uncategorized', '50.10', '3.00', '47.10', 1, 1),
+                (self.salary.pk, 'Salary', '2000.00', '0.00', '2000.00', 1, 0),
+            ],
+        )
+        # Filtered breakdowns come from the matching transactions only
+        rows = self.summary(breakdown='category', type='income')['by_category']
+        self.assertEqual(sorted((row['category_name'], row['total_income']) for row in rows),
+                         [('Salary', '2000.00'), ('Uncategorized', '50.10')])
+
+    def test_breakdown_by_month(self):
+        data = self.summary(breakdown='month, category')
+        self.assertIn('by_category', data)
+        self.assertEqual(
+            [(row['month'], *self.totals(row)) for row in data['by_month']],
+            [
+                ('2025-01-01', '2000.00', '12.50', '1987.50', 1, 1),
+                ('2025-02-01', '50.10', '810.25', '-760.15', 1, 3),
+            ],
+        )
+        rows = self.summary(breakdown='month', type='expense', search='coffee')['by_month']
+        self.assertEqual([(row['month'], row['total_expenses'], row['expense_count']) for row in rows],
+                         [('2025-02-01', '10.25', 2)])
+
+    def test_unknown_breakdown(self):
+        response = self.client.get(reverse('transactions:transaction-summary'), {'breakdown': 'week'})
+        self.assertEqual(response.status_code, 400)
+
+
+class GenerateDataTests(TestCase):
+    OPTIONS = {'users': 2, 'transactions': 120, 'years': 1, 'end': date(2025, 6, 30), 'batch_size': 50}
+
+    def generate(self, prefix, seed=7):
+        call_command('generate_data', prefix=prefix, seed=seed, stdout=io.StringIO(), **self.OPTIONS)
+        return list(User.objects.filter(username__startswith=prefix).order_by('username'))
+
+    def snapshot(self, users):
+        """Everything generated for ``users``, without ids or timestamps."""
+        return [
+            (
+                sorted(Transaction.objects.filter(user=user).values_list(
+                    'category__name', 'type', 'amount', 'description', 'date',
+                ), key=repr),
+                sorted(Budget.objects.filter(user=user).values_list('month', 'budget_amount')),
+                sorted(BudgetAlert.objects.filter(user=user).values_list('month', 'threshold', 'spent')),
+            )
+            for user in users
+        ]
+
+    def test_same_seed_same_data(self):
+        first = self.snapshot(self.generate('first'))
+        self.assertEqual(self.snapshot(self.generate('again')), first)
+        self.assertNotEqual(self.snapshot(self.generate('other', seed=8)), first)
+
+        transactions, budgets, _ = first[0]
+        self.assertEqual(len(transactions), 120)
+        self.assertEqual(len(budgets), 13)  # 2024-06 through 2025-06
+
+    def test_derived_data_is_consistent(self):
+        users = self.generate('derived')
+        user_ids = [user.pk for user in users]
+        self.assertEqual(rollups.verify(user_ids), [])
+
+        # Every generated object is in the sync change log exactly once
+        logged = list(Change.objects.filter(user__in=users).values_list('model', 'object_id'))
+        self.assertEqual(len(logged), len(set(logged)))
+        self.assertEqual(set(logged), {
+            *((Change.TRANSACTION, pk) for pk in Transaction.objects.filter(user__in=users).values_list('id', flat=True)),
+            *((Change.CATEGORY, pk) for pk in Category.objects.filter(user__in=users).values_list('id', flat=True)),
+            *((Change.BUDGET, pk) for pk in Budget.objects.filter(user__in=users).values_list('id', flat=True)),
+        })
+
+        # Alerts match what each month's spending has crossed
+        budgets = Budget.objects.filter(user__in=users).annotate(month_expenses=rollups.month_expenses_subquery())
+        for budget in budgets:
+            spent = Decimal(budget.month_expenses or 0).quantize(rollups.CENT)
+            with self.subTest(user=budget.user_id, month=budget.month):
+                self.assertEqual(
+                    sorted(budget.alerts.filter(cleared_at__isnull=True).values_list('threshold', flat=True)),
+                    alerts.crossed(spent, budget.budget_amount, sorted(settings.BUDGET_ALERT_THRESHOLDS)),
+                )
+        self.assertTrue(BudgetAlert.objects.filter(user__in=users).exists())
+
+    def test_existing_usernames_are_refused(self):
+        self.generate('taken')
+        with self.assertRaisesMessage(CommandError, 'already exist'):
+            self.generate('taken')
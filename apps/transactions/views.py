@@ -1,37 +1,236 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.response import Response
-from django.db.models import Sum
-from .models import Transaction
-from .serializers import TransactionSerializer
+from .models import Transaction, MonthlyRollup
+from . import analytics, exporters
+from .importers import Importer, StatementError, detect_format
+from .serializers import TransactionSerializer, TransactionValuesSerializer
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
+from django_filters.utils import translate_validation
+from rest_framework.filters import OrderingFilter
 from .filters import TransactionFilter
+from .pagination import TransactionPagination
+from .search import TransactionSearchFilter
+from apps.sync.cache import cached
+from apps.sync.versions import conditional
 
 class TransactionViewSet(viewsets.ModelViewSet):
     serializer_class = TransactionSerializer
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, TransactionSearchFilter, OrderingFilter]
     filterset_class = TransactionFilter
-    search_fields = ['description']
     ordering_fields = ['date', 'amount', 'created_at']
+    pagination_class = TransactionPagination
     def get_queryset(self):
-        return Transaction.objects.filter(user=self.request.user)
+        return Transaction.objects.filter(user=self.request.user).select_related('category')
+    
+    def list(self, request, *args, **kwargs):
+        """
+        List transactions from ``.values()`` rows.
+        
+        Same output as TransactionSerializer, without building a model
+        instance per row. Ordering columns are fetched too because cursor
+        pagination reads its position from the rows.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        rows = TransactionValuesSerializer.values(
+            queryset, *(name.lstrip('-') for name in ordering if isinstance(name, str))
+        )
+        
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(TransactionValuesSerializer(page, many=True).data)
+        return Response(TransactionValuesSerializer(rows, many=True).data)
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
     
     @action(detail=False, methods=['get'])
+    @conditional
+    @cached
     def summary(self, request):
-        """Financial summary endpoint"""
-        transactions = self.get_queryset()
-        
-        income = transactions.filter(type='income').aggregate(total=Sum('amount'))['total'] or 0
-        expenses = transactions.filter(type='expense').aggregate(total=Sum('amount'))['total'] or 0
-        
-        return Response({
-            'total_income': str(income),
-            'total_expenses': str(expenses),
-            'balance': str(income - expenses),
-            'income_count': transactions.filter(type='income').count(),
-            'expense_count': transactions.filter(type='expense').count(),
-        })
\ No newline at end of file
+        """
+        Financial summary endpoint.
+        
+        Accepts the same filters as the list (type, category, date_from,
+        date_to, min_amount, max_amount, search). Unfiltered summaries are
+        read from the monthly rollup; filtered ones are a single
+        conditional-aggregation query over the matching transactions.
+        
+        Query params:
+            breakdown: comma-separated "category" and/or "month" to add
+                       by_category / by_month totals to the response
+        """
+        breakdowns = {
+            part.strip() for part in request.query_params.get('breakdown', '').split(',') if part.strip()
+        }
+        unknown = breakdowns - {'category', 'month'}
+        if unknown:
+            return Response(
+                {'breakdown': f"Unknown breakdown: {', '.join(sorted(unknown))}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if self.has_list_filters(request):
+            source = self.filter_queryset(self.get_queryset())
+        else:
+            source = MonthlyRollup.objects.filter(user=request.user)
+        
+        data = analytics.totals(source)
+        if 'category' in breakdowns:
+            data['by_category'] = analytics.by_category(source)
+        if 'month' in breakdowns:
+            data['by_month'] = analytics.by_month(source)
+        return Response(data)
+    
+    @action(detail=False, methods=['get'])
+    @conditional
+    @cached
+    def timeseries(self, request):
+        """
+        Income/expense totals per day, week, month or year.
+        
+        Accepts the same filters as the list. date_from/date_to also set
+        the range of the series, and buckets without transactions are
+        returned as zeros. Month and year series over whole months with no
+        other filters are read from the monthly rollup; everything else is
+        one grouped query over the matching transactions.
+        
+        Query params:
+            interval: "day", "week" (starting Monday), "month" (default)
+                      or "year"
+            split: "category" to add a series per category as by_category
+        """
+        interval = request.query_params.get('interval', 'month')
+        if interval not in analytics.INTERVALS:
+            return Response(
+                {'interval': f"Unknown interval: {interval}. Use one of: {', '.join(analytics.INTERVALS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        split = request.query_params.get('split', '')
+        if split not in ('', 'category'):
+            return Response(
+                {'split': f"Unknown split: {split}. Use: category."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        filterset = self.filterset_class(request.query_params, queryset=self.get_queryset(), request=request)
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        date_from = filterset.form.cleaned_data.get('date_from')
+        date_to = filterset.form.cleaned_data.get('date_to')
+        if date_from and date_to and date_from > date_to:
+            return Response(
+                {'date_to': 'date_to must not be before date_from.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if self.rollup_covers(request, interval, date_from, date_to):
+            source = MonthlyRollup.objects.filter(user=request.user)
+            if date_from:
+                source = source.filter(month__gte=date_from)
+            if date_to:
+                source = source.filter(month__lte=date_to)
+        else:
+            source = self.filter_queryset(self.get_queryset())
+        
+        try:
+            data = analytics.series(
+                source, interval, settings.TRANSACTION_TIMESERIES_MAX_BUCKETS,
+                start=date_from, end=date_to, split_category=split == 'category',
+            )
+        except ValueError as exc:
+            return Response({'interval': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'interval': interval, **data})
+    
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser, FormParser])
+    def import_statement(self, request):
+        """
+        Import transactions from an uploaded CSV or OFX statement.
+        
+        Form fields:
+            file: the statement (required)
+            fmt: "csv" or "ofx"; defaults to the file extension
+            date_format: strptime format for CSV dates (default ISO 8601)
+            category: category name for rows that don't have one
+        
+        Valid rows are inserted in chunks; invalid rows are listed in
+        "errors" by row number and skipped.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'file': 'No file was submitted.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            fmt = detect_format(upload.name, request.data.get('fmt'))
+            importer = Importer(
+                request.user,
+                date_format=request.data.get('date_format') or None,
+                default_category=request.data.get('category'),
+            )
+            result = importer.run(upload, fmt)
+        except StatementError as e:
+            return Response({'file': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(
+            result,
+            status=status.HTTP_201_CREATED if result['imported'] else status.HTTP_200_OK
+        )
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream the user's transactions as a file.
+        
+        Accepts the same filters and ordering as the list, without
+        pagination.
+        
+        Query params:
+            fmt: "csv" (default) or "ndjson"
+            gzip: "true" to download a gzip-compressed file
+        """
+        fmt = request.query_params.get('fmt', 'csv')
+        if fmt not in exporters.FORMATS:
+            return Response(
+                {'fmt': f"Unknown format: {fmt}. Use one of: {', '.join(exporters.FORMATS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        compress = request.query_params.get('gzip', '').lower() in ('1', 'true', 'yes')
+        
+        content_type, extension = exporters.FORMATS[fmt]
+        filename = f"transactions-{timezone.localdate().isoformat()}.{extension}"
+        if compress:
+            content_type = 'application/gzip'
+            filename += '.gz'
+        
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(
+            exporters.stream(queryset, fmt, compress=compress),
+            content_type=content_type,
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    
+    def rollup_covers(self, request, interval, date_from, date_to):
+        """Whether the monthly rollup holds exactly the rows a time series needs."""
+        if interval not in ('month', 'year'):
+            return False
+        params = set(self.filterset_class.base_filters) | {TransactionSearchFilter.search_param}
+        if any(request.query_params.get(param) for param in params - {'date_from', 'date_to'}):
+            return False
+        # Rollup buckets are whole months
+        return (
+            (date_from is None or date_from.day == 1)
+            and (date_to is None or (date_to + timedelta(days=1)).day == 1)
+        )
+    
+    def has_list_filters(self, request):
+        """Whether the request narrows the list beyond the user's own rows."""
+        params = set(self.filterset_class.base_filters) | {TransactionSearchFilter.search_param}
+        return any(request.query_params.get(param) for param in params)
@@ -0,0 +1,221 @@
+"""
+Token authentication with a cache in front of the database.
+
+DRF's TokenAuthentication loads the Token joined to its User on every
+request. CachedTokenAuthentication remembers the token -> user resolution
+in a bounded in-process LRU for AUTH_TOKEN_CACHE_TTL seconds, backed by a
+Django cache shared by all workers (AUTH_TOKEN_CACHE_ALIAS, file or Redis)
+so they all benefit from one lookup.
+
+Every worker has its own LRU, so revocations (see signals.py: logout,
+password change, deactivation, any user save or delete) can't rely on
+clearing entries; the worker that handles the revocation can only clear
+its own. Instead every token has a generation in the shared cache.
+Entries remember the generation they were loaded under and a revocation
+replaces it, so a hit costs one cache read and no query.
+
+Without a shared cache (no alias, or a per-process locmem/dummy cache)
+revocations couldn't reach other workers, so nothing is cached and every
+request takes DRF's lookup.
+"""
+
+import copy
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import APIException, AuthenticationFailed
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+
+class TokenCache:
+    """Bounded LRU of token key -> user with a TTL, checked against revocations on every hit."""
+
+    def __init__(self):
+        self._entries = OrderedDict()  # key -> (expires_at, generation, user)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def shared():
+        """The cache shared by all workers, or None if there isn't one."""
+        alias = settings.AUTH_TOKEN_CACHE_ALIAS
+        if not alias:
+            return None
+        cache = caches[alias]
+        # A per-process cache can't carry revocations to other workers
+        return None if isinstance(cache, (LocMemCache, DummyCache)) else cache
+
+    @staticmethod
+    def shared_key(key, kind='authtoken'):
+        # Never put raw tokens into an external cache
+        return f'{kind}:' + hashlib.sha256(key.encode()).hexdigest()
+
+    def generation(self, key):
+        """
+        The token's current generation in the shared cache (None without one).
+
+        Read it before loading the user: a revocation that lands during
+        the load then replaces it, and the stored entry is never valid.
+        """
+        shared = self.shared()
+        if shared is None:
+            return None
+        generation_key = self.shared_key(key, 'authtoken-generation')
+        generation = shared.get(generation_key)
+        if generation is None:
+            shared.add(generation_key, uuid.uuid4().hex, None)
+            generation = shared.get(generation_key)
+        return generation
+
+    def is_current(self, shared, key, generation):
+        """Whether an entry stored under ``generation`` may still be used."""
+        # An evicted generation reads as None and fails the check
+        return generation is not None and shared.get(self.shared_key(key, 'authtoken-generation')) == generation
+
+    def get(self, key):
+        shared = self.shared()
+        if shared is None:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is not None:
+            _, generation, user = entry
+            if self.is_current(shared, key, generation):
+                self.hits += 1
+                return user
+            self.invalidate_local(key)
+        else:
+            value = shared.get(self.shared_key(key))
+            if value is not None:
+                generation, user = value
+                if self.is_current(shared, key, generation):
+                    self._store_local(key, generation, user)
+                    self.hits += 1
+                    return user
+
+        self.misses += 1
+        return None
+
+    def set(self, key, generation, user):
+        shared = self.shared()
+        if shared is None:
+            return
+        self._store_local(key, generation, user)
+        shared.set(self.shared_key(key), (generation, user), settings.AUTH_TOKEN_CACHE_TTL)
+
+    def invalidate(self, *keys):
+        """
+        Revoke cached entries of ``keys`` in every worker.
+
+        The generation is replaced now and again once the surrounding
+        transaction commits, in case another worker reads the old rows
+        in between.
+        """
+        self.invalidate_local(*keys)
+        shared = self.shared()
+        if shared is None or not keys:
+            return
+
+        def revoke():
+            shared.delete_many([self.shared_key(key) for key in keys])
+            shared.set_many(
+                {self.shared_key(key, 'authtoken-generation'): uuid.uuid4().hex for key in keys}, None
+            )
+
+        revoke()
+        transaction.on_commit(revoke)
+
+    def invalidate_local(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def invalidate_user(self, user_id):
+        """Revoke every token of a user."""
+        if self.shared() is None:
+            return
+        with self._lock:
+            local = [key for key, (_, _, user) in self._entries.items() if user.pk == user_id]
+        keys = set(local) | set(Token.objects.filter(user_id=user_id).values_list('key', flat=True))
+        self.invalidate(*keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _store_local(self, key, generation, user):
+        if settings.AUTH_TOKEN_CACHE_SIZE <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + settings.AUTH_TOKEN_CACHE_TTL, generation, user)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.AUTH_TOKEN_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Drop-in replacement for rest_framework's TokenAuthentication.
+
+    Same header format and error messages; only the Token/User lookup is
+    served from token_cache when possible. Without a shared cache this is
+    exactly TokenAuthentication.
+    """
+
+    def authenticate_credentials(self, key):
+        if token_cache.shared() is None:
+            return super().authenticate_credentials(key)
+
+        user = token_cache.get(key)
+        if user is None:
+            generation = token_cache.generation(key)
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, generation, copy.copy(user))
+            return (user, token)
+
+        if not user.is_active:
+            raise AuthenticationFailed('User inactive or deleted.')
+        # Each request gets its own instance so nothing a view caches on
+        # request.user leaks into other requests
+        user = copy.copy(user)
+        return (user, Token(key=key, user=user))
+
+
+def authenticate(request):
+    """
+    Run the configured DRF authentication classes against a plain request.
+
+    Returns the user, or None if no authenticator accepted the request.
+    For code outside DRF views: async views and middleware.
+    """
+    drf_request = Request(request)
+    for authenticator_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        try:
+            result = authenticator_class().authenticate(drf_request)
+        except APIException:
+            return None
+        if result is not None:
+            return result[0]
+    return None
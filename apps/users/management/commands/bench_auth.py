@@ -0,0 +1,79 @@
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from apps.transactions.views import TransactionViewSet
+from apps.users.authentication import CachedTokenAuthentication, token_cache
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare queries and latency per GET /api/transactions/ with plain and "
+        "cached token authentication. Works on a throwaway user inside a "
+        "rolled back transaction. The cache needs one shared by all workers; "
+        "without AUTH_TOKEN_CACHE_ALIAS a temporary file cache stands in."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help="Requests per mode (default 200).")
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            try:
+                with transaction.atomic(), override_settings(ALLOWED_HOSTS=['*']), self.shared_cache(directory):
+                    user = User.objects.create_user('bench-auth', password='unused')
+                    token = Token.objects.create(user=user)
+                    for label, auth_class in (
+                        ('TokenAuthentication', TokenAuthentication),
+                        ('CachedTokenAuthentication', CachedTokenAuthentication),
+                    ):
+                        self.run(label, auth_class, token.key, options['requests'])
+                    raise Rollback
+            except Rollback:
+                pass
+
+    def shared_cache(self, directory):
+        if token_cache.shared() is not None:
+            return override_settings()
+        return override_settings(
+            CACHES={
+                **settings.CACHES,
+                'bench-auth': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory},
+            },
+            AUTH_TOKEN_CACHE_ALIAS='bench-auth',
+        )
+
+    def run(self, label, auth_class, key, count):
+        view = TransactionViewSet.as_view({'get': 'list'}, authentication_classes=[auth_class])
+        factory = RequestFactory()
+        token_cache.clear()
+        view(factory.get('/api/transactions/', HTTP_AUTHORIZATION=f'Token {key}'))  # warm up
+
+        timings = []
+        queries = 0
+        for _ in range(count):
+            request = factory.get('/api/transactions/', HTTP_AUTHORIZATION=f'Token {key}')
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = view(request)
+                timings.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.status_code
+            queries += len(captured)
+
+        self.stdout.write(
+            f"  {label:<26} {queries / count:5.2f} queries/request"
+            f"   median {statistics.median(timings) * 1000:7.2f} ms"
+        )
@@ -0,0 +1,35 @@
+"""
+Keep the token cache honest: a cached token must stop working as soon as
+the user logs out, changes their password or is deactivated, in every
+worker (see TokenCache.invalidate).
+"""
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import token_cache
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    token_cache.invalidate(instance.key)
+
+
+@receiver(pre_save, sender=settings.AUTH_USER_MODEL)
+def delete_tokens_on_password_change(sender, instance, update_fields, **kwargs):
+    # A new password signs the user out of every client, like logging out
+    if instance.pk is None or (update_fields is not None and 'password' not in update_fields):
+        return
+    old_password = sender.objects.filter(pk=instance.pk).values_list('password', flat=True).first()
+    if old_password is not None and old_password != instance.password:
+        Token.objects.filter(user_id=instance.pk).delete()
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def forget_user_tokens(sender, instance, created, **kwargs):
+    # Any change to the user (password, is_active, profile) could make the
+    # cached copy wrong; saves are rare next to authenticated requests
+    if not created:
+        token_cache.invalidate_user(instance.pk)
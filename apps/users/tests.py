@@ -1,3 +1,110 @@
-from django.test import TestCase
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from .authentication import token_cache
+
+
+class TokenRevocationMixin:
+    """
+    Each revocation runs as if another worker handled it: the local cache
+    entry of this "worker" is left in place and must still be rejected.
+    """
+
+    def setUp(self):
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
+        self.user = User.objects.create_user(username='revoked', password='pass12345')
+        self.token = Token.objects.create(user=self.user)
+        self.auth = {'HTTP_AUTHORIZATION': f'Token {self.token.key}'}
+
+        # Warm the cache and check a hit is served from it
+        self.assertEqual(self.get_profile().status_code, 200)
+        self.assertEqual(self.get_profile().status_code, 200)
+        self.assertGreater(token_cache.hits, 0)
+
+    def get_profile(self):
+        return self.client.get(reverse('users:profile'), **self.auth)
+
+    def elsewhere(self):
+        return mock.patch.object(token_cache, 'invalidate_local')
+
+    def test_logout_rejects_token(self):
+        with self.elsewhere():
+            other = Token(key=self.token.key, user=self.user)
+            other.delete()
+        self.assertEqual(self.get_profile().status_code, 401)
+
+    def test_logout_endpoint_rejects_token(self):
+        response = self.client.post(reverse('users:logout'), **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_profile().status_code, 401)
+
+    def test_password_change_rejects_token(self):
+        with self.elsewhere():
+            user = User.objects.get(pk=self.user.pk)
+            user.set_password('changed12345')
+            user.save()
+        self.assertEqual(self.get_profile().status_code, 401)
+
+    def test_deactivation_rejects_token(self):
+        with self.elsewhere():
+            User.objects.filter(pk=self.user.pk).update(is_active=False)
+            User.objects.get(pk=self.user.pk).save()
+        self.assertEqual(self.get_profile().status_code, 401)
+
+
+class SharedTokenCacheTests(TokenRevocationMixin, TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(
+            CACHES={
+                'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                'tokens': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory.name},
+            },
+            AUTH_TOKEN_CACHE_ALIAS='tokens',
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        super().setUp()
+
+    def test_hit_needs_no_query(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(token_cache.get(self.token.key).pk, self.user.pk)
+
+    def test_request_skips_the_token_lookup(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_profile().status_code, 200)
+
+    def test_entry_from_another_worker_is_used(self):
+        token_cache.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(token_cache.get(self.token.key).pk, self.user.pk)
+
+
+class UnsharedTokenCacheTests(TestCase):
+    """Without a shared cache nothing is cached, so revocations can't be missed."""
+
+    def setUp(self):
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
+        self.user = User.objects.create_user(username='uncached', password='pass12345')
+        self.auth = {'HTTP_AUTHORIZATION': f'Token {Token.objects.create(user=self.user).key}'}
+
+    def test_nothing_is_cached(self):
+        for alias in ('', 'default'):  # none, and the per-process locmem default
+            with self.subTest(alias=alias), override_settings(AUTH_TOKEN_CACHE_ALIAS=alias):
+                hits = token_cache.hits
+                for _ in range(2):
+                    self.assertEqual(self.client.get(reverse('users:profile'), **self.auth).status_code, 200)
+                self.assertEqual((len(token_cache._entries), token_cache.hits), (0, hits))
+
+    def test_user_save_needs_no_token_query(self):
+        with self.assertNumQueries(1):
+            self.user.first_name = 'Renamed'
+            self.user.save(update_fields=['first_name'])
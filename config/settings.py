@@ -11,6 +11,81 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = config('SECRET_KEY', default='django-insecure-your-secret-key-here-change-in-production')
 GEMINI_API_KEY = config('GEMINI_API_KEY', default='')
 
+# Gemini model selection
+# GEMINI_MODEL pins a model and skips the list_models() lookup entirely;
+# otherwise the best available model is resolved on first use and cached.
+# GEMINI_CLIENT may point at apps.ai.fakes to run without network access.
+GEMINI_MODEL = config('GEMINI_MODEL', default='')
+GEMINI_MODEL_CACHE_TTL = config('GEMINI_MODEL_CACHE_TTL', default=3600, cast=int)
+GEMINI_CLIENT = config('GEMINI_CLIENT', default='google.generativeai')
+
+# Async AI advice jobs (POST /api/ai/advice/ with "async": true)
+AI_ADVICE_WORKERS = config('AI_ADVICE_WORKERS', default=2, cast=int)            # generation threads per process
+AI_ADVICE_MAX_PENDING = config('AI_ADVICE_MAX_PENDING', default=8, cast=int)    # queued jobs before rejecting
+AI_ADVICE_MAX_PER_USER = config('AI_ADVICE_MAX_PER_USER', default=2, cast=int)  # active jobs per user
+AI_ADVICE_TIMEOUT = config('AI_ADVICE_TIMEOUT', default=60, cast=int)           # seconds
+
+# Financial context sent to the model
+AI_CONTEXT_WINDOWS = config(
+    'AI_CONTEXT_WINDOWS', default='30,90,365',
+    cast=lambda v: [int(s) for s in v.split(',')]
+)  # days; the first window is the headline summary
+AI_CONTEXT_TOP_CATEGORIES = config('AI_CONTEXT_TOP_CATEGORIES', default=5, cast=int)
+AI_PROMPT_MAX_CHARS = config('AI_PROMPT_MAX_CHARS', default=3000, cast=int)
+AI_QUESTION_MAX_CHARS = config('AI_QUESTION_MAX_CHARS', default=1000, cast=int)
+
+# Advice response cache (per process, keyed on question + financial context)
+AI_ADVICE_CACHE_SIZE = config('AI_ADVICE_CACHE_SIZE', default=1024, cast=int)   # entries, 0 disables
+AI_ADVICE_CACHE_TTL = config('AI_ADVICE_CACHE_TTL', default=3600, cast=int)     # seconds
+
+# Token -> user resolution cache used by CachedTokenAuthentication
+AUTH_TOKEN_CACHE_SIZE = config('AUTH_TOKEN_CACHE_SIZE', default=10000, cast=int)  # entries per process, 0 disables
+AUTH_TOKEN_CACHE_TTL = config('AUTH_TOKEN_CACHE_TTL', default=300, cast=int)      # seconds
+AUTH_TOKEN_CACHE_ALIAS = config('AUTH_TOKEN_CACHE_ALIAS', default='')             # Django cache alias shared by all workers (file/redis); caching is off without one
+
+# Statement import (POST /api/transactions/import/)
+TRANSACTION_IMPORT_CHUNK_SIZE = config('TRANSACTION_IMPORT_CHUNK_SIZE', default=2000, cast=int)  # rows per bulk insert
+TRANSACTION_IMPORT_MAX_ERRORS = config('TRANSACTION_IMPORT_MAX_ERRORS', default=100, cast=int)   # row errors reported
+
+# Streaming export (GET /api/transactions/export/)
+TRANSACTION_EXPORT_CHUNK_SIZE = config('TRANSACTION_EXPORT_CHUNK_SIZE', default=2000, cast=int)  # rows per DB fetch
+
+# Budget comparison (GET /api/budgets/comparison/?start=&end=)
+BUDGET_COMPARISON_MAX_MONTHS = config('BUDGET_COMPARISON_MAX_MONTHS', default=36, cast=int)  # months per range
+
+# Budget alerts, raised when a month's expenses reach these percentages of its budget
+BUDGET_ALERT_THRESHOLDS = config(
+    'BUDGET_ALERT_THRESHOLDS', default='50,80,100',
+    cast=lambda v: [int(s) for s in v.split(',')]
+)
+BUDGET_ALERTS_PAGE_SIZE = config('BUDGET_ALERTS_PAGE_SIZE', default=50, cast=int)  # alerts per feed response
+
+# Versioned response cache for summary, budget and category reads
+RESPONSE_CACHE_ALIAS = config('RESPONSE_CACHE_ALIAS', default='default')   # Django cache alias (see CACHES)
+RESPONSE_CACHE_TTL = config('RESPONSE_CACHE_TTL', default=300, cast=int)    # seconds, 0 disables
+
+# Time series (GET /api/transactions/timeseries/)
+TRANSACTION_TIMESERIES_MAX_BUCKETS = config('TRANSACTION_TIMESERIES_MAX_BUCKETS', default=1000, cast=int)  # buckets per series
+
+# Delta sync (GET /api/sync/)
+SYNC_PAGE_SIZE = config('SYNC_PAGE_SIZE', default=500, cast=int)            # changes per response
+SYNC_SETTLE_SECONDS = config('SYNC_SETTLE_SECONDS', default=0, cast=int)    # hold back changes younger than this (not needed on SQLite/PostgreSQL)
+
+# Request instrumentation (apps.monitoring)
+REQUEST_METRICS_ENABLED = config('REQUEST_METRICS_ENABLED', default=True, cast=bool)
+REQUEST_METRICS_SAMPLE_RATE = config('REQUEST_METRICS_SAMPLE_RATE', default=1.0, cast=float)     # fraction of requests measured
+REQUEST_METRICS_SERVER_TIMING = config('REQUEST_METRICS_SERVER_TIMING', default=True, cast=bool)  # send Server-Timing headers
+SLOW_REQUEST_MS = config('SLOW_REQUEST_MS', default=500, cast=int)                # log measured requests slower than this
+SLOW_REQUEST_TOP_QUERIES = config('SLOW_REQUEST_TOP_QUERIES', default=5, cast=int)  # statements listed per slow request
+METRICS_MULTIPROCESS_DIR = config('METRICS_MULTIPROCESS_DIR', default='')       # per-worker metric files; needed with several workers
+METRICS_FLUSH_SECONDS = config('METRICS_FLUSH_SECONDS', default=5, cast=float)    # how often a worker writes its file
+METRICS_TOKEN = config('METRICS_TOKEN', default='')                              # bearer token for Prometheus scrapes
+PROFILER_ENABLED = config('PROFILER_ENABLED', default=True, cast=bool)           # staff may profile requests with ?profile=1
+PROFILER_INTERVAL_MS = config('PROFILER_INTERVAL_MS', default=2, cast=float)      # stack sampling interval
+PROFILER_DIR = config('PROFILER_DIR', default=str(BASE_DIR / '.profiles'))        # where profiles are stored
+PROFILER_KEEP = config('PROFILER_KEEP', default=50, cast=int)                     # newest profiles kept
+PROFILER_MAX_QUERIES = config('PROFILER_MAX_QUERIES', default=1000, cast=int)     # statements recorded per profile
+
 DEBUG = config('DEBUG', default=False, cast=bool)
 
 # ALLOWED_HOSTS - Allow Railway domain
@@ -42,12 +117,16 @@ INSTALLED_APPS = [
     'apps.transactions',           # Transaction management app
     'apps.categories',             # Category management app
     'apps.budgets',                # Budget management app
+    'apps.ai',                     # AI financial advice app
+    'apps.sync',                   # Delta sync for offline clients
+    'apps.monitoring',             # Request instrumentation
 
     'django_extensions',
 ]
 
 # MIDDLEWARE: Functions that process requests/responses
 MIDDLEWARE = [
+    'apps.monitoring.middleware.RequestMetricsMiddleware',  # Query/latency instrumentation (outermost, times the rest)
     'django.middleware.security.SecurityMiddleware',     # Security enhancements
     'django.contrib.sessions.middleware.SessionMiddleware',  # Session management
     'corsheaders.middleware.CorsMiddleware',             # CORS handling (must be before CommonMiddleware)
@@ -56,6 +135,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',  # User authentication
     'django.contrib.messages.middleware.MessageMiddleware',     # Messages framework
     'django.middleware.clickjacking.XFrameOptionsMiddleware',   # Clickjacking protection
+    'apps.monitoring.profiler.ProfilerMiddleware',              # Staff request profiling (after authentication)
 ]
 
 # Root URL configuration
@@ -94,6 +174,27 @@ DATABASES = {
     )
 }
 
+# Django cache. CACHE_BACKEND picks locmem, file, redis or dummy;
+# CACHE_LOCATION is the locmem name, the cache directory, or the server URL
+# (redis://host:6379/0; any Redis-protocol server). CACHE_REDIS_LIBRARY may
+# point at apps.sync.fakes to use an in-process stand-in instead.
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem')
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'default'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', str(BASE_DIR / '.cache')),
+    'redis': ('apps.sync.cache.RedisCache', 'redis://localhost:6379/0'),
+    'dummy': ('django.core.cache.backends.dummy.DummyCache', ''),
+}
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': config('CACHE_LOCATION', default='') or CACHE_BACKENDS[CACHE_BACKEND][1],
+        'OPTIONS': {
+            'redis': {'library': config('CACHE_REDIS_LIBRARY', default='redis')},
+        }.get(CACHE_BACKEND, {'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=10000, cast=int)}),
+    }
+}
+
 
 # Password validation
 # Django enforces these rules when users create passwords
@@ -134,6 +235,27 @@ MIDDLEWARE.insert(1, 'whitenoise.middleware.WhiteNoiseMiddleware')
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 
+# Logging
+# Slow-request records from apps.monitoring are single JSON lines on stderr
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'slow_requests': {'class': 'logging.StreamHandler', 'formatter': 'message'},
+    },
+    'loggers': {
+        'apps.monitoring.slow_requests': {
+            'handlers': ['slow_requests'],
+            'level': config('SLOW_REQUEST_LOG_LEVEL', default='WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
+
 # Default primary key field type
 # Determines the type of auto-generated ID fields
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -144,8 +266,9 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     # Default authentication classes
     # TokenAuthentication: Uses token-based authentication (we'll use this)
+    # CachedTokenAuthentication is the same scheme with the token lookup cached
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'apps.users.authentication.CachedTokenAuthentication',
     ],
     
     # Default permission classes
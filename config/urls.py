@@ -17,6 +17,7 @@ def api_root(request):
             'transactions': '/api/transactions/',
             'categories': '/api/categories/',
             'budgets': '/api/budgets/',
+            'sync': '/api/sync/',
             'admin': '/admin/',
         }
     })
@@ -31,6 +32,8 @@ urlpatterns = [
     path('api/categories/', include('apps.categories.urls')),
     path('api/budgets/', include('apps.budgets.urls')),
     path('api/ai/', include('apps.ai.urls')),
+    path('api/sync/', include('apps.sync.urls')),
+    path('api/monitoring/', include('apps.monitoring.urls')),
 ]
 
 """